@@ -58,6 +58,7 @@ class RootStack(Stack):
             "NovaMmeFrontStack",
             description="Deploy frontend static website: S3, CloudFormation",
             api_gw_base_url_nova_srv = nova_service_stack.api_gw_base_url,
+            rag_websocket_url = nova_service_stack.rag_websocket_url,
             cognito_user_pool_id = srv_pre_stack.cognito_user_pool_id,
             cognito_app_client_id = srv_pre_stack.cognito_app_client_id,
             cognito_identity_pool_id = srv_pre_stack.cognito_identity_pool_id,
@@ -81,6 +82,7 @@ class RootStack(Stack):
         CfnOutput(self, "Website URL", value=f"https://{frontend_stack.output_url}")
 
         CfnOutput(self, "API Gateway Base URL: Nova MME Service", value=nova_service_stack.api_gw_base_url)
+        CfnOutput(self, "WebSocket URL: Nova MME RAG Stream", value=nova_service_stack.rag_websocket_url)
 
         
         CfnOutput(self, "Cognito User Pool Id", value=srv_pre_stack.cognito_user_pool_id)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Add tasks created before the task name index table existed to the index, so keyword search
+# finds them. Safe to re-run: tasks that are already indexed are skipped.
+import boto3
+
+import os
+
+region = os.environ.get('CDK_DEFAULT_REGION', 'us-east-1')
+table_name = os.environ.get('DYNAMO_VIDEO_TASK_TABLE', 'nova_mme_nova_video_task')
+index_table_name = os.environ.get('DYNAMO_TASK_NAME_INDEX_TABLE', 'nova_mme_task_name_index')
+
+dynamodb = boto3.resource('dynamodb', region_name=region)
+table = dynamodb.Table(table_name)
+index_table = dynamodb.Table(index_table_name)
+
+def name_grams(names):
+    # Same trigrams as nova-srv-start-task
+    grams = set()
+    for name in names:
+        grams.update(name[i:i + 3] for i in range(len(name) - 2))
+    return grams
+
+print(f"Backfilling {index_table_name} from {table_name}...")
+
+indexed = 0
+scan_kwargs = {
+    'ProjectionExpression': 'Id, RequestTs, Request.FileName, Request.TaskName',
+}
+while True:
+    response = table.scan(**scan_kwargs)
+    for item in response.get('Items', []):
+        if 'RequestTs' not in item:
+            continue
+        request = item.get('Request', {})
+        names = [name.lower() for name in [request.get('FileName'), request.get('TaskName')] if name]
+        added = 0
+        for gram in name_grams(names):
+            try:
+                index_table.put_item(
+                    Item={'Gram': gram, 'TaskId': item['Id'], 'RequestTs': item['RequestTs'], 'Names': names},
+                    ConditionExpression='attribute_not_exists(TaskId)'
+                )
+            except dynamodb.meta.client.exceptions.ConditionalCheckFailedException:
+                continue
+            index_table.update_item(
+                Key={'Gram': gram, 'TaskId': '#count'},
+                UpdateExpression='ADD #count :one',
+                ExpressionAttributeNames={'#count': 'Count'},
+                ExpressionAttributeValues={':one': 1}
+            )
+            added += 1
+        if added:
+            indexed += 1
+    if 'LastEvaluatedKey' not in response:
+        break
+    scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+print(f"Successfully indexed {indexed} tasks")
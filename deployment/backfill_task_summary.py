@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# Project tasks created before the task summary table existed. The task table stream only carries
+# changes made after it was enabled, so existing items are sent to nova-srv-task-projector in the
+# same record shape. Safe to re-run: the projector overwrites summaries.
+import boto3
+
+import json
+import os
+
+region = os.environ.get('CDK_DEFAULT_REGION', 'us-east-1')
+table_name = os.environ.get('DYNAMO_VIDEO_TASK_TABLE', 'nova_mme_nova_video_task')
+function_name = os.environ.get('LAMBDA_FUN_NAME_TASK_PROJECTOR', 'nova-mme-nova-srv-task-projector')
+
+dynamodb = boto3.client('dynamodb', region_name=region)
+lambda_client = boto3.client('lambda', region_name=region)
+
+print(f"Backfilling task summaries from {table_name}...")
+
+projected = 0
+scan_kwargs = {
+    'TableName': table_name,
+    # Only the attributes the summary is built from
+    'ProjectionExpression': 'Id, RequestTs, Request, Modality, #status, RequestBy, EmbedCompleteTs, MetaData.VideoMetaData.ThumbnailS3Key',
+    'ExpressionAttributeNames': {'#status': 'Status'},
+    'Limit': 100,
+}
+while True:
+    response = dynamodb.scan(**scan_kwargs)
+    records = [{'eventName': 'INSERT', 'dynamodb': {'NewImage': item}} for item in response.get('Items', [])]
+    if records:
+        result = lambda_client.invoke(FunctionName=function_name, Payload=json.dumps({'Records': records}))
+        if 'FunctionError' in result:
+            raise RuntimeError(result['Payload'].read().decode('utf-8'))
+        projected += len(records)
+    if 'LastEvaluatedKey' not in response:
+        break
+    scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+print(f"Successfully projected {projected} tasks")
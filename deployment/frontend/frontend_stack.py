@@ -25,6 +25,7 @@ class FrontendStack(NestedStack):
     region = None
     account_id = None
     api_gw_base_url_nova_srv = None
+    rag_websocket_url = None
     cognito_user_pool_id = None
     cognito_app_client_id = None
     cognito_identity_pool_id = None
@@ -35,6 +36,7 @@ class FrontendStack(NestedStack):
 
     def __init__(self, scope: Construct, construct_id: str, 
             api_gw_base_url_nova_srv, 
+            rag_websocket_url,
             cognito_user_pool_id, 
             cognito_app_client_id, 
             cognito_identity_pool_id,
@@ -46,6 +48,7 @@ class FrontendStack(NestedStack):
         self.region=os.environ.get("CDK_DEFAULT_REGION")
         
         self.api_gw_base_url_nova_srv = api_gw_base_url_nova_srv
+        self.rag_websocket_url = rag_websocket_url
         self.cognito_user_pool_id = cognito_user_pool_id
         self.cognito_app_client_id = cognito_app_client_id
         self.cognito_identity_pool_id = cognito_identity_pool_id
@@ -113,6 +116,7 @@ class FrontendStack(NestedStack):
                     "REACT_APP_COGNITO_USER_POOL_ID": codebuild.BuildEnvironmentVariable(value=self.cognito_user_pool_id),
                     "REACT_APP_COGNITO_USER_POOL_CLIENT_ID": codebuild.BuildEnvironmentVariable(value=self.cognito_app_client_id),
                     "REACT_APP_APIGATEWAY_BASE_URL_NOVA_SRV": codebuild.BuildEnvironmentVariable(value=self.api_gw_base_url_nova_srv),
+                    "REACT_APP_RAG_WEBSOCKET_URL": codebuild.BuildEnvironmentVariable(value=self.rag_websocket_url),
                     "REACT_APP_READONLY_DISPLAY_MENUS": codebuild.BuildEnvironmentVariable(value=FRONT_END_DISPLAY_MENUS),
                     "REACT_APP_COGNITO_IDENTITY_POOL_ID": codebuild.BuildEnvironmentVariable(value=self.cognito_identity_pool_id),
                     "REACT_APP_COGNITO_REGION": codebuild.BuildEnvironmentVariable(value=self.region),
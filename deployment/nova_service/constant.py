@@ -7,6 +7,8 @@ S3_VECTOR_INDEX_DIM_NOVA = "1024"
 # Main Stack
 API_NAME_PREFIX = 'nova-mme-nova-mme'
 DYNAMO_VIDEO_TASK_TABLE = "nova_mme_nova_video_task"
+DYNAMO_TASK_NAME_INDEX_TABLE = "nova_mme_task_name_index"
+DYNAMO_TASK_SUMMARY_TABLE = "nova_mme_task_summary"
 
 LAMBDA_NAME_PREFIX='nova-mme-'
 
@@ -17,6 +19,7 @@ VIDEO_UPLOAD_S3_PREFIX = 'upload'
 
 LAMBDA_LAYER_SOURCE_S3_KEY_BOTO3 = "layer/boto3_layer.zip"
 LAMBDA_LAYER_SOURCE_S3_KEY_MOVIEPY = "layer/moviepy_layer.zip"
+LAMBDA_LAYER_SOURCE_S3_KEY_PILLOW = "layer/pillow_layer.zip"
 
 MODEL_ID_IMAGE_UNDERSTANDING="amazon.nova-lite-v1:0"
 MODEL_ID_BEDROCK_MME='amazon.nova-2-multimodal-embeddings-v1:0'
@@ -9,11 +9,15 @@ from aws_cdk import (
     aws_s3_notifications as _s3_noti,
     aws_lambda as _lambda,
     aws_apigateway as _apigw,
+    aws_apigatewayv2 as _apigwv2,
+    aws_apigatewayv2_integrations as _apigwv2_integrations,
     aws_iam as _iam,
     aws_sqs as _sqs,
     aws_opensearchservice as opensearch,
     aws_lambda_event_sources as lambda_event_sources,
     aws_dynamodb as _dynamodb,
+    aws_events as _events,
+    aws_events_targets as _events_targets,
     Duration,
     aws_stepfunctions as _aws_stepfunctions,
     RemovalPolicy,
@@ -55,8 +59,10 @@ class NovaServiceStack(NestedStack):
     boto3_layer = None
     nova_layer = None
     moviepy_layer = None
+    pillow_layer = None
 
     api = None
+    rag_websocket_url = None
     
     def __init__(self, scope: Construct, construct_id: str, cognito_user_pool_id: str, cognito_app_client_id: str,
             s3_bucket_name_mm, **kwargs) -> None:
@@ -74,6 +80,7 @@ class NovaServiceStack(NestedStack):
         self.deploy_cognito()
         self.deploy_lambda()
         self.deploy_apigw_lambda()
+        self.deploy_rag_websocket()
 
     def deploy_dynamodb(self):
         # Create DynamoDB tables
@@ -83,8 +90,11 @@ class NovaServiceStack(NestedStack):
             table_name=DYNAMO_VIDEO_TASK_TABLE, 
             partition_key=_dynamodb.Attribute(name='Id', type=_dynamodb.AttributeType.STRING),
             point_in_time_recovery=True,
+            # Feeds nova-srv-task-projector
+            stream=_dynamodb.StreamViewType.NEW_AND_OLD_IMAGES,
             removal_policy=RemovalPolicy.DESTROY
         )
+        self.video_task_table = video_task_table
         video_task_table.add_global_secondary_index(
             index_name="RequestBy-index",
             partition_key=_dynamodb.Attribute(
@@ -93,6 +103,27 @@ class NovaServiceStack(NestedStack):
             ),
             projection_type=_dynamodb.ProjectionType.ALL 
         )
+        # Task name search: trigram posting lists of FileName/TaskName, maintained by
+        # start-task and delete-task. Existing tasks need deployment/backfill_task_name_index.py once.
+        _dynamodb.Table(self,
+            id='task-name-index-table',
+            table_name=DYNAMO_TASK_NAME_INDEX_TABLE,
+            partition_key=_dynamodb.Attribute(name='Gram', type=_dynamodb.AttributeType.STRING),
+            sort_key=_dynamodb.Attribute(name='TaskId', type=_dynamodb.AttributeType.STRING),
+            billing_mode=_dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
+
+        # Task summaries: the task list fields only, maintained from the task table stream by
+        # nova-srv-task-projector. Existing tasks need deployment/backfill_task_summary.py once.
+        _dynamodb.Table(self,
+            id='task-summary-table',
+            table_name=DYNAMO_TASK_SUMMARY_TABLE,
+            partition_key=_dynamodb.Attribute(name='ListPk', type=_dynamodb.AttributeType.STRING),
+            sort_key=_dynamodb.Attribute(name='SortKey', type=_dynamodb.AttributeType.STRING),
+            billing_mode=_dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY
+        )
 
     def deploy_s3(self):
         self.s3_mm_bucket = _s3.Bucket.from_bucket_name(self, "NovaMmeBucket", bucket_name=self.s3_bucket_name_mm)
@@ -128,6 +159,17 @@ class NovaServiceStack(NestedStack):
             compatible_runtimes=[_lambda.Runtime.PYTHON_3_13],
             description="Python 3.12 with movie.py"
         )
+        self.pillow_layer = _lambda.LayerVersion(self, 'PillowPyLayer',
+            code=_lambda.S3Code(bucket=layer_bucket, key=LAMBDA_LAYER_SOURCE_S3_KEY_PILLOW),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_13],
+            description="Python 3.13 with Pillow for image query preprocessing"
+        )
+        # Shared helpers (DynamoDB codec and table access) built from source; see nova_common.__version__
+        self.nova_common_layer = _lambda.LayerVersion(self, 'NovaCommonLayer',
+            code=_lambda.Code.from_asset(os.path.join("../source/", "nova_service/layer/nova_common")),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_13],
+            description="Nova MME shared helpers: DynamoDB codec and table access"
+        )
         # Nova S3 listener Lambda
         # Function name: nova-srv-s3-listener
         lambda_nova_s3_listener_role = _iam.Role(
@@ -175,7 +217,7 @@ class NovaServiceStack(NestedStack):
             timeout=Duration.seconds(180),
             role=lambda_nova_s3_listener_role,
             memory_size=10240,
-            layers=[self.boto3_layer],
+            layers=[self.boto3_layer, self.nova_common_layer],
             environment={
                 'DYNAMO_VIDEO_TASK_TABLE': DYNAMO_VIDEO_TASK_TABLE,
                 'NOVA_S3_VECTOR_BUCKET': S3_VECTOR_BUCKET_NOVA,
@@ -224,6 +266,11 @@ class NovaServiceStack(NestedStack):
                         actions=["logs:CreateLogStream", "logs:PutLogEvents"],
                         resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}nova-srv-get-video-metadata:*"]
                     ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["lambda:InvokeFunction"],
+                        resources=[f"arn:aws:lambda:{self.region}:{self.account_id}:function:{LAMBDA_NAME_PREFIX}nova-srv-get-video-metadata"]
+                    ),
                     _iam.PolicyStatement(
                         actions=["dynamodb:DeleteItem","dynamodb:Query", "dynamodb:Scan", "dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:GetItem"],
                         resources=[
@@ -248,10 +295,127 @@ class NovaServiceStack(NestedStack):
                 'VIDEO_SAMPLE_CHUNK_DURATION_S': "600",
                 'VIDEO_SAMPLE_S3_PREFIX': VIDEO_SAMPLE_S3_PREFIX,
                 'VIDEO_SAMPLE_S3_BUCKET': self.s3_bucket_name_mm,
-                'MODEL_ID_IMAGE_UNDERSTANDING': MODEL_ID_IMAGE_UNDERSTANDING
+                'MODEL_ID_IMAGE_UNDERSTANDING': MODEL_ID_IMAGE_UNDERSTANDING,
+                'METADATA_PROBE_MODE': "probe",
+                'THUMBNAIL_MODEL_CONFIRM': "false",
+                'VIDEO_SAMPLE_MODE': "lambda",
+                'VIDEO_SAMPLE_WORKERS': "4",
+                'SCENE_DETECT_ENABLED': "true",
+                'SPRITE_ENABLED': "true",
+                'WAVEFORM_ENABLED': "true",
+                'MEDIA_CACHE_MAX_BYTES': str(8 * 1024 ** 3)
             },
             role=lambda_nova_get_metadata_role,
-            layers=[self.moviepy_layer],
+            layers=[self.moviepy_layer, self.nova_common_layer],
+        )
+
+        # Task summary projector: task table stream -> task summary table
+        # Lambda: nova-srv-task-projector
+        lambda_nova_task_projector_role = _iam.Role(
+            self, "NovaSrvLambdaTaskProjectorRole",
+            assumed_by=_iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={"nova-srv-task-projector-poliy": _iam.PolicyDocument(
+                statements=[
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogGroup"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogStream", "logs:PutLogEvents"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}nova-srv-task-projector:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        actions=["dynamodb:PutItem", "dynamodb:DeleteItem", "dynamodb:BatchWriteItem"],
+                        resources=[
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_TASK_SUMMARY_TABLE}",
+                        ]
+                    )
+                ]
+            )}
+        )
+        lambda_task_projector = _lambda.Function(self,
+            id='NovaSrvTaskProjectorLambda',
+            function_name=f"{LAMBDA_NAME_PREFIX}nova-srv-task-projector",
+            runtime=_lambda.Runtime.PYTHON_3_13,
+            handler='nova-srv-task-projector.lambda_handler',
+            code=_lambda.Code.from_asset(os.path.join("../source/", "nova_service/lambda/nova-srv-task-projector")),
+            timeout=Duration.seconds(60),
+            memory_size=256,
+            layers=[self.nova_common_layer],
+            environment={
+                'DYNAMO_TASK_SUMMARY_TABLE': DYNAMO_TASK_SUMMARY_TABLE,
+            },
+            role=lambda_nova_task_projector_role,
+        )
+        # Grants the stream read permissions to the role
+        lambda_task_projector.add_event_source(lambda_event_sources.DynamoEventSource(
+            self.video_task_table,
+            starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+            batch_size=100,
+            max_batching_window=Duration.seconds(1),
+            retry_attempts=10,
+            bisect_batch_on_error=True,
+        ))
+
+        # Library stats: task table stream -> counters on the stats item, plus a daily reconcile
+        # Lambda: nova-srv-task-stats
+        lambda_nova_task_stats_role = _iam.Role(
+            self, "NovaSrvLambdaTaskStatsRole",
+            assumed_by=_iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={"nova-srv-task-stats-poliy": _iam.PolicyDocument(
+                statements=[
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogGroup"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogStream", "logs:PutLogEvents"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}nova-srv-task-stats:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        actions=["dynamodb:Scan"],
+                        resources=[
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}",
+                        ]
+                    ),
+                    _iam.PolicyStatement(
+                        actions=["dynamodb:PutItem", "dynamodb:UpdateItem"],
+                        resources=[
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_TASK_SUMMARY_TABLE}",
+                        ]
+                    )
+                ]
+            )}
+        )
+        lambda_task_stats = _lambda.Function(self,
+            id='NovaSrvTaskStatsLambda',
+            function_name=f"{LAMBDA_NAME_PREFIX}nova-srv-task-stats",
+            runtime=_lambda.Runtime.PYTHON_3_13,
+            handler='nova-srv-task-stats.lambda_handler',
+            code=_lambda.Code.from_asset(os.path.join("../source/", "nova_service/lambda/nova-srv-task-stats")),
+            timeout=Duration.seconds(900),
+            memory_size=512,
+            layers=[self.nova_common_layer],
+            environment={
+                'DYNAMO_VIDEO_TASK_TABLE': DYNAMO_VIDEO_TASK_TABLE,
+                'DYNAMO_TASK_SUMMARY_TABLE': DYNAMO_TASK_SUMMARY_TABLE,
+            },
+            role=lambda_nova_task_stats_role,
+        )
+        lambda_task_stats.add_event_source(lambda_event_sources.DynamoEventSource(
+            self.video_task_table,
+            starting_position=_lambda.StartingPosition.TRIM_HORIZON,
+            batch_size=500,
+            max_batching_window=Duration.seconds(5),
+            retry_attempts=10,
+        ))
+        _events.Rule(self, "NovaSrvTaskStatsReconcileRule",
+            schedule=_events.Schedule.rate(Duration.days(1)),
+            targets=[_events_targets.LambdaFunction(lambda_task_stats)]
         )
 
     def deploy_apigw_lambda(self):
@@ -312,6 +476,11 @@ class NovaServiceStack(NestedStack):
                         actions=["s3:ListBucket","s3:GetObject","s3:PutObject","s3:DeleteObject"],
                         resources=[f"arn:aws:s3:::{self.s3_bucket_name_mm}",f"arn:aws:s3:::{self.s3_bucket_name_mm}/*"]
                     ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["lambda:InvokeFunction"],
+                        resources=[f"arn:aws:lambda:{self.region}:{self.account_id}:function:{LAMBDA_NAME_PREFIX}nova-srv-delete-video-task"]
+                    ),
                     _iam.PolicyStatement(
                         effect=_iam.Effect.ALLOW,
                         actions=["s3vectors:*"],
@@ -322,6 +491,7 @@ class NovaServiceStack(NestedStack):
                         resources=[
                             f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}/index/*",
                             f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}",
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_TASK_NAME_INDEX_TABLE}",
                         ]
                     )
                 ]
@@ -331,9 +501,12 @@ class NovaServiceStack(NestedStack):
             root=embed, path1="delete-task", method="POST", auth=self.cognito_authorizer, 
             role=lambda_nova_delete_task_role, 
             lambda_file_name="nova-srv-delete-video-task", 
-            memory_m=1024, timeout_s=30, ephemeral_storage_size=512,
+            # Bulk delete jobs run asynchronously in this function: API calls still end at 29s
+            memory_m=1024, timeout_s=900, ephemeral_storage_size=512,
             evns={
                 'DYNAMO_VIDEO_TASK_TABLE': DYNAMO_VIDEO_TASK_TABLE,
+                'DYNAMO_TASK_NAME_INDEX_TABLE': DYNAMO_TASK_NAME_INDEX_TABLE,
+                'DELETE_JOB_S3_BUCKET': self.s3_bucket_name_mm,
                 'NOVA_S3_VECTOR_BUCKET': S3_VECTOR_BUCKET_NOVA,
                 'NOVA_S3_VECTOR_INDEX': S3_VECTOR_INDEX_NOVA,
             },
@@ -433,9 +606,10 @@ class NovaServiceStack(NestedStack):
                 'NOVA_S3_VECTOR_BUCKET': S3_VECTOR_BUCKET_NOVA,
                 'NOVA_S3_VECTOR_INDEX':S3_VECTOR_INDEX_NOVA,
                 'S3_BUCKET_DATA': self.s3_bucket_name_mm,
-                'MODEL_ID': MODEL_ID_BEDROCK_MME
+                'MODEL_ID': MODEL_ID_BEDROCK_MME,
+                'IMAGE_QUERY_MAX_EDGE_PX': "1024",
             },
-            layers=[self.boto3_layer]
+            layers=[self.boto3_layer, self.pillow_layer]
             )   
 
         # POST /v1/embedding/search-task-vector-chat
@@ -494,7 +668,8 @@ class NovaServiceStack(NestedStack):
                 'MODEL_ID_LLM': MODEL_ID_IMAGE_UNDERSTANDING,
                 'NOVA_S3_VECTOR_BUCKET': S3_VECTOR_BUCKET_NOVA,
                 'NOVA_S3_VECTOR_INDEX':S3_VECTOR_INDEX_NOVA,
-                'EMBEDDING_DIM': S3_VECTOR_INDEX_DIM_NOVA
+                'EMBEDDING_DIM': S3_VECTOR_INDEX_DIM_NOVA,
+                'RAG_CACHE_SIMILARITY_THRESHOLD': "0.95"
             },
         )   
 
@@ -535,18 +710,22 @@ class NovaServiceStack(NestedStack):
                         resources=[
                             f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}/index/*",
                             f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}",
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_TASK_NAME_INDEX_TABLE}",
                         ]
                     )              
                 ]
             )}
         )
             
+        start_task_timeout_s = 30
         self.create_api_endpoint(id='NovaLambdaStartTaskEp', root=embed, path1="start-task", method="POST", auth=self.cognito_authorizer, 
                 role=lambda_nova_start_task_role, 
                 lambda_file_name="nova-srv-start-task",
-                memory_m=128, timeout_s=30, ephemeral_storage_size=512,
+                memory_m=128, timeout_s=start_task_timeout_s, ephemeral_storage_size=512,
             evns={
+                'CLAIM_TIMEOUT_S': str(start_task_timeout_s),
                 'DYNAMO_VIDEO_TASK_TABLE': DYNAMO_VIDEO_TASK_TABLE,
+                'DYNAMO_TASK_NAME_INDEX_TABLE': DYNAMO_TASK_NAME_INDEX_TABLE,
                 'AWS_ACCOUNT_ID':self.account_id,
                 'LAMBDA_FUN_NAME_VIDEO_METADATA': self.lambda_nova_get_video_metadata.function_name
             })      
@@ -615,10 +794,12 @@ class NovaServiceStack(NestedStack):
                         resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}nova-srv-get-video-tasks:*"]
                     ),
                     _iam.PolicyStatement(
-                        actions=["dynamodb:DeleteItem","dynamodb:Query", "dynamodb:Scan", "dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:GetItem"],
+                        actions=["dynamodb:DeleteItem","dynamodb:Query", "dynamodb:Scan", "dynamodb:PutItem", "dynamodb:UpdateItem", "dynamodb:GetItem", "dynamodb:BatchGetItem"],
                         resources=[
                             f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}/index/*",
                             f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}",
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_TASK_NAME_INDEX_TABLE}",
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_TASK_SUMMARY_TABLE}",
                         ]
                     ) 
                 ]
@@ -630,10 +811,103 @@ class NovaServiceStack(NestedStack):
                 memory_m=128, timeout_s=10, ephemeral_storage_size=1024,
                 evns={
                     'DYNAMO_VIDEO_TASK_TABLE': DYNAMO_VIDEO_TASK_TABLE,
+                    'DYNAMO_TASK_NAME_INDEX_TABLE': DYNAMO_TASK_NAME_INDEX_TABLE,
+                    'DYNAMO_TASK_SUMMARY_TABLE': DYNAMO_TASK_SUMMARY_TABLE,
                     'S3_PRE_SIGNED_URL_EXPIRY_S': S3_PRE_SIGNED_URL_EXPIRY_S,
                 }
         )
 
+        # POST /v1/nova/embedding/get-stats
+        # Lambda: nova-srv-get-task-stats
+        lambda_nova_get_task_stats_role = _iam.Role(
+            self, "NovaSrvLambdaGetTaskStatsRole",
+            assumed_by=_iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={"nova-srv-get-task-stats-poliy": _iam.PolicyDocument(
+                statements=[
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogGroup"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogStream", "logs:PutLogEvents"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}nova-srv-get-task-stats:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        actions=["dynamodb:GetItem"],
+                        resources=[
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_TASK_SUMMARY_TABLE}",
+                        ]
+                    )
+                ]
+            )}
+        )
+        self.create_api_endpoint(id='NovaSrvGetTaskStatsEp', root=embed, path1="get-stats", method="POST", auth=self.cognito_authorizer,
+                role=lambda_nova_get_task_stats_role,
+                lambda_file_name="nova-srv-get-task-stats",
+                memory_m=128, timeout_s=10, ephemeral_storage_size=512,
+                evns={
+                    'DYNAMO_TASK_SUMMARY_TABLE': DYNAMO_TASK_SUMMARY_TABLE,
+                }
+        )
+
+        # Lambda: nova-srv-export-tasks (also runs the scan segments, invoked asynchronously by itself)
+        # Exports the whole task table, so it is not on the API: admins run it with lambda invoke
+        lambda_nova_export_tasks_role = _iam.Role(
+            self, "NovaSrvLambdaExportTasksRole",
+            assumed_by=_iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={"nova-srv-export-tasks-poliy": _iam.PolicyDocument(
+                statements=[
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["s3:ListBucket","s3:GetObject","s3:PutObject"],
+                        resources=[f"arn:aws:s3:::{self.s3_bucket_name_mm}",f"arn:aws:s3:::{self.s3_bucket_name_mm}/*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogGroup"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogStream", "logs:PutLogEvents"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}nova-srv-export-tasks:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["lambda:InvokeFunction"],
+                        resources=[f"arn:aws:lambda:{self.region}:{self.account_id}:function:{LAMBDA_NAME_PREFIX}nova-srv-export-tasks"]
+                    ),
+                    _iam.PolicyStatement(
+                        actions=["dynamodb:Scan"],
+                        resources=[
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}",
+                        ]
+                    )
+                ]
+            )}
+        )
+        _lambda.Function(self,
+            id='NovaSrvExportTasksLambda',
+            function_name=f"{LAMBDA_NAME_PREFIX}nova-srv-export-tasks",
+            runtime=_lambda.Runtime.PYTHON_3_13,
+            handler='nova-srv-export-tasks.lambda_handler',
+            code=_lambda.Code.from_asset(os.path.join("../source/", "nova_service/lambda/nova-srv-export-tasks")),
+            timeout=Duration.seconds(900),
+            memory_size=1769,
+            ephemeral_storage_size=Size.mebibytes(512),
+            environment={
+                'DYNAMO_VIDEO_TASK_TABLE': DYNAMO_VIDEO_TASK_TABLE,
+                'EXPORT_S3_BUCKET': self.s3_bucket_name_mm,
+                'EXPORT_S3_PREFIX': "exports/",
+                'EXPORT_TOTAL_SEGMENTS': "16",
+                'S3_PRESIGNED_URL_EXPIRY_S': S3_PRE_SIGNED_URL_EXPIRY_S,
+            },
+            role=lambda_nova_export_tasks_role,
+            layers=[self.nova_common_layer],
+        )
+
         # POST /v1/util/nova-srv-manage-s3-presigned-url
         # Lambda: nova-srv-manage-s3-presigned-url
 
@@ -659,6 +933,11 @@ class NovaServiceStack(NestedStack):
                         actions=["logs:CreateLogStream", "logs:PutLogEvents"],
                         resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}nova-srv-manage-s3-presigned-url:*"]
                     ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["lambda:InvokeFunction"],
+                        resources=[f"arn:aws:lambda:{self.region}:{self.account_id}:function:{LAMBDA_NAME_PREFIX}nova-srv-start-task"]
+                    ),
                     _iam.PolicyStatement(
                         actions=["ec2:DescribeNetworkInterfaces", "ec2:CreateNetworkInterface", "ec2:DeleteNetworkInterface",],
                         resources=["*"]
@@ -669,14 +948,104 @@ class NovaServiceStack(NestedStack):
         self.create_api_endpoint(id='UtilManageS3UrlEp', root=util, path1="nova-srv-manage-s3-presigned-url", method="POST", auth=self.cognito_authorizer, 
                 role=lambda_es_manage_s3_url_role,
                 lambda_file_name="nova-srv-manage-s3-presigned-url",
-                memory_m=128, timeout_s=10, ephemeral_storage_size=512,
+                # complete can run start-task synchronously
+                memory_m=128, timeout_s=30, ephemeral_storage_size=512,
                 evns={
                 'S3_PRESIGNED_URL_EXPIRY_S': S3_PRE_SIGNED_URL_EXPIRY_S,
                 'VIDEO_UPLOAD_S3_PREFIX': VIDEO_UPLOAD_S3_PREFIX,
-                'VIDEO_UPLOAD_S3_BUCKET': self.s3_bucket_name_mm
+                'VIDEO_UPLOAD_S3_BUCKET': self.s3_bucket_name_mm,
+                'LAMBDA_FUN_NAME_START_TASK': f"{LAMBDA_NAME_PREFIX}nova-srv-start-task"
                 }
             )   
 
+    def deploy_rag_websocket(self):
+        # WebSocket API: streams RAG citations and response tokens
+        # Lambda: nova-srv-search-vector-rag (websocket_handler)
+        ws_api = _apigwv2.WebSocketApi(self, "NovaRagWebSocketApi",
+            api_name=f"{API_NAME_PREFIX}-rag-stream",
+        )
+        ws_stage = _apigwv2.WebSocketStage(self, "NovaRagWebSocketStage",
+            web_socket_api=ws_api,
+            stage_name="prod",
+            auto_deploy=True,
+        )
+        self.rag_websocket_url = ws_stage.url
+
+        lambda_key = "nova-srv-search-vector-rag-stream"
+        lambda_role = _iam.Role(
+            self, f"{lambda_key}Role",
+            assumed_by=_iam.ServicePrincipal("lambda.amazonaws.com"),
+            inline_policies={f"{lambda_key}-poliy": _iam.PolicyDocument(
+                statements=[
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["s3:ListBucket","s3:GetObject","s3:PutObject"],
+                        resources=[f"arn:aws:s3:::{self.s3_bucket_name_mm}",f"arn:aws:s3:::{self.s3_bucket_name_mm}/*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogGroup"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["logs:CreateLogStream", "logs:PutLogEvents"],
+                        resources=[f"arn:aws:logs:{self.region}:{self.account_id}:log-group:/aws/lambda/{LAMBDA_NAME_PREFIX}{lambda_key}:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["s3vectors:*"],
+                        resources=[f"arn:aws:s3vectors:{self.region}:{self.account_id}:bucket/{S3_VECTOR_BUCKET_NOVA}",f"arn:aws:s3vectors:{self.region}:{self.account_id}:bucket/{S3_VECTOR_BUCKET_NOVA}/*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["bedrock:InvokeModel","bedrock:InvokeModelWithResponseStream"],
+                        resources=["arn:aws:bedrock:*:*:*"]
+                    ),
+                    _iam.PolicyStatement(
+                        effect=_iam.Effect.ALLOW,
+                        actions=["execute-api:ManageConnections"],
+                        resources=[f"arn:aws:execute-api:{self.region}:{self.account_id}:{ws_api.api_id}/*"]
+                    ),
+                    _iam.PolicyStatement(
+                        actions=["dynamodb:Query", "dynamodb:GetItem"],
+                        resources=[
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}/index/*",
+                            f"arn:aws:dynamodb:{self.region}:{self.account_id}:table/{DYNAMO_VIDEO_TASK_TABLE}",
+                        ]
+                    )
+                ]
+            )}
+        )
+        lambda_function = _lambda.Function(self,
+            id=f'{lambda_key}Function',
+            function_name=f"{LAMBDA_NAME_PREFIX}{lambda_key}",
+            runtime=_lambda.Runtime.PYTHON_3_13,
+            handler='nova-srv-search-vector-rag.websocket_handler',
+            code=_lambda.Code.from_asset(os.path.join("../source/", "nova_service/lambda/nova-srv-search-vector-rag")),
+            timeout=Duration.seconds(180),
+            memory_size=1024,
+            role=lambda_role,
+            layers=[self.nova_common_layer],
+            environment={
+                'S3_PRESIGNED_URL_EXPIRY_S': S3_PRE_SIGNED_URL_EXPIRY_S,
+                'S3_BUCKET_DATA': self.s3_bucket_name_mm,
+                'DYNAMO_VIDEO_TASK_TABLE': DYNAMO_VIDEO_TASK_TABLE,
+                'MODEL_ID_EMBED': MODEL_ID_BEDROCK_MME,
+                'MODEL_ID_LLM': MODEL_ID_IMAGE_UNDERSTANDING,
+                'NOVA_S3_VECTOR_BUCKET': S3_VECTOR_BUCKET_NOVA,
+                'NOVA_S3_VECTOR_INDEX':S3_VECTOR_INDEX_NOVA,
+                'EMBEDDING_DIM': S3_VECTOR_INDEX_DIM_NOVA,
+                'RAG_CACHE_SIMILARITY_THRESHOLD': "0.95"
+            },
+        )
+
+        # The $connect route validates the Cognito access token in the Lambda
+        integration = _apigwv2_integrations.WebSocketLambdaIntegration(f"{lambda_key}Integration", lambda_function)
+        ws_api.add_route("$connect", integration=integration)
+        ws_api.add_route("$disconnect", integration=integration)
+        ws_api.add_route("chat", integration=integration)
+
     def create_api_endpoint(self, id, root, path1, method, auth, role, lambda_file_name, memory_m, timeout_s, ephemeral_storage_size, evns, layers=None):
         lambda_function = _lambda.Function(self, 
             id=id, 
@@ -689,7 +1058,7 @@ class NovaServiceStack(NestedStack):
             ephemeral_storage_size=Size.mebibytes(ephemeral_storage_size),
             role=role,
             environment=evns,
-            layers=layers,
+            layers=[self.nova_common_layer, *(layers or [])],
         )
 
         resource = root.add_resource(
@@ -126,6 +126,7 @@ def configure_lambda_cloudfront():
         lambda_functions = [
             'nova-mme-nova-srv-search-vector',
             'nova-mme-nova-srv-search-vector-rag',
+            'nova-mme-nova-srv-search-vector-rag-stream',
             'nova-mme-nova-srv-get-video-tasks'
         ]
 
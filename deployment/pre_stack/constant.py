@@ -12,4 +12,5 @@ EMBEDDING_DIM_DEFAULT='1024'
 LAMBDA_LAYER_SOURCE_S3_KEY_SCENE_DETECT="layer/scenedetect_layer.zip"
 LAMBDA_LAYER_SOURCE_S3_KEY_MOVIEPY="layer/moviepy_layer.zip"
 LAMBDA_LAYER_SOURCE_S3_KEY_OPENCV="layer/opencv_layer.zip"
-LAMBDA_LAYER_SOURCE_S3_KEY_BOTO3="layer/boto3_layer.zip"
\ No newline at end of file
+LAMBDA_LAYER_SOURCE_S3_KEY_BOTO3="layer/boto3_layer.zip"
+LAMBDA_LAYER_SOURCE_S3_KEY_PILLOW="layer/pillow_layer.zip"
\ No newline at end of file
@@ -8,7 +8,7 @@ s3 = boto3.client('s3')
 s3vectors = boto3.client('s3vectors') 
 
 # This package only allows certain packages to be installed as Lambda Layers
-ALLOWED_LAYER_PACKAGES = ["boto3", "moviepy"]
+ALLOWED_LAYER_PACKAGES = ["boto3", "moviepy", "pillow"]
 
 def on_event(event, context):
   print(event)
@@ -316,4 +316,39 @@ class ServicePreStack(NestedStack):
                 output_paths=["Payload"]
             ),
             role=lambda_util_provision_invoke_role
+        )
+
+        # 3rd invoke: pillow
+        resource = custom_resources.AwsCustomResource(self,
+            id=f"util-pre-provision-invoke-res5",
+            log_retention=RetentionDays.ONE_WEEK,
+            on_create=custom_resources.AwsSdkCall(
+                service="Lambda",
+                action="invoke",
+                physical_resource_id=custom_resources.PhysicalResourceId.of("Trigger"),
+                parameters={
+                    "FunctionName": lambda_util_provision.function_name,
+                    "InvocationType": "RequestResponse",
+                    "Payload": json.dumps(
+                        {
+                            "RequestType":"Create",
+                            "Layers": [
+                                {
+                                    "name": "pillow",
+                                    "packages": [
+                                        {
+                                            "name":"pillow",
+                                            "version":"11.3.0",
+                                        }
+                                    ],
+                                    "s3_bucket":self.s3_data_bucket_name,
+                                    "s3_key":LAMBDA_LAYER_SOURCE_S3_KEY_PILLOW
+                                },
+                            ]
+                        }
+                    )
+                },
+                output_paths=["Payload"]
+            ),
+            role=lambda_util_provision_invoke_role
         )    
\ No newline at end of file
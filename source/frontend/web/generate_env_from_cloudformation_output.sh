@@ -31,6 +31,7 @@ COGNITO_USER_POOL_ID=$(get_output "CognitoUserPoolId")
 COGNITO_USER_POOL_CLIENT_ID=$(get_output "CognitoAppClientId")
 COGNITO_IDENTITY_POOL_ID=$(get_output "CognitoIdentityPoolId")
 APIGATEWAY_BASE_URL_NOVA_SRV=$(get_output "APIGatewayBaseURLNovaMMEService")
+RAG_WEBSOCKET_URL=$(get_output "WebSocketURLNovaMMERAGStream")
 
 # Generate .env file
 cat <<EOF > .env
@@ -38,6 +39,7 @@ REACT_APP_COGNITO_REGION="${COGNITO_REGION}"
 REACT_APP_COGNITO_USER_POOL_ID="${COGNITO_USER_POOL_ID}"
 REACT_APP_COGNITO_USER_POOL_CLIENT_ID="${COGNITO_USER_POOL_CLIENT_ID}"
 REACT_APP_APIGATEWAY_BASE_URL_NOVA_SRV="${APIGATEWAY_BASE_URL_NOVA_SRV}"
+REACT_APP_RAG_WEBSOCKET_URL="${RAG_WEBSOCKET_URL}"
 REACT_APP_COGNITO_IDENTITY_POOL_ID="${COGNITO_IDENTITY_POOL_ID}"
 REACT_APP_READONLY_DISPLAY_MENUS="novamme,chat,about"
 EOF
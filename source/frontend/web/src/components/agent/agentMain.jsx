@@ -1,7 +1,7 @@
 import React from 'react';
 import './agentMain.css'
 import { Badge, Button, ExpandableSection, Modal, Link, Tabs } from '@cloudscape-design/components';
-import { getCurrentUser } from 'aws-amplify/auth';
+import { getCurrentUser, fetchAuthSession } from 'aws-amplify/auth';
 import Loading from '../../static/waiting-texting.gif'
 import MixedContentDisplay from './mixedContent';
 import VideoPlayer from '../novaMme/videoPlayer';
@@ -96,29 +96,10 @@ class AgentMain extends React.Component {
             this.setState({loading: true, userQuery:"", chatHistory: chatHistory}, ()=>{
                 // Scroll to bottom after adding user message
                 setTimeout(() => this.scrollToBottom(), 100);
-                FetchPost("/nova/embedding/search-task-vector-chat", {
-                    "ChatHistory": this.getChatHistoryWithoutCitations(),
-                    "TopK": 3,
-                    "AudioDuration": this.state.audioDuration,
-                }, "NovaService").then((data) => {
-                    var resp = data.body;
-                    if (data.statusCode !== 200) {
-                        this.setState( {status: null, alert: data.body});
-                    }
-                    else {
-                        if (resp !== null) {
-                            var chatHistory = this.state.chatHistory;
-                            chatHistory.push(this.constructMessage("assistant", resp.reply, resp.citations));
-                            this.setState({loading: false, chatHistory: chatHistory}, () => {
-                                // Scroll to bottom after adding assistant message
-                                setTimeout(() => this.scrollToBottom(), 100);
-                            });
-                        }
-                    }
-                })
-                .catch((err) => {
-                    this.setState( {status: null, alert: err.message});
-                });                   
+                if (process.env.REACT_APP_RAG_WEBSOCKET_URL)
+                    this.streamChat();
+                else
+                    this.fetchChat();
             });
            
         }
@@ -128,6 +109,78 @@ class AgentMain extends React.Component {
         }
     };
 
+    fetchChat() {
+        FetchPost("/nova/embedding/search-task-vector-chat", {
+            "ChatHistory": this.getChatHistoryWithoutCitations(),
+            "TopK": 3,
+            "AudioDuration": this.state.audioDuration,
+        }, "NovaService").then((data) => {
+            var resp = data.body;
+            if (data.statusCode !== 200) {
+                this.setState( {status: null, alert: data.body});
+            }
+            else {
+                if (resp !== null) {
+                    var chatHistory = this.state.chatHistory;
+                    chatHistory.push(this.constructMessage("assistant", resp.reply, resp.citations));
+                    this.setState({loading: false, chatHistory: chatHistory}, () => {
+                        // Scroll to bottom after adding assistant message
+                        setTimeout(() => this.scrollToBottom(), 100);
+                    });
+                }
+            }
+        })
+        .catch((err) => {
+            this.setState( {status: null, alert: err.message});
+        });
+    }
+
+    async streamChat() {
+        // Citations arrive first, then the reply is appended token by token
+        const token = (await fetchAuthSession()).tokens?.accessToken?.toString();
+        const ws = new WebSocket(`${process.env.REACT_APP_RAG_WEBSOCKET_URL}?token=${encodeURIComponent(token)}`);
+        const historyLength = this.state.chatHistory.length;
+        let citations = [];
+        let reply = "";
+
+        const updateReply = () => {
+            var chatHistory = this.state.chatHistory.slice(0, historyLength);
+            chatHistory.push(this.constructMessage("assistant", reply, citations));
+            this.setState({loading: false, chatHistory: chatHistory});
+        };
+
+        ws.onopen = () => {
+            ws.send(JSON.stringify({
+                "action": "chat",
+                "ChatHistory": this.getChatHistoryWithoutCitations(),
+                "TopK": 3,
+            }));
+        };
+        ws.onmessage = (e) => {
+            const msg = JSON.parse(e.data);
+            if (msg.type === "citations") {
+                citations = msg.citations;
+                updateReply();
+            }
+            else if (msg.type === "delta") {
+                reply += msg.text;
+                updateReply();
+            }
+            else if (msg.type === "done") {
+                ws.close();
+            }
+            else if (msg.type === "error") {
+                this.setState({loading: false, alert: msg.message});
+                ws.close();
+            }
+        };
+        ws.onerror = () => {
+            // Fall back to the request/response endpoint
+            if (this.state.chatHistory.length === historyLength)
+                this.fetchChat();
+        };
+    }
+
     getChatHistoryWithoutCitations() {
         var chatHistory = this.state.chatHistory;
         var filtered = chatHistory.map(m => {
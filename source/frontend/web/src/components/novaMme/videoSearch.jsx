@@ -8,7 +8,7 @@ import VideoUpload from './videoUpload';
 import VideoPlayer from './videoPlayer';
 import LazyVideoPlayer from './lazyVideoPlayer';
 import AudioPlayer from './audioPlayer';
-import { DecimalToTimestamp, clusterDataByDistance, FormatSeconds } from "../../resources/utility"
+import { DecimalToTimestamp, clusterDataByDistance, FormatSeconds, DownscaleImageFile } from "../../resources/utility"
 import BroomIcon from "../../static/broom_button_icon.svg"
 import TextIcon from "../../static/textlogo.jpg"
 import AudioIcon from "../../static/audio-icon.png"
@@ -29,6 +29,7 @@ class VideoSearch extends React.Component {
             embedSearchItems: [],
             selectedItemId: null,
             pageSize: 9,
+            nextToken: null,
             mmScoreThreshold: 1.52,
             textScoreThreshold: 1.003,
             videoActiveTabId: "mmembed",
@@ -172,13 +173,13 @@ class VideoSearch extends React.Component {
         });
     }
 
-    searchAll() {
+    searchAll(nextToken = null) {
         const { username } = getCurrentUser().then((username) => {
             FetchPost("/nova/embedding/search-task", {
                 "SearchText": this.state.filterText,
                 "RequestBy": username.username,
-                "PageSize": this.state.pageSize,
-                "FromIndex": 0,
+                "PageSize": nextToken ? this.showMoreNumber : this.state.pageSize,
+                "NextToken": nextToken,
                 "TaskType": "tlabsmmembed"
             }, "NovaService").then((data) => {
                 var resp = data.body;
@@ -187,11 +188,13 @@ class VideoSearch extends React.Component {
                 }
                 else {
                     if (resp !== null) {
-                        var items = resp;
+                        var items = resp === null ? [] : resp;
                         //console.log(items);
                         this.setState(
                             {
-                                items: items === null ? [] : items,
+                                // A NextToken request fetches the following page only
+                                items: nextToken ? [...this.state.items, ...items] : items,
+                                nextToken: data.NextToken || null,
                                 status: null,
                                 alert: null,
                             }
@@ -217,9 +220,7 @@ class VideoSearch extends React.Component {
                 "RequestBy": username.username,
                 "PageSize": this.state.pageSize,
                 "FromIndex": 0,
-                "InputType": this.state.inputBytes ? "image" : "text",
                 "EmbeddingOptions": this.state.selectedSearchOptionId === "all" ? null : [this.state.selectedSearchOptionId],
-                "InputFormat": this.state.uploadedFile && this.state.uploadedFile.length > 0 ? this.state.uploadedFile[0].type.split("/")[1] : ""
             }, "NovaService").then((data) => {
                 var resp = data.body;
                 if (data.statusCode !== 200) {
@@ -283,16 +284,20 @@ class VideoSearch extends React.Component {
         const file = files[0];
 
         if (file) {
-            const reader = new FileReader();
-
-            //const base64Str = reader.result;
-            reader.onloadend = () => {
+            // Downscale before upload; fall back to the original bytes if the browser can't decode it
+            DownscaleImageFile(file).then((dataUrl) => {
                 this.setState({
-                    inputBytes: reader.result,
+                    inputBytes: dataUrl,
                 });
-            };
-
-            reader.readAsDataURL(file);
+            }).catch(() => {
+                const reader = new FileReader();
+                reader.onloadend = () => {
+                    this.setState({
+                        inputBytes: reader.result,
+                    });
+                };
+                reader.readAsDataURL(file);
+            });
         }
     };
 
@@ -582,7 +587,14 @@ class VideoSearch extends React.Component {
                     <div className="showmore">
                         <Button
                             loading={this.state.status === "loading"}
+                            disabled={!this.state.filterText && !this.state.inputBytes && !this.state.nextToken}
                             onClick={() => {
+                                if (!this.state.filterText && !this.state.inputBytes) {
+                                    // Task list: fetch the next page after the cursor
+                                    this.setState({ status: "loading" });
+                                    this.searchAll(this.state.nextToken);
+                                    return;
+                                }
                                 this.setState({ pageSize: this.state.pageSize + this.showMoreNumber });
                                 this.searchTimer = setTimeout(() => {
                                     this.populateItems();
@@ -90,6 +90,10 @@ class VideoUpload extends React.Component {
         }
     }
 
+    uploadStorageKey (file) {
+        return `nova-mme-upload:${file.name}:${file.size}:${file.lastModified}`;
+    }
+
     generatePresignedUrls (file) {
         // Wait if other file is uploading
         if (this.state.currentUploadingFileName !== null)
@@ -97,31 +101,42 @@ class VideoUpload extends React.Component {
                 console.log(`Waiting`);
             }, 1000); 
 
-        this.setState({currentUploadingFileName: file.name})
-        //console.log(fileName);
-        const fileSize = file.size;
-        const numChunks = Math.ceil(fileSize / (5 * 1024 * 1024));
-        this.setState({numChunks: numChunks});  
+        this.setState({currentUploadingFileName: file.name, uploadedChunks: 0, status: "generateurl"})
+
+        // Resume an interrupted upload of the same file, otherwise start a new one
+        const saved = JSON.parse(localStorage.getItem(this.uploadStorageKey(file)) || "null");
+        const create = () => FetchPost("/util/nova-srv-manage-s3-presigned-url", {"FileName": file.name, "FileSize": file.size, "Action": "create"}, "NovaService");
+        const request = saved === null ? create() :
+            FetchPost("/util/nova-srv-manage-s3-presigned-url", {...saved, "FileSize": file.size, "Action": "resume"}, "NovaService")
+                .then((data) => {
+                    if (data.statusCode === 200) return data;
+                    localStorage.removeItem(this.uploadStorageKey(file));
+                    return create();
+                });
 
-        this.setState({status: "generateurl"});
-        FetchPost("/util/nova-srv-manage-s3-presigned-url", {"FileName": file.name, "NumParts": numChunks, "Action": "create"}, "NovaService")
+        request
             .then((data) => {
-                  //console.log(resp);
                   if (data.statusCode !== 200) {
                     this.setState( {status: null, alert: data.body});
                   }
                   else {
                       if (data.body) {
+                          const missingParts = data.body.MissingParts || Array.from({length: data.body.PartCount}, (_, i) => i + 1);
+                          localStorage.setItem(this.uploadStorageKey(file), JSON.stringify(
+                              {"TaskId": data.body.TaskId, "FileName": data.body.FileName, "UploadId": data.body.UploadId}));
+                          this.setState({numChunks: data.body.PartCount, uploadedChunks: data.body.PartCount - missingParts.length});
                           return this.uploadFile({
                             taskId: data.body.TaskId,
-                            uploadS3Url: data.body.UploadUrl,
                             uploadedS3Bucket: data.body.S3Bucket,
                             uploadedS3KeyVideo: data.body.S3Key,
                             status: null,
                             alert: null,
                             uploadId: data.body.UploadId,
-                            uploadPartUrls: data.body.UploadPartUrls,
-                            numChunks: numChunks
+                            partSize: data.body.PartSize,
+                            concurrency: data.body.Concurrency,
+                            partUrls: data.body.PartUrls,
+                            uploadedParts: data.body.UploadedParts || [],
+                            missingParts: missingParts
                         })
                       }
                   }
@@ -131,109 +146,106 @@ class VideoUpload extends React.Component {
               });  
     }
 
-    async submitTask (urlResp) {
-        //console.log(urlResp);
-        var payload = this.state.request;
-        payload.TaskId = urlResp.taskId;
+    startTaskRequest () {
+        // start-task request without TaskId and File: the upload service fills them in
+        var payload = {...this.state.request};
         payload.FileName = this.state.uploadFiles[0].name;
         payload.TaskName = this.state.taskName;
-        payload.File = {
-              "S3Object": {
-                "Bucket": urlResp.uploadedS3Bucket,
-                "Key": urlResp.uploadedS3KeyVideo,
-              },
-            };
-        //console.log(payload)
-
-        this.setState({status: "loading"});
-        const { username } = getCurrentUser().then((username) => {
-            payload["RequestBy"] = username.username;
-            // Start task
-            FetchPost('/nova/embedding/start-task', payload, "NovaService")
-                .then((data) => {
-                    this.setState({currentUploadingFileName: null})
-                    var resp = data.body;
-                    if (data.statusCode !== 200) {
-                        //console.log(data.body);
-                        this.setState( {status: null, alert: data.body});
-                    }
-                    else {
-                        if (this.state.fileUploadedCounter == this.state.uploadFiles.length) {
-                            this.resetState(null);
-                            this.props.onSubmit();
-                        }
-                    }
-                })
-                .catch((err) => {
-                    this.setState({currentUploadingFileName: null})
-                    //console.log(err.message);
-                    this.setState( {status: null, alert: err.message});
-                });                      
-            }
-        )
-
+        return payload;
     }
 
     async uploadFile(urlResp) {
         this.setState({status: "uploading"});
         let file = this.state.uploadFiles[0];
-        if (urlResp.uploadPartUrls === null || urlResp.uploadPartUrls.length === 0) return;
-            //console.log(this.state);
-            // Upload each part to the corresponding pre-signed URL
-            const uploadPromises = [];
-            let parts = [];
-            for (let i = 0; i < urlResp.numChunks; i++) {
-              const startByte = i * (5 * 1024 * 1024);
-              const endByte = Math.min(startByte + (5 * 1024 * 1024), file.size);
-              const chunk = file.slice(startByte, endByte);
-        
-              const formData = new FormData();
-              formData.append('file', chunk);
-        
-              let retries = 0;
-              const uploadPromise = await fetch(urlResp.uploadPartUrls[i], {
-                method: 'PUT',
-                headers: {'Content-Type': ''},
-                body: chunk,
-              }).then((response) => {
-                if (response.ok) {
-                    //console.log(response.headers.get('Etag'));
-                    parts.push({'ETag': response.headers.get('Etag'), 'PartNumber': i + 1})
-                    this.setState({uploadedChunks: this.state.uploadedChunks + 1})
-                    //console.log("uploaded", i, parts);
-                    //console.log(this.state);
+        const urls = {};
+        urlResp.partUrls.forEach((p) => { urls[p.PartNumber] = p.Url; });
+        const parts = [...urlResp.uploadedParts];
+        const queue = [...urlResp.missingParts];
+
+        // Part URLs are signed in windows as the upload reaches them
+        const getPartUrl = async (partNumber) => {
+            if (!urls[partNumber]) {
+                const data = await FetchPost("/util/nova-srv-manage-s3-presigned-url", {
+                    "TaskId": urlResp.taskId,
+                    "FileName": file.name,
+                    "UploadId": urlResp.uploadId,
+                    "PartNumbers": [partNumber, ...queue.slice(0, 23)],
+                    "Action": "sign-parts"
+                }, "NovaService");
+                if (data.statusCode !== 200) throw new Error(data.body);
+                data.body.PartUrls.forEach((p) => { urls[p.PartNumber] = p.Url; });
+            }
+            return urls[partNumber];
+        };
+
+        const uploadPart = async (partNumber) => {
+            const startByte = (partNumber - 1) * urlResp.partSize;
+            const chunk = file.slice(startByte, Math.min(startByte + urlResp.partSize, file.size));
+            for (let attempt = 0; ; attempt++) {
+                try {
+                    const response = await fetch(await getPartUrl(partNumber), {
+                        method: 'PUT',
+                        headers: {'Content-Type': ''},
+                        body: chunk,
+                    });
+                    if (!response.ok) throw new Error(`Part ${partNumber} failed: ${response.status}`);
+                    return {'ETag': response.headers.get('Etag'), 'PartNumber': partNumber};
                 }
-              });
-              uploadPromises.push(uploadPromise);
-            };
+                catch (err) {
+                    if (attempt >= 3) throw err;
+                    await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+                }
+            }
+        };
+
+        // A fixed number of workers keep that many parts in flight
+        const worker = async () => {
+            while (queue.length > 0) {
+                const part = await uploadPart(queue.shift());
+                parts.push(part);
+                this.setState({uploadedChunks: this.state.uploadedChunks + 1});
+            }
+        };
 
-            await Promise.all(uploadPromises).then(() => {
-                    this.setState({fileUploadedCounter: this.state.fileUploadedCounter + 1});
-                    //console.log("all completed");
+        try {
+            await Promise.all(Array.from({length: urlResp.concurrency || 4}, worker));
+        }
+        catch (err) {
+            this.setState({status: null, currentUploadingFileName: null, alert: `Upload interrupted: ${err.message}. Submit again to resume.`});
+            return;
+        }
+        this.setState({fileUploadedCounter: this.state.fileUploadedCounter + 1});
+
+        // Complete the upload; the service starts the embedding task in the same call
+        this.setState({status: "loading"});
+        getCurrentUser().then((username) => {
+            let payload = {
+                "TaskId": urlResp.taskId,
+                "FileName": file.name, 
+                "MultipartUpload": parts, 
+                "UploadId": urlResp.uploadId, 
+                "Action": "complete",
+                "StartTask": {...this.startTaskRequest(), "RequestBy": username.username}
+            };
+            return FetchPost("/util/nova-srv-manage-s3-presigned-url", payload, "NovaService");
+        })
+        .then((result) => {
+            this.setState({currentUploadingFileName: null});
+            if (result.statusCode !== 200) {
+                this.setState( {status: null, alert: result.body});
+            }
+            else {
+                localStorage.removeItem(this.uploadStorageKey(file));
+                this.setState( {alert: null});
+                if (this.state.fileUploadedCounter == this.state.uploadFiles.length) {
+                    this.resetState(null);
+                    this.props.onSubmit();
                 }
-            ).then((response) => {
-                // Call complete endpoint
-                let payload = {
-                    "TaskId": urlResp.taskId,
-                    "FileName": file.name, 
-                    "MultipartUpload": parts, 
-                    "UploadId": urlResp.uploadId, 
-                    "Action": "complete"
-                };
-                FetchPost("/util/nova-srv-manage-s3-presigned-url", payload, "NovaService")
-                .then((result) => {
-                    if (result.statusCode !== 200) {
-                        this.setState( {alert: result.body});
-                    }
-                    else {
-                        this.setState( {alert: null});
-                        this.submitTask(urlResp);
-                    }   
-                })
-                .catch((err) => {
-                    this.setState( {alert: err.message});
-                })
-            });
+            }   
+        })
+        .catch((err) => {
+            this.setState( {status: null, currentUploadingFileName: null, alert: err.message});
+        })
     }
 
     handelFileChange = (e) => {
@@ -160,4 +160,31 @@ function clusterDataByDistance(data) {
             };
         });
       }
-export {ConvertUtcToLocal, CalculateTimeDifference, DecimalToTimestamp, FormatSeconds, CombineAndDedupArrays, IsValidNumber, clusterDataByDistance};
\ No newline at end of file
+
+function DownscaleImageFile(file, maxEdge = 1024, quality = 0.85) {
+  // Decode the image in the browser and re-encode it as a compact JPEG data URL,
+  // so large photos are not sent to the search API at full resolution.
+  return new Promise((resolve, reject) => {
+    const url = URL.createObjectURL(file);
+    const img = new Image();
+    img.onload = () => {
+      const scale = Math.min(1, maxEdge / Math.max(img.width, img.height));
+      const canvas = document.createElement('canvas');
+      canvas.width = Math.round(img.width * scale);
+      canvas.height = Math.round(img.height * scale);
+      const ctx = canvas.getContext('2d');
+      ctx.fillStyle = '#ffffff';
+      ctx.fillRect(0, 0, canvas.width, canvas.height);
+      ctx.drawImage(img, 0, 0, canvas.width, canvas.height);
+      URL.revokeObjectURL(url);
+      resolve(canvas.toDataURL('image/jpeg', quality));
+    };
+    img.onerror = (err) => {
+      URL.revokeObjectURL(url);
+      reject(err);
+    };
+    img.src = url;
+  });
+}
+
+export {ConvertUtcToLocal, CalculateTimeDifference, DecimalToTimestamp, FormatSeconds, CombineAndDedupArrays, IsValidNumber, clusterDataByDistance, DownscaleImageFile};
\ No newline at end of file
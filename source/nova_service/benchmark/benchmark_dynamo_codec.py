@@ -0,0 +1,171 @@
+'''
+Benchmark the nova_common DynamoDB codec against the resource-layer path it replaces.
+
+Documents are shaped like video task items after metadata extraction: the echoed request,
+video metadata, frame sampling progress, scene keyframes, sprite and waveform indexes, and
+per-embedding segment counts.
+- resource path: the per-Lambda float -> Decimal conversion, then boto3's TypeSerializer;
+  TypeDeserializer, then Decimal -> float on the way back
+- codec: nova_common.codec serialize_item / deserialize_item
+
+Runs locally without AWS access. The resource path needs boto3; without it only the codec is timed.
+
+Usage:
+    python benchmark_dynamo_codec.py [--items 200] [--scenes 40] [--rounds 5]
+'''
+import argparse
+import decimal
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../layer/nova_common/python"))
+from nova_common import codec
+
+def make_task(scenes):
+    task_id = str(uuid.uuid4())
+    duration = round(random.uniform(30, 3600), 3)
+    key = f"tasks/{task_id}/upload/clip.mp4"
+    return {
+        "Id": task_id,
+        "Request": {
+            "TaskId": task_id,
+            "FileName": "clip.mp4",
+            "TaskName": "Product demo",
+            "RequestBy": "demo-user",
+            "EmbeddingOptions": ["visual-text", "audio"],
+            "SegmentationConfig": {"DurationSeconds": 5},
+            "File": {"S3Object": {"Bucket": "nova-mme-data", "Key": key}},
+        },
+        "RequestTs": "2026-10-18T09:30:00.000000+00:00",
+        "RequestBy": "demo-user",
+        "Name": "clip.mp4",
+        "Modality": "video",
+        "Status": "completed",
+        "InvocationArn": f"arn:aws:bedrock:us-east-1:123456789012:async-invoke/{task_id[:12]}",
+        "EmbedCompleteTs": "2026-10-18T09:34:12.000000+00:00",
+        "SegmentCounts": {"visual-text": int(duration // 5) + 1, "audio": int(duration // 5) + 1},
+        "MetaData": {
+            "TrasnscriptionOutput": None,
+            "VideoMetaData": {
+                "Duration": duration,
+                "Fps": 29.97,
+                "Resolution": [1920, 1080],
+                "Size": random.randint(10 ** 7, 10 ** 9),
+                "Codec": "h264",
+                "ThumbnailS3Key": f"tasks/{task_id}/thumbnail.jpeg",
+                "HasAudio": True,
+            },
+            "VideoFrameS3": {
+                "TotalFramesPlaned": int(duration),
+                "TotalFramesSampled": int(duration),
+                "S3Bucket": "nova-mme-data",
+                "S3Prefix": f"tasks/{task_id}/video_frame_/",
+            },
+            "Scenes": {
+                "Count": scenes,
+                "S3Bucket": "nova-mme-data",
+                "S3Prefix": f"tasks/{task_id}/scenes/",
+                "Items": [{
+                    "StartSec": round(i * duration / scenes, 3),
+                    "EndSec": round((i + 1) * duration / scenes, 3),
+                    "KeyframeSec": round((i + 0.5) * duration / scenes, 3),
+                    "Score": random.random(),
+                    "KeyframeS3Key": f"tasks/{task_id}/scenes/{i}.jpg",
+                } for i in range(scenes)],
+            },
+            "Sprites": {
+                "S3Bucket": "nova-mme-data",
+                "S3Prefix": f"tasks/{task_id}/sprites/",
+                "Sheets": [f"sprite_{i}.jpg" for i in range(4)],
+                "IntervalS": 4,
+                "TileWidth": 160,
+                "TileHeight": 90,
+                "Columns": 10,
+                "Rows": 10,
+                "TileCount": 400,
+            },
+            "Waveform": {
+                "S3Bucket": "nova-mme-data",
+                "S3Key": f"tasks/{task_id}/waveform.dat",
+                "Format": "audiowaveform-dat",
+                "Bits": 8,
+                "SampleRate": 8000,
+                "SamplesPerPixel": 160,
+                "Length": int(duration * 50),
+            },
+        },
+    }
+
+def to_decimal(item):
+    '''The per-Lambda convert_to_dynamo_format.'''
+    if isinstance(item, dict):
+        return {k: to_decimal(v) for k, v in item.items()}
+    elif isinstance(item, list):
+        return [to_decimal(v) for v in item]
+    elif isinstance(item, float):
+        return decimal.Decimal(str(item))
+    return item
+
+def to_float(obj):
+    '''The per-Lambda convert_decimal_to_float.'''
+    if isinstance(obj, list):
+        return [to_float(i) for i in obj]
+    elif isinstance(obj, dict):
+        return {k: to_float(v) for k, v in obj.items()}
+    elif isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return obj
+
+def timed(fn, items, rounds):
+    '''Best of rounds, in seconds, and the last result.'''
+    best, result = None, None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = [fn(item) for item in items]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--scenes", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    tasks = [make_task(args.scenes) for _ in range(args.items)]
+
+    codec_write, encoded = timed(codec.serialize_item, tasks, args.rounds)
+    codec_read, decoded = timed(codec.deserialize_item, encoded, args.rounds)
+    # Round trip must be lossless for native documents
+    mismatches = sum(a != b for a, b in zip(tasks, decoded))
+
+    try:
+        from boto3.dynamodb.types import TypeSerializer, TypeDeserializer
+    except ImportError:
+        TypeSerializer = None
+
+    print(f"{args.items} task items, {args.scenes} scenes each, best of {args.rounds}")
+    print(f"{'':16}{'resource path':>16}{'codec':>12}{'speedup':>10}")
+    if TypeSerializer is None:
+        print(f"{'write (ms)':16}{'-':>16}{codec_write * 1000:>12.1f}")
+        print(f"{'read (ms)':16}{'-':>16}{codec_read * 1000:>12.1f}")
+        print("boto3 not installed: resource path not timed")
+    else:
+        serializer, deserializer = TypeSerializer(), TypeDeserializer()
+        legacy_write, legacy_encoded = timed(
+            lambda task: {k: serializer.serialize(v) for k, v in to_decimal(task).items()}, tasks, args.rounds)
+        legacy_read, _ = timed(
+            lambda item: to_float({k: deserializer.deserialize(v) for k, v in item.items()}), legacy_encoded, args.rounds)
+        print(f"{'write (ms)':16}{legacy_write * 1000:>16.1f}{codec_write * 1000:>12.1f}{legacy_write / codec_write:>9.1f}x")
+        print(f"{'read (ms)':16}{legacy_read * 1000:>16.1f}{codec_read * 1000:>12.1f}{legacy_read / codec_read:>9.1f}x")
+        if legacy_encoded != encoded:
+            print("warning: codec output differs from TypeSerializer")
+    print(f"round trip mismatches: {mismatches}")
+
+if __name__ == "__main__":
+    main()
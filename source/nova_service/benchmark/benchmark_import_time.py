@@ -0,0 +1,99 @@
+'''
+Benchmark Lambda handler import time, the part of a cold start spent before the handler runs.
+
+Each handler module is imported in a fresh interpreter, with its Lambda directory and the
+nova_common layer on sys.path, and the median wall time over --runs imports is reported.
+With --baseline the same handlers are measured in the tree at a git ref (e.g. the commit
+before lazy clients) and shown side by side.
+
+Runs locally without AWS access: building a boto3 client needs a region but no credentials,
+so AWS_DEFAULT_REGION defaults to us-east-1. Handlers whose imports fail (e.g. a dependency
+that a Lambda layer provides is not installed locally) are reported with the error.
+
+Usage:
+    python benchmark_import_time.py [--runs 5] [--baseline REF] [lambda_name ...]
+'''
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+SOURCE = os.path.join("source", "nova_service")
+
+CHILD = '''
+import importlib, sys, time
+sys.path[:0] = {paths!r}
+start = time.perf_counter()
+importlib.import_module({module!r})
+print(time.perf_counter() - start)
+'''
+
+def repo_root():
+    return subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True, text=True, check=True).stdout.strip()
+
+def extract_tree(root, ref, target):
+    '''Write source/nova_service as of ref under target.'''
+    archive = subprocess.run(["git", "archive", "--format=tar", ref, SOURCE], cwd=root,
+                             capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target, filter="data")
+
+def measure(tree, name, runs):
+    '''Median import time in seconds of the handler, or the error message.'''
+    lambda_dir = os.path.join(tree, SOURCE, "lambda", name)
+    paths = [lambda_dir, os.path.join(tree, SOURCE, "layer", "nova_common", "python")]
+    env = {**os.environ, "AWS_DEFAULT_REGION": os.environ.get("AWS_DEFAULT_REGION", "us-east-1")}
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", CHILD.format(paths=paths, module=name)],
+                                cwd=lambda_dir, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            return result.stderr.strip().splitlines()[-1]
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+def format_result(result):
+    return f"{result * 1000:.0f}" if isinstance(result, float) else "error"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("lambdas", nargs="*", help="Lambda directory names; all by default")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", help="git ref to compare against")
+    args = parser.parse_args()
+
+    root = repo_root()
+    names = args.lambdas or sorted(os.listdir(os.path.join(root, SOURCE, "lambda")))
+
+    with tempfile.TemporaryDirectory() as baseline_tree:
+        if args.baseline:
+            extract_tree(root, args.baseline, baseline_tree)
+
+        errors = []
+        header = f"{'import (ms, median of ' + str(args.runs) + ')':44}"
+        header += f"{args.baseline:>12}{'current':>12}" if args.baseline else f"{'current':>12}"
+        print(header)
+        for name in names:
+            current = measure(root, name, args.runs)
+            row = f"{name:44}"
+            if args.baseline:
+                baseline = measure(baseline_tree, name, args.runs) \
+                    if os.path.isdir(os.path.join(baseline_tree, SOURCE, "lambda", name)) else "not in baseline"
+                row += f"{format_result(baseline):>12}"
+                if not isinstance(baseline, float):
+                    errors.append(f"{name} ({args.baseline}): {baseline}")
+            row += f"{format_result(current):>12}"
+            if not isinstance(current, float):
+                errors.append(f"{name}: {current}")
+            print(row)
+
+    for error in errors:
+        print(error)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+'''
+Benchmark thumbnail selection: local keyframe scoring vs. the per-second model loop.
+
+Runs against a local video file without AWS access. The per-second loop is replayed locally:
+each second is extracted with ffmpeg and judged with the local scorer in place of the model,
+and the S3 uploads and model calls it would have made are counted and costed with
+--model-latency-s / --upload-latency-s.
+
+Requires the nova-srv-get-video-metadata dependencies (numpy, moviepy/imageio-ffmpeg).
+
+Usage:
+    python benchmark_thumbnail.py <video_file> [--model-latency-s 1.5] [--upload-latency-s 0.1]
+'''
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../lambda/nova-srv-get-video-metadata"))
+import numpy as np
+import media_probe
+import thumbnail_selector
+
+ACCEPT_SCORE = 0.3
+
+def read_gray(path, resolution):
+    '''Decode a single extracted JPEG to the selector's grayscale size.'''
+    timestamps, frames = thumbnail_selector.decode_candidates(path, None, resolution, window_s=1, max_candidates=1)
+    return frames
+
+def run_per_second_loop(video, duration, resolution, workdir):
+    frame_path = os.path.join(workdir, "legacy.jpeg")
+    extractions, t = 0, 0
+    for t in range(0, int(duration)):
+        media_probe.extract_frame(video, t, frame_path)
+        extractions += 1
+        frames = read_gray(frame_path, resolution)
+        if frames is not None and thumbnail_selector.score_frames(frames)[0] >= ACCEPT_SCORE:
+            break
+    return t, extractions
+
+def run_scored_selection(video, duration, resolution, workdir):
+    ranked = thumbnail_selector.rank_candidates(video, duration, resolution)
+    if not ranked:
+        return None, 0, 0
+    media_probe.extract_frame(video, ranked[0][0], os.path.join(workdir, "scored.jpeg"))
+    return ranked[0][0], len(ranked), 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("video")
+    parser.add_argument("--model-latency-s", type=float, default=1.5)
+    parser.add_argument("--upload-latency-s", type=float, default=0.1)
+    args = parser.parse_args()
+
+    probe = media_probe.probe_ffmpeg(args.video)
+    if probe is None:
+        sys.exit(f"Unable to probe {args.video}")
+    duration, resolution = probe["Duration"], probe["Resolution"]
+    print(f"{args.video}: {duration:.1f}s {resolution[0]}x{resolution[1]} @ {probe['Fps']} fps")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        legacy_t, legacy_frames = run_per_second_loop(args.video, duration, resolution, workdir)
+        legacy_local = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scored_t, candidates, scored_frames = run_scored_selection(args.video, duration, resolution, workdir)
+        scored_local = time.perf_counter() - start
+
+    legacy_remote = legacy_frames * (args.model_latency_s + args.upload_latency_s)
+    scored_remote = scored_frames * args.upload_latency_s
+
+    print(f"{'':22}{'per-second loop':>18}{'scored':>12}")
+    print(f"{'thumbnail at (s)':22}{legacy_t:>18}{np.round(scored_t or 0, 2):>12}")
+    print(f"{'frames decoded':22}{legacy_frames:>18}{candidates:>12}")
+    print(f"{'uploads':22}{legacy_frames:>18}{scored_frames:>12}")
+    print(f"{'model calls':22}{legacy_frames:>18}{0:>12}")
+    print(f"{'local time (s)':22}{legacy_local:>18.2f}{scored_local:>12.2f}")
+    print(f"{'est. total time (s)':22}{legacy_local + legacy_remote:>18.2f}{scored_local + scored_remote:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,70 @@
 import json
-import boto3
 import os
 import utils
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from nova_common import clients
 
 DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
+DYNAMO_TASK_NAME_INDEX_TABLE = os.environ.get("DYNAMO_TASK_NAME_INDEX_TABLE")
 NOVA_S3_VECTOR_BUCKET = os.environ.get("NOVA_S3_VECTOR_BUCKET")
 NOVA_S3_VECTOR_INDEX = os.environ.get("NOVA_S3_VECTOR_INDEX")
+LIBRARY_EPOCH_S3_KEY = os.environ.get("LIBRARY_EPOCH_S3_KEY", "cache/library-epoch")
+DELETE_JOB_S3_BUCKET = os.environ.get("DELETE_JOB_S3_BUCKET")
+DELETE_JOB_S3_KEY_TEMPLATE = "deletions/{job_id}.json"
+DELETE_JOB_MAX_TASKS = int(os.environ.get("DELETE_JOB_MAX_TASKS", 10000))
+DELETE_JOB_BATCH_SIZE = int(os.environ.get("DELETE_JOB_BATCH_SIZE", 20))
+DELETE_JOB_WORKERS = int(os.environ.get("DELETE_JOB_WORKERS", 4))
+DELETE_JOB_TOMBSTONE_WORKERS = 16
+# Hand the remaining tasks over to a new invocation when less time than this is left
+DELETE_JOB_CONTINUE_BEFORE_TIMEOUT_MS = 120000
 
 OUTPUT_KEY_PREFIX_TEMPLATE = "tasks/{task_id}/nova-mme/"
 S3_KEY_PREFIX_TEMPLATE = "tasks/{task_id}/"
+CLIP_INDEX_S3_KEY_TEMPLATE = "tasks/{task_id}/clip-index.json"
 
-s3 = boto3.client('s3')
-s3vectors = boto3.client('s3vectors') 
+# S3 Vectors limits: 500 keys per DeleteVectors, 100 per GetVectors
+DELETE_VECTORS_BATCH_SIZE = 500
+GET_VECTORS_BATCH_SIZE = 100
+DELETE_VECTORS_WORKERS = 4
+DELETE_VECTORS_MAX_ATTEMPTS = 5
+
+s3 = clients.lazy('s3')
+s3vectors = clients.lazy('s3vectors')
+lambda_client = clients.lazy('lambda')
 
 def lambda_handler(event, context):
+    # Bulk delete worker, invoked asynchronously by this function
+    if "DeleteJob" in event:
+        return run_delete_job(event["DeleteJob"], context)
+
+    if event.get("Action") == "status":
+        job_id = event.get("JobId")
+        if not job_id:
+            return {
+                'statusCode': 400,
+                'body': 'Require JobId'
+            }
+        try:
+            progress = get_json(DELETE_JOB_S3_KEY_TEMPLATE.format(job_id=job_id))
+        except s3.exceptions.NoSuchKey:
+            return {
+                'statusCode': 400,
+                'body': f'Delete job does not exist: {job_id}'
+            }
+        # The task list is the worker's input, not part of the status
+        progress.pop("TaskIds", None)
+        return {
+            'statusCode': 200,
+            'body': progress
+        }
+
+    task_ids = event.get("TaskIds")
+    if task_ids:
+        return start_delete_job(task_ids, event.get("RequestBy"), context)
+
     task_id = event.get("TaskId")
     delete_s3 = event.get("DeleteS3", True)
     if task_id is None:
@@ -21,74 +72,294 @@ def lambda_handler(event, context):
             'statusCode': 400,
             'body': json.dumps('Require TaskId')
         }
-    
+
+    status_code, message = delete_task(task_id)
+    return {
+        'statusCode': status_code,
+        'body': message
+    }
+
+def delete_task(task_id):
+    '''Delete the task's vectors, S3 folder, name index entries and table item. Returns (status code, message).'''
     # Get video task from DB
     task = None
     try:
         task = utils.dynamodb_get_by_id(DYNAMO_VIDEO_TASK_TABLE, task_id)
     except Exception as ex:
         print(f'Task does not exist in {DYNAMO_VIDEO_TASK_TABLE}: {task_id}')
+    if not task:
+        return 400, f'Task does not exist: {task_id}'
 
     s3_bucket = task["Request"]["File"]["S3Object"]["Bucket"]
 
     # Delete S3 vectors
-    delete_s3_vectors(s3_bucket, 
-        OUTPUT_KEY_PREFIX_TEMPLATE.format(task_id=task_id), 
-        NOVA_S3_VECTOR_BUCKET, 
-        NOVA_S3_VECTOR_INDEX, 
-        task_id
-    )
+    keys = get_vector_keys(s3_bucket, task)
+    remaining = delete_s3_vectors(NOVA_S3_VECTOR_BUCKET, NOVA_S3_VECTOR_INDEX, keys)
+    if remaining:
+        # Keep the task and its outputs so the delete can be retried
+        return 500, f'Failed to delete {len(remaining)} of {len(keys)} vectors for task: {task_id}'
+
+    # Removed vectors change search results: invalidate cached RAG answers
+    bump_library_epoch(s3_bucket)
 
     # Delete S3 task folder
     delete_s3_folder(s3_bucket, S3_KEY_PREFIX_TEMPLATE.format(task_id=task_id))
 
+    # Delete from the name search index
+    if DYNAMO_TASK_NAME_INDEX_TABLE:
+        utils.dynamodb_unindex_task_names(DYNAMO_TASK_NAME_INDEX_TABLE, task_id,
+            [task["Request"].get("FileName"), task["Request"].get("TaskName")])
+
     # Delete from DynamoDB task table
     try:
         utils.dynamodb_delete_task_by_id(DYNAMO_VIDEO_TASK_TABLE, task_id)
     except Exception as ex:
         print(f'Failed to delete task {task_id} from index: {DYNAMO_VIDEO_TASK_TABLE}', ex)
 
+    return 200, f'File task deleted: {task_id}'
+
+# ==== Bulk Delete ====
+# Tasks are tombstoned (Status=deleting) up front so search and listing hide them at once.
+# A worker invocation then deletes them DELETE_JOB_BATCH_SIZE at a time, DELETE_JOB_WORKERS
+# in parallel. The job document in S3 holds the task ids and the progress, including the
+# offset of the next batch, and is written after every batch. The worker event only carries
+# the JobId, so it stays small whatever the number of tasks, and a retried or continued
+# worker resumes from the stored offset.
+
+def put_json(key, data):
+    s3.put_object(Bucket=DELETE_JOB_S3_BUCKET, Key=key, Body=json.dumps(data), ContentType="application/json")
+
+def get_json(key):
+    return json.loads(s3.get_object(Bucket=DELETE_JOB_S3_BUCKET, Key=key)["Body"].read())
+
+def start_delete_job(task_ids, request_by, context):
+    # A bare string would otherwise be taken as one task id per character
+    if not isinstance(task_ids, list) or not all(isinstance(task_id, str) and task_id for task_id in task_ids):
+        return {
+            'statusCode': 400,
+            'body': 'TaskIds must be a list of task ids'
+        }
+    task_ids = list(dict.fromkeys(task_ids))
+    if len(task_ids) > DELETE_JOB_MAX_TASKS:
+        return {
+            'statusCode': 400,
+            'body': f'At most {DELETE_JOB_MAX_TASKS} tasks per request'
+        }
+
+    with ThreadPoolExecutor(max_workers=DELETE_JOB_TOMBSTONE_WORKERS) as executor:
+        exists = list(executor.map(lambda task_id: utils.dynamodb_task_tombstone(DYNAMO_VIDEO_TASK_TABLE, task_id), task_ids))
+    tombstoned = [task_id for task_id, ok in zip(task_ids, exists) if ok]
+    # Hidden tasks change search results: invalidate cached RAG answers
+    bump_library_epoch(DELETE_JOB_S3_BUCKET)
+
+    job_id = str(uuid.uuid4())
+    progress = {
+        "JobId": job_id,
+        "Status": "running" if tombstoned else "completed",
+        "RequestBy": request_by,
+        "Total": len(tombstoned),
+        "Deleted": 0,
+        "Failed": [],
+        "NotFound": [task_id for task_id, ok in zip(task_ids, exists) if not ok],
+        "BatchesCompleted": 0,
+        "Offset": 0,
+        "TaskIds": tombstoned,
+        "StartedTs": datetime.now(timezone.utc).isoformat(),
+    }
+    key = DELETE_JOB_S3_KEY_TEMPLATE.format(job_id=job_id)
+    put_json(key, progress)
+    if tombstoned:
+        try:
+            invoke_delete_job(context, job_id, 0)
+        except Exception as ex:
+            # The tombstones stay: the tasks remain hidden and can be deleted again
+            fail_delete_job(key, progress, f"Failed to start the worker: {ex}")
+            return {
+                'statusCode': 500,
+                'body': f'Failed to start delete job {job_id}: {ex}'
+            }
+    print(f"Delete job {job_id} started for {len(tombstoned)} tasks")
+
     return {
         'statusCode': 200,
-        'body': f'File task deleted: {task_id}'
+        'body': {"JobId": job_id, "Total": len(tombstoned), "NotFound": progress["NotFound"]}
     }
 
-def delete_s3_vectors(output_s3_bucket, output_s3_prefix, s3_vector_bucket, s3_vector_index, task_id):
-    # Get vectors Keys from S3 output jsonl
-    response = s3.list_objects_v2(Bucket=output_s3_bucket, Prefix=output_s3_prefix)
-    # Look for output.json
-    keys = []
-    output_key = None
-    for obj in response.get('Contents', []):
-        if obj['Key'].endswith('.jsonl'):
+def invoke_delete_job(context, job_id, offset):
+    lambda_client.invoke(
+        FunctionName=context.function_name,
+        InvocationType='Event',
+        # Offset is informational: the worker resumes from the offset in the job document
+        Payload=json.dumps({"DeleteJob": {"JobId": job_id, "Offset": offset}})
+    )
+
+def fail_delete_job(key, progress, error):
+    progress["Status"] = "failed"
+    progress["Error"] = error
+    progress["UpdatedTs"] = datetime.now(timezone.utc).isoformat()
+    try:
+        put_json(key, progress)
+    except Exception as ex:
+        print(f"Failed to record delete job failure: {ex}")
+    print(f"Delete job {progress['JobId']} failed: {error}")
+
+def delete_task_safe(task_id):
+    '''delete_task, with an unexpected error reported as a failed task instead of raised.'''
+    try:
+        return delete_task(task_id)
+    except Exception as ex:
+        return 500, f'Failed to delete task {task_id}: {ex}'
+
+def run_delete_job(job, context):
+    job_id = job["JobId"]
+    key = DELETE_JOB_S3_KEY_TEMPLATE.format(job_id=job_id)
+    progress = get_json(key)
+    if progress["Status"] != "running":
+        # Duplicate delivery of a finished job
+        return {
+            'statusCode': 200,
+            'body': {"Status": progress["Status"]}
+        }
+    task_ids = progress["TaskIds"]
+    offset = progress.get("Offset", 0)
+
+    try:
+        with ThreadPoolExecutor(max_workers=DELETE_JOB_WORKERS) as executor:
+            while offset < len(task_ids):
+                if context.get_remaining_time_in_millis() < DELETE_JOB_CONTINUE_BEFORE_TIMEOUT_MS:
+                    invoke_delete_job(context, job_id, offset)
+                    print(f"Delete job {job_id}: continuing at {offset}")
+                    return {
+                        'statusCode': 200,
+                        'body': {"Continued": True}
+                    }
+                batch = task_ids[offset:offset + DELETE_JOB_BATCH_SIZE]
+                for task_id, (status_code, message) in zip(batch, executor.map(delete_task_safe, batch)):
+                    if status_code == 200:
+                        progress["Deleted"] += 1
+                    else:
+                        # The tombstone stays: the task remains hidden and can be deleted again
+                        progress["Failed"].append({"TaskId": task_id, "Error": message})
+                offset += len(batch)
+                # Counts and offset are stored together, so a resumed worker never repeats a batch it counted
+                progress["Offset"] = offset
+                progress["BatchesCompleted"] += 1
+                progress["UpdatedTs"] = datetime.now(timezone.utc).isoformat()
+                put_json(key, progress)
+
+        progress["Status"] = "completed"
+        progress["CompletedTs"] = datetime.now(timezone.utc).isoformat()
+        put_json(key, progress)
+    except Exception as ex:
+        fail_delete_job(key, progress, str(ex))
+        return {
+            'statusCode': 500,
+            'body': {"Deleted": progress["Deleted"], "Failed": len(progress["Failed"]), "Error": str(ex)}
+        }
+
+    print(f"Delete job {job_id}: {progress['Deleted']} deleted, {len(progress['Failed'])} failed")
+    return {
+        'statusCode': 200,
+        'body': {"Deleted": progress["Deleted"], "Failed": len(progress["Failed"])}
+    }
+
+def bump_library_epoch(s3_bucket):
+    try:
+        s3.put_object(Bucket=s3_bucket, Key=LIBRARY_EPOCH_S3_KEY, Body=str(time.time_ns()))
+    except Exception as ex:
+        print(f"Failed to bump library epoch: {ex}")
+
+def get_vector_keys(s3_bucket, task):
+    '''
+    The task's vector keys, from the cheapest sources available:
+    1. VectorKeys in the clip index sidecar written by nova-srv-s3-listener
+    2. SegmentCounts on the task: keys are {task_id}_{option}_{segment index}, image is {task_id}_image
+    3. The embedding outputs, when the task has no SegmentCounts (tasks ingested before they were recorded)
+    The sidecar can miss options: its update gives up after repeated conflicts, and a sidecar
+    written by the nova-srv-get-task-clips fallback has none. So its keys are only ever added
+    to those of the other sources, never used instead of them.
+    '''
+    task_id = task["Id"]
+    keys = set()
+    try:
+        obj = s3.get_object(Bucket=s3_bucket, Key=CLIP_INDEX_S3_KEY_TEMPLATE.format(task_id=task_id))
+        for option_keys in (json.loads(obj["Body"].read()).get("VectorKeys") or {}).values():
+            keys.update(option_keys)
+    except s3.exceptions.NoSuchKey:
+        pass
+
+    segment_counts = task.get("SegmentCounts")
+    if segment_counts:
+        for embed_name, count in segment_counts.items():
+            if embed_name in ["image"]:
+                keys.add(f'{task_id}_{embed_name}')
+            else:
+                keys.update(f'{task_id}_{embed_name}_{i}' for i in range(int(count)))
+        return keys
+
+    return keys | get_vector_keys_from_outputs(s3_bucket, OUTPUT_KEY_PREFIX_TEMPLATE.format(task_id=task_id), task_id)
+
+def get_vector_keys_from_outputs(output_s3_bucket, output_s3_prefix, task_id):
+    keys = set()
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=output_s3_bucket, Prefix=output_s3_prefix):
+        for obj in page.get('Contents', []):
             output_key = obj['Key']
+            if "/nova-mme/search/" in output_key or not output_key.endswith('.jsonl'):
+                continue
             embed_name = output_key.split('/')[-1].replace(".jsonl","").replace("embedding-","")
-            if output_key:
-                #print("!!!", output_key)
-                obj = s3.get_object(Bucket=output_s3_bucket, Key=output_key)
-                content = obj['Body'].read().decode('utf-8')
-                for item in content.split('\n'):
-                    if item:
-                        embed = json.loads(item)
-
-                        key = None
-                        if embed_name in ["video", "audio", "audio-video"]:
-                            key = f'{task_id}_{embed_name}_{embed["segmentMetadata"]["segmentIndex"]}'
-                        elif embed_name in ["image"]:
-                            key = f'{task_id}_{embed_name}'
-                        elif embed_name in ["text"]:
-                            key = f'{task_id}_{embed_name}_{embed.get("segmentMetadata",{}).get("segmentIndex")}'
-
-
-                        if key not in keys:
-                            keys.append(key)
-    # Delete vectors from S3
-    if keys:
-        response = s3vectors.delete_vectors(
-            vectorBucketName=s3_vector_bucket,
-            indexName=s3_vector_index,
-            keys=keys
-        )
+            for line in s3.get_object(Bucket=output_s3_bucket, Key=output_key)['Body'].iter_lines():
+                if not line:
+                    continue
+                embed = json.loads(line)
+                if embed_name in ["video", "audio", "audio-video"]:
+                    keys.add(f'{task_id}_{embed_name}_{embed["segmentMetadata"]["segmentIndex"]}')
+                elif embed_name in ["image"]:
+                    keys.add(f'{task_id}_{embed_name}')
+                elif embed_name in ["text"]:
+                    keys.add(f'{task_id}_{embed_name}_{embed.get("segmentMetadata",{}).get("segmentIndex")}')
+    return keys
+
+def delete_s3_vectors(s3_vector_bucket, s3_vector_index, keys):
+    '''
+    Delete vectors in DeleteVectors-sized batches concurrently, then check which keys still
+    exist and retry those with backoff. Returns the keys that could not be deleted.
+    '''
+    remaining = sorted(keys)
+    for attempt in range(DELETE_VECTORS_MAX_ATTEMPTS):
+        if not remaining:
+            break
+        if attempt:
+            time.sleep(min(2 ** attempt * 0.2, 5))
+        batches = [remaining[i:i + DELETE_VECTORS_BATCH_SIZE] for i in range(0, len(remaining), DELETE_VECTORS_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=DELETE_VECTORS_WORKERS) as executor:
+            list(executor.map(lambda batch: delete_vector_batch(s3_vector_bucket, s3_vector_index, batch), batches))
+        remaining = get_existing_vector_keys(s3_vector_bucket, s3_vector_index, remaining)
+    print(f"Deleted {len(keys) - len(remaining)} of {len(keys)} vectors")
+    return remaining
+
+def delete_vector_batch(s3_vector_bucket, s3_vector_index, batch):
+    try:
+        s3vectors.delete_vectors(vectorBucketName=s3_vector_bucket, indexName=s3_vector_index, keys=batch)
+    except s3vectors.exceptions.ClientError as ex:
+        # Verification picks up whatever this batch left behind
+        print(f"delete_vectors failed for {len(batch)} keys: {ex}")
+
+def get_existing_vector_keys(s3_vector_bucket, s3_vector_index, keys):
+    batches = [keys[i:i + GET_VECTORS_BATCH_SIZE] for i in range(0, len(keys), GET_VECTORS_BATCH_SIZE)]
+
+    def get_batch(batch):
+        try:
+            response = s3vectors.get_vectors(vectorBucketName=s3_vector_bucket, indexName=s3_vector_index,
+                                             keys=batch, returnData=False, returnMetadata=False)
+        except Exception as ex:
+            # Unverified keys count as remaining: the next attempt deletes and checks them again
+            print(f"get_vectors failed for {len(batch)} keys: {ex}")
+            return batch
+        return [vector["key"] for vector in response.get("vectors", [])]
+
+    with ThreadPoolExecutor(max_workers=DELETE_VECTORS_WORKERS) as executor:
+        return [key for existing in executor.map(get_batch, batches) for key in existing]
 
 def delete_s3_folder(s3_bucket, s3_prefix):
     # List objects in the folder
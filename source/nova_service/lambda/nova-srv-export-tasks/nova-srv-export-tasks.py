@@ -0,0 +1,192 @@
+'''
+Export every task record to S3 as gzip NDJSON parts with a manifest.
+For admin and analytics use: the function is not exposed through the API and is run with
+lambda invoke, e.g. {"Action": "start", "RequestBy": "admin"} then {"Action": "status", "ExportId": ...}.
+1. Action "start": writes a running manifest and fans out one asynchronous invocation per scan
+   segment (Segment/TotalSegments), so segments are scanned in parallel.
+2. Segment invocation: scans its segment and uploads a part every PART_MAX_ITEMS items. Near the
+   Lambda timeout it re-invokes itself from the last evaluated key. When done it records the
+   segment result; the last segment to finish writes the completed manifest.
+3. Action "status": returns the manifest.
+Output: exports/{ExportId}/part-{segment}-{n}.ndjson.gz and exports/{ExportId}/manifest.json
+'''
+import json
+import os
+import gzip
+import uuid
+from datetime import datetime, timezone
+from nova_common import clients, dynamodb as ddb
+
+DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
+EXPORT_S3_BUCKET = os.environ.get("EXPORT_S3_BUCKET")
+EXPORT_S3_PREFIX = os.environ.get("EXPORT_S3_PREFIX", "exports/")
+EXPORT_TOTAL_SEGMENTS = int(os.environ.get("EXPORT_TOTAL_SEGMENTS", 16))
+PART_MAX_ITEMS = int(os.environ.get("EXPORT_PART_MAX_ITEMS", 20000))
+# Hand the segment over to a new invocation when less time than this is left
+CONTINUE_BEFORE_TIMEOUT_MS = 60000
+
+S3_PRESIGNED_URL_EXPIRY_S = int(os.environ.get("S3_PRESIGNED_URL_EXPIRY_S", 3600))
+
+s3 = clients.lazy('s3')
+lambda_client = clients.lazy('lambda')
+
+def lambda_handler(event, context):
+    if "ExportSegment" in event:
+        return export_segment(event["ExportSegment"], context)
+
+    action = event.get("Action", "start")
+    if action == "start":
+        total_segments = int(event.get("TotalSegments", EXPORT_TOTAL_SEGMENTS))
+        if not 1 <= total_segments <= 1000:
+            return {
+                'statusCode': 400,
+                'body': 'TotalSegments must be between 1 and 1000'
+            }
+        return start_export(event.get("RequestBy"), total_segments, context)
+    elif action == "status":
+        export_id = event.get("ExportId")
+        if not export_id:
+            return {
+                'statusCode': 400,
+                'body': 'Require ExportId'
+            }
+        return get_export_status(export_id)
+
+    return {
+        'statusCode': 400,
+        'body': f'Unsupported Action: {action}'
+    }
+
+def export_key(export_id, name):
+    return f"{EXPORT_S3_PREFIX}{export_id}/{name}"
+
+def put_json(key, data):
+    s3.put_object(Bucket=EXPORT_S3_BUCKET, Key=key, Body=json.dumps(data), ContentType="application/json")
+
+def get_json(key):
+    return json.loads(s3.get_object(Bucket=EXPORT_S3_BUCKET, Key=key)["Body"].read())
+
+def start_export(request_by, total_segments, context):
+    export_id = str(uuid.uuid4())
+    put_json(export_key(export_id, "manifest.json"), {
+        "ExportId": export_id,
+        "Status": "running",
+        "Table": DYNAMO_VIDEO_TASK_TABLE,
+        "Format": "ndjson.gzip",
+        "TotalSegments": total_segments,
+        "RequestBy": request_by,
+        "StartedTs": datetime.now(timezone.utc).isoformat(),
+    })
+    for segment in range(total_segments):
+        invoke_segment(context, {"ExportId": export_id, "Segment": segment, "TotalSegments": total_segments})
+    print(f"Export {export_id} started with {total_segments} segments")
+
+    return {
+        'statusCode': 200,
+        'body': {"ExportId": export_id}
+    }
+
+def invoke_segment(context, job):
+    lambda_client.invoke(
+        FunctionName=context.function_name,
+        InvocationType='Event',
+        Payload=json.dumps({"ExportSegment": job})
+    )
+
+def json_default(value):
+    # The codec returns native numbers; only sets and binary need converting
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    raise TypeError(f"Not JSON serializable: {type(value)}")
+
+def export_segment(job, context):
+    '''Scan one segment into parts, continuing in a new invocation if time runs short.'''
+    export_id, segment = job["ExportId"], job["Segment"]
+    parts = job.get("Parts", [])
+    scan_kwargs = {"Segment": segment, "TotalSegments": job["TotalSegments"], "ExclusiveStartKey": job.get("StartKey")}
+
+    lines = []
+    while True:
+        items, last_key = ddb.scan(DYNAMO_VIDEO_TASK_TABLE, **scan_kwargs)
+        lines.extend(json.dumps(item, default=json_default) for item in items)
+        if len(lines) >= PART_MAX_ITEMS or (lines and not last_key):
+            parts.append(upload_part(export_id, segment, len(parts), lines))
+            lines = []
+        if not last_key:
+            break
+        scan_kwargs["ExclusiveStartKey"] = last_key
+        if context.get_remaining_time_in_millis() < CONTINUE_BEFORE_TIMEOUT_MS:
+            if lines:
+                parts.append(upload_part(export_id, segment, len(parts), lines))
+            # Keys are plain strings, so the start key survives the JSON payload
+            invoke_segment(context, {**job, "StartKey": last_key, "Parts": parts})
+            print(f"Export {export_id} segment {segment}: continuing after {len(parts)} parts")
+            return {
+                'statusCode': 200,
+                'body': {"Continued": True}
+            }
+
+    put_json(export_key(export_id, f"segments/{segment}.json"), {"Segment": segment, "Parts": parts})
+    print(f"Export {export_id} segment {segment}: {len(parts)} parts")
+    complete_export_if_done(export_id, job["TotalSegments"])
+    return {
+        'statusCode': 200,
+        'body': {"Parts": len(parts)}
+    }
+
+def upload_part(export_id, segment, index, lines):
+    key = export_key(export_id, f"part-{segment:04d}-{index:05d}.ndjson.gz")
+    body = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"), compresslevel=6)
+    s3.put_object(Bucket=EXPORT_S3_BUCKET, Key=key, Body=body, ContentType="application/x-ndjson", ContentEncoding="gzip")
+    return {"Key": key, "Items": len(lines), "Bytes": len(body)}
+
+def list_segment_results(export_id):
+    keys = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=EXPORT_S3_BUCKET, Prefix=export_key(export_id, "segments/")):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
+    return keys
+
+def complete_export_if_done(export_id, total_segments):
+    '''
+    Each segment lists the results after writing its own, so the last one to finish always sees
+    all of them. Segments finishing together may both write the same manifest.
+    '''
+    keys = list_segment_results(export_id)
+    if len(keys) < total_segments:
+        return
+    segments = sorted((get_json(key) for key in keys), key=lambda r: r["Segment"])
+    manifest = get_json(export_key(export_id, "manifest.json"))
+    parts = [part for result in segments for part in result["Parts"]]
+    manifest.update({
+        "Status": "completed",
+        "CompletedTs": datetime.now(timezone.utc).isoformat(),
+        "Items": sum(part["Items"] for part in parts),
+        "Bytes": sum(part["Bytes"] for part in parts),
+        "Parts": parts,
+    })
+    put_json(export_key(export_id, "manifest.json"), manifest)
+    print(f"Export {export_id} completed: {manifest['Items']} items in {len(parts)} parts")
+
+def get_export_status(export_id):
+    try:
+        manifest = get_json(export_key(export_id, "manifest.json"))
+    except s3.exceptions.NoSuchKey:
+        return {
+            'statusCode': 400,
+            'body': f'Export does not exist: {export_id}'
+        }
+    if manifest["Status"] == "running":
+        manifest["SegmentsCompleted"] = len(list_segment_results(export_id))
+    for part in manifest.get("Parts", []):
+        part["Url"] = s3.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': EXPORT_S3_BUCKET, 'Key': part["Key"]},
+            ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
+        )
+    return {
+        'statusCode': 200,
+        'body': manifest
+    }
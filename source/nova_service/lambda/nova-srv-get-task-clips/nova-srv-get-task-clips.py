@@ -1,10 +1,11 @@
 import json
-import boto3
 import os
 import utils
+from nova_common import clients
 
 DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
-s3 = boto3.client('s3')
+CLIP_INDEX_S3_KEY_TEMPLATE = "tasks/{task_id}/clip-index.json"
+s3 = clients.lazy('s3')
 
 def lambda_handler(event, context):
     task_id = event.get("TaskId")
@@ -28,33 +29,62 @@ def lambda_handler(event, context):
         }
 
     s3_bucket = task["Request"]["File"]["S3Object"]["Bucket"]
-    s3_prefix = f"tasks/{task_id}/nova-mme/"
 
-    result = {}
-    # Get Nova MME S3 output files
-    response = s3.list_objects_v2(Bucket=s3_bucket, Prefix=s3_prefix)
-    for obj in response.get('Contents', []):
-        if "/nova-mme/search/" not in obj['Key'] and obj['Key'].endswith('.jsonl'):
-            output_key = obj['Key']
-            if output_key:
-                #print("!!!", output_key)
-                file_name = output_key.split(".")[-1].replace(".jsonl","")
-                embed_option = file_name.replace("embedding_","")
-
-                obj = s3.get_object(Bucket=s3_bucket, Key=output_key)
-                lines = obj["Body"].iter_lines()
-                for line in lines:
-                    output = json.loads(line)
-                    if output:
-                        if embed_option not in result.keys():
-                            result[embed_option] = []
-
-                        result[embed_option].append({
-                            "StartSec": output["segmentMetadata"]["segmentStartSeconds"],
-                            "EndSec": output["segmentMetadata"]["segmentEndSeconds"]
-                        })
+    # Clip index sidecar written by nova-srv-s3-listener
+    index = get_clip_index(s3_bucket, task_id)
+    if index is None:
+        # Tasks ingested before the sidecar existed
+        index = build_clip_index(s3_bucket, task_id)
 
     return {
         'statusCode': 200,
-        'body': result
+        'body': index["Clips"]
     }
+
+def get_clip_index(s3_bucket, task_id):
+    try:
+        obj = s3.get_object(Bucket=s3_bucket, Key=CLIP_INDEX_S3_KEY_TEMPLATE.format(task_id=task_id))
+        return json.loads(obj["Body"].read())
+    except s3.exceptions.NoSuchKey:
+        return None
+
+def build_clip_index(s3_bucket, task_id):
+    '''Build the clip index from the embedding outputs and store it for the next request.'''
+    clips = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=s3_bucket, Prefix=f"tasks/{task_id}/nova-mme/"):
+        for obj in page.get('Contents', []):
+            output_key = obj['Key']
+            if "/nova-mme/search/" in output_key or not output_key.endswith('.jsonl'):
+                continue
+            embed_option = output_key.split('/')[-1].replace(".jsonl", "").replace("embedding-", "")
+            if embed_option in ["image"]:
+                clips[embed_option] = []
+                continue
+            option_clips = []
+            for line in s3.get_object(Bucket=s3_bucket, Key=output_key)["Body"].iter_lines():
+                if not line:
+                    continue
+                seg_metadata = json.loads(line).get("segmentMetadata", {})
+                if embed_option in ["text"]:
+                    option_clips.append({
+                        "SegmentIndex": seg_metadata.get("segmentIndex"),
+                        "StartChar": seg_metadata.get("segmentStartCharPosition"),
+                        "EndChar": seg_metadata.get("segmentEndCharPosition"),
+                    })
+                else:
+                    option_clips.append({
+                        "SegmentIndex": seg_metadata.get("segmentIndex"),
+                        "StartSec": seg_metadata.get("segmentStartSeconds"),
+                        "EndSec": seg_metadata.get("segmentEndSeconds"),
+                    })
+            clips[embed_option] = sorted(option_clips, key=lambda clip: clip["SegmentIndex"] or 0)
+
+    index = {"Version": 1, "TaskId": task_id, "Clips": clips}
+    try:
+        # Never replace a sidecar the listener wrote in the meantime
+        s3.put_object(Bucket=s3_bucket, Key=CLIP_INDEX_S3_KEY_TEMPLATE.format(task_id=task_id),
+                      Body=json.dumps(index), ContentType="application/json", IfNoneMatch="*")
+    except s3.exceptions.ClientError as ex:
+        print(f"Clip index not stored: {ex}")
+    return index
@@ -0,0 +1,32 @@
+'''
+Library aggregates maintained by nova-srv-task-stats, read with one GetItem.
+'''
+import os
+from nova_common import dynamodb as ddb
+
+DYNAMO_TASK_SUMMARY_TABLE = os.environ.get("DYNAMO_TASK_SUMMARY_TABLE")
+STATS_KEY = {"ListPk": "stats", "SortKey": "library"}
+# Flat counter prefixes -> response groups
+GROUPS = {"Modality": "ByModality", "Status": "ByStatus", "Owner": "ByOwner"}
+
+def lambda_handler(event, context):
+    item = ddb.get_item(DYNAMO_TASK_SUMMARY_TABLE, STATS_KEY) or {}
+
+    stats = {
+        "Tasks": int(item.get("Tasks", 0)),
+        "Segments": int(item.get("Segments", 0)),
+        "ByModality": {},
+        "ByStatus": {},
+        "ByOwner": {},
+        "ReconciledTs": item.get("ReconciledTs"),
+    }
+    for name, value in item.items():
+        prefix, _, key = name.partition("#")
+        # Counters of deleted tasks reach zero but stay on the item
+        if prefix in GROUPS and int(value) > 0:
+            stats[GROUPS[prefix]][key] = int(value)
+
+    return {
+        'statusCode': 200,
+        'body': stats
+    }
@@ -0,0 +1,49 @@
+'''
+Chunked frame sampling.
+Each chunk of the sampling plan is decoded by its own ffmpeg process, which seeks straight to the
+chunk start in a presigned URL and writes one JPEG every sample interval. The frames are then
+uploaded concurrently. Chunks are independent, so they can run on a thread pool (each thread drives
+an ffmpeg subprocess) or be fanned out to separate Lambda invocations.
+'''
+import math
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import media_probe
+
+UPLOAD_WORKERS = 16
+JPEG_QUALITY = 3  # ffmpeg -q:v, 2 (best) - 31
+
+
+def frame_s3_key(s3_prefix, index):
+    return f"{s3_prefix}{index}.jpg"
+
+def sample_chunk(s3, source_url, chunk, sample_interval, s3_bucket, s3_prefix, work_dir="/tmp/frames"):
+    '''
+    Sample [start_ts, end_ts) of the video every sample_interval seconds and upload the frames as
+    {s3_prefix}{index}.jpg, where index is the frame's position in the whole-video sampling plan.
+    Returns the number of frames uploaded.
+    '''
+    start_ts, end_ts = chunk["start_ts"], chunk["end_ts"]
+    max_frames = math.ceil((end_ts - start_ts) / sample_interval)
+    chunk_dir = os.path.join(work_dir, f"{chunk.get('task_id', 'task')}_{int(start_ts * 1000)}")
+    os.makedirs(chunk_dir, exist_ok=True)
+    try:
+        result = subprocess.run(
+            [media_probe.get_ffmpeg_binary(), "-v", "error", "-ss", str(start_ts), "-t", str(end_ts - start_ts),
+             "-i", source_url, "-an", "-vf", f"fps=1/{sample_interval}", "-frames:v", str(max_frames),
+             "-q:v", str(JPEG_QUALITY), os.path.join(chunk_dir, "%06d.jpg")],
+            capture_output=True, timeout=840
+        )
+        if result.returncode != 0:
+            print(f"ffmpeg failed for chunk {start_ts}-{end_ts}: {result.stderr.decode('utf-8', 'ignore')[-500:]}")
+
+        first_index = int(round(start_ts / sample_interval))
+        uploads = [(os.path.join(chunk_dir, name), frame_s3_key(s3_prefix, first_index + i))
+                   for i, name in enumerate(sorted(os.listdir(chunk_dir)))]
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as pool:
+            list(pool.map(lambda u: s3.upload_file(u[0], s3_bucket, u[1], ExtraArgs={"ContentType": "image/jpeg"}), uploads))
+        return len(uploads)
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
@@ -0,0 +1,83 @@
+'''
+Local media cache on the Lambda ephemeral volume.
+Source objects are stored under a name derived from (bucket, key, ETag), so a warm container reuses
+a download for as long as the object is unchanged and a re-uploaded object is never served stale.
+Downloads go to a temporary file that is renamed into place, so a partial download is never visible.
+The least recently used files are evicted to keep the cache within its byte budget.
+'''
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+
+PART_SUFFIX = ".part"
+# A partial download older than the Lambda maximum duration belongs to a killed invocation
+STALE_PART_S = 900
+
+
+class MediaCache:
+    def __init__(self, root="/tmp/media-cache", max_bytes=8 * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def _path(self, bucket, key, etag):
+        digest = hashlib.sha256(f"{bucket}/{key}/{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{digest}.{key.split('.')[-1]}")
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            stat = os.stat(path)
+            if name.endswith(PART_SUFFIX):
+                if time.time() - stat.st_mtime > STALE_PART_S:
+                    os.remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, needed):
+        '''Remove least recently used files until needed bytes fit in the budget and on disk.'''
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        while entries and (total + needed > self.max_bytes or shutil.disk_usage(self.root).free < needed):
+            _, size, path = entries.pop(0)
+            os.remove(path)
+            total -= size
+            print(f"Media cache evicted {path} ({size} bytes)")
+
+    def lookup(self, s3, bucket, key, etag=None):
+        '''Local path of the cached object, or None.'''
+        if etag is None:
+            etag = s3.head_object(Bucket=bucket, Key=key)["ETag"]
+        path = self._path(bucket, key, etag)
+        if not os.path.exists(path):
+            return None
+        # mtime marks recent use for LRU eviction
+        os.utime(path)
+        return path
+
+    def get(self, s3, bucket, key):
+        '''Local path of the object, downloading it if it isn't cached.'''
+        os.makedirs(self.root, exist_ok=True)
+        head = s3.head_object(Bucket=bucket, Key=key)
+        path = self.lookup(s3, bucket, key, head["ETag"])
+        if path:
+            print(f"Media cache hit: s3://{bucket}/{key}")
+            return path
+
+        path = self._path(bucket, key, head["ETag"])
+        with self.lock:
+            self._evict(head["ContentLength"])
+        part_path = f"{path}.{uuid.uuid4().hex}{PART_SUFFIX}"
+        try:
+            # IfMatch: fail rather than cache new content under the old ETag
+            s3.download_file(bucket, key, part_path, ExtraArgs={"IfMatch": head["ETag"]})
+            os.replace(part_path, path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return path
@@ -0,0 +1,568 @@
+'''
+Header-only media probing.
+Reads container headers (MP4/MOV moov atom, Matroska/WebM EBML header) with S3 ranged GETs,
+falling back to an ffmpeg probe on a presigned URL, so video metadata can be collected without
+downloading the whole file. Image (PNG/JPEG/GIF/WebP) and audio (MP3/WAV/OGG) metadata are read
+the same way from the first few KB.
+'''
+import re
+import struct
+import subprocess
+
+PROBE_PREFIX_BYTES = 256 * 1024
+# Image and audio headers sit in the first few KB
+HEADER_PREFIX_BYTES = 16 * 1024
+PROBE_MAX_HOPS = 64
+PRESIGNED_URL_EXPIRY_S = 3600
+
+MP4_EXTENSIONS = ["mp4", "mov", "m4v", "3gp"]
+MKV_EXTENSIONS = ["mkv", "webm"]
+
+
+# ==== S3 Range Reader ====
+class S3RangeReader:
+    '''Serves byte ranges of an S3 object, answering reads inside the first PROBE_PREFIX_BYTES from one GET.'''
+    def __init__(self, s3, bucket, key, size, prefix_bytes=PROBE_PREFIX_BYTES):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.size = size
+        self.requests = 0
+        self.prefix = self._get(0, min(prefix_bytes, size))
+
+    def _get(self, start, length):
+        if length <= 0:
+            return b""
+        self.requests += 1
+        response = self.s3.get_object(Bucket=self.bucket, Key=self.key, Range=f"bytes={start}-{start + length - 1}")
+        return response["Body"].read()
+
+    def read(self, start, length):
+        length = min(length, self.size - start)
+        if start + length <= len(self.prefix):
+            return self.prefix[start:start + length]
+        return self._get(start, length)
+
+
+# ==== MP4 / MOV ====
+def _box_header(data, offset):
+    size, box_type = struct.unpack(">I4s", data[offset:offset + 8])
+    header_len = 8
+    if size == 1:
+        size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+        header_len = 16
+    return size, box_type, header_len
+
+def _iter_boxes(data, start, end):
+    offset = start
+    while offset + 8 <= end:
+        size, box_type, header_len = _box_header(data, offset)
+        if size == 0:
+            size = end - offset
+        if size < header_len:
+            return
+        yield box_type, offset + header_len, min(offset + size, end)
+        offset += size
+
+def _find_box(data, start, end, box_type):
+    for t, s, e in _iter_boxes(data, start, end):
+        if t == box_type:
+            return s, e
+    return None
+
+def _parse_time_header(data, start):
+    # mvhd/mdhd: version 1 uses 64-bit times and duration
+    if data[start] == 1:
+        timescale, duration = struct.unpack(">IQ", data[start + 20:start + 32])
+    else:
+        timescale, duration = struct.unpack(">II", data[start + 12:start + 20])
+    return timescale, duration
+
+def _parse_trak(data, start, end):
+    track = {}
+    tkhd = _find_box(data, start, end, b"tkhd")
+    if tkhd:
+        s, e = tkhd
+        # Width/height are the last two 16.16 fixed-point fields, preceded by the 3x3 matrix
+        matrix_a, matrix_b = struct.unpack(">ii", data[e - 44:e - 36])
+        width, height = struct.unpack(">II", data[e - 8:e])
+        track["Resolution"] = [width >> 16, height >> 16]
+        if matrix_a == 0 and abs(matrix_b) == 0x10000:
+            track["Resolution"].reverse()
+
+    mdia = _find_box(data, start, end, b"mdia")
+    if not mdia:
+        return track
+    hdlr = _find_box(data, mdia[0], mdia[1], b"hdlr")
+    if hdlr:
+        track["Handler"] = data[hdlr[0] + 8:hdlr[0] + 12]
+    mdhd = _find_box(data, mdia[0], mdia[1], b"mdhd")
+    if mdhd:
+        track["Timescale"], track["Duration"] = _parse_time_header(data, mdhd[0])
+
+    minf = _find_box(data, mdia[0], mdia[1], b"minf")
+    stbl = minf and _find_box(data, minf[0], minf[1], b"stbl")
+    stts = stbl and _find_box(data, stbl[0], stbl[1], b"stts")
+    if stts:
+        entry_count = struct.unpack(">I", data[stts[0] + 4:stts[0] + 8])[0]
+        entries = struct.unpack(f">{entry_count * 2}I", data[stts[0] + 8:stts[0] + 8 + entry_count * 8])
+        track["SampleCount"] = sum(entries[0::2])
+        track["FirstDelta"] = entries[1] if entry_count else 0
+    return track
+
+def parse_mp4_moov(moov):
+    '''Parse a moov payload into {Duration, Resolution, Fps}; None if no usable video track is found.'''
+    mvhd = _find_box(moov, 0, len(moov), b"mvhd")
+    if not mvhd:
+        return None
+    timescale, duration = _parse_time_header(moov, mvhd[0])
+
+    for t, s, e in _iter_boxes(moov, 0, len(moov)):
+        if t != b"trak":
+            continue
+        track = _parse_trak(moov, s, e)
+        if track.get("Handler") != b"vide":
+            continue
+        fps = None
+        if track.get("Duration") and track.get("SampleCount"):
+            fps = track["SampleCount"] * track["Timescale"] / track["Duration"]
+        elif track.get("FirstDelta"):
+            fps = track["Timescale"] / track["FirstDelta"]
+        if not duration and track.get("Duration"):
+            duration, timescale = track["Duration"], track["Timescale"]
+        if not timescale or not duration or not fps or not track.get("Resolution"):
+            return None
+        return {
+            "Duration": duration / timescale,
+            "Resolution": track["Resolution"],
+            "Fps": round(fps, 2),
+        }
+    return None
+
+def probe_mp4(reader):
+    # moov may sit before or after mdat: hop over top-level boxes by their sizes
+    offset = 0
+    for _ in range(PROBE_MAX_HOPS):
+        if offset + 8 > reader.size:
+            return None
+        header = reader.read(offset, 16)
+        size, box_type, header_len = _box_header(header, 0)
+        if size == 0:
+            size = reader.size - offset
+        if box_type == b"moov":
+            return parse_mp4_moov(reader.read(offset + header_len, size - header_len))
+        if size < header_len:
+            return None
+        offset += size
+    return None
+
+
+# ==== Matroska / WebM ====
+EBML_ID_HEADER = 0x1A45DFA3
+EBML_ID_SEGMENT = 0x18538067
+EBML_ID_INFO = 0x1549A966
+EBML_ID_TIMECODE_SCALE = 0x2AD7B1
+EBML_ID_DURATION = 0x4489
+EBML_ID_TRACKS = 0x1654AE6B
+EBML_ID_TRACK_ENTRY = 0xAE
+EBML_ID_TRACK_TYPE = 0x83
+EBML_ID_DEFAULT_DURATION = 0x23E383
+EBML_ID_VIDEO = 0xE0
+EBML_ID_PIXEL_WIDTH = 0xB0
+EBML_ID_PIXEL_HEIGHT = 0xBA
+EBML_ID_CLUSTER = 0x1F43B675
+
+def _read_vint(data, offset, keep_marker=False):
+    first = data[offset]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable-length integer")
+    value = first if keep_marker else first & (0xFF >> length)
+    for b in data[offset + 1:offset + length]:
+        value = (value << 8) | b
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+def _ebml_header(data, offset):
+    element_id, id_len, _ = _read_vint(data, offset, keep_marker=True)
+    size, size_len, unknown = _read_vint(data, offset + id_len)
+    return element_id, id_len + size_len, None if unknown else size
+
+def _iter_elements(data, start, end):
+    offset = start
+    while offset < end:
+        element_id, header_len, size = _ebml_header(data, offset)
+        data_start = offset + header_len
+        data_end = end if size is None else min(data_start + size, end)
+        yield element_id, data_start, data_end
+        offset = data_end
+
+def _ebml_uint(data, start, end):
+    return int.from_bytes(data[start:end], "big")
+
+def _ebml_float(data, start, end):
+    return struct.unpack(">f" if end - start == 4 else ">d", data[start:end])[0]
+
+def parse_mkv_info(data):
+    timecode_scale, duration = 1000000, None
+    for element_id, s, e in _iter_elements(data, 0, len(data)):
+        if element_id == EBML_ID_TIMECODE_SCALE:
+            timecode_scale = _ebml_uint(data, s, e)
+        elif element_id == EBML_ID_DURATION:
+            duration = _ebml_float(data, s, e)
+    return duration * timecode_scale / 1e9 if duration else None
+
+def parse_mkv_tracks(data):
+    for element_id, s, e in _iter_elements(data, 0, len(data)):
+        if element_id != EBML_ID_TRACK_ENTRY:
+            continue
+        track_type, default_duration, width, height = None, None, None, None
+        for child_id, cs, ce in _iter_elements(data, s, e):
+            if child_id == EBML_ID_TRACK_TYPE:
+                track_type = _ebml_uint(data, cs, ce)
+            elif child_id == EBML_ID_DEFAULT_DURATION:
+                default_duration = _ebml_uint(data, cs, ce)
+            elif child_id == EBML_ID_VIDEO:
+                for video_id, vs, ve in _iter_elements(data, cs, ce):
+                    if video_id == EBML_ID_PIXEL_WIDTH:
+                        width = _ebml_uint(data, vs, ve)
+                    elif video_id == EBML_ID_PIXEL_HEIGHT:
+                        height = _ebml_uint(data, vs, ve)
+        # TrackType 1: video
+        if track_type == 1:
+            return {
+                "Resolution": [width, height] if width and height else None,
+                "Fps": round(1e9 / default_duration, 2) if default_duration else None,
+            }
+    return None
+
+def probe_mkv(reader):
+    header = reader.read(0, 16)
+    if _ebml_header(header, 0)[0] != EBML_ID_HEADER:
+        return None
+    _, header_len, size = _ebml_header(header, 0)
+    offset = header_len + size
+
+    segment = reader.read(offset, 16)
+    element_id, header_len, size = _ebml_header(segment, 0)
+    if element_id != EBML_ID_SEGMENT:
+        return None
+    offset += header_len
+    segment_end = reader.size if size is None else min(offset + size, reader.size)
+
+    # Walk Segment children until Info and Tracks are both read; clusters are skipped by size
+    duration, track = None, None
+    for _ in range(PROBE_MAX_HOPS):
+        if offset >= segment_end or (duration and track):
+            break
+        element_id, header_len, size = _ebml_header(reader.read(offset, 16), 0)
+        if size is None:
+            break
+        if element_id == EBML_ID_INFO:
+            duration = parse_mkv_info(reader.read(offset + header_len, size))
+        elif element_id == EBML_ID_TRACKS:
+            track = parse_mkv_tracks(reader.read(offset + header_len, size))
+        offset += header_len + size
+
+    if not duration or not track or not track["Resolution"] or not track["Fps"]:
+        return None
+    return {"Duration": duration, "Resolution": track["Resolution"], "Fps": track["Fps"]}
+
+
+# ==== Images ====
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def parse_exif_orientation(tiff):
+    '''Orientation tag (0x0112) from IFD0 of an EXIF TIFF block, or None.'''
+    endian = "<" if tiff[:2] == b"II" else ">"
+    ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+    count = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+    for i in range(count):
+        entry = ifd_offset + 2 + i * 12
+        tag = struct.unpack(endian + "H", tiff[entry:entry + 2])[0]
+        if tag == 0x0112:
+            return struct.unpack(endian + "H", tiff[entry + 8:entry + 10])[0]
+    return None
+
+def probe_jpeg(reader):
+    # Walk marker segments up to the frame header; EXIF (APP1) comes before it
+    offset, orientation = 2, 1
+    for _ in range(PROBE_MAX_HOPS):
+        header = reader.read(offset, 4)
+        if len(header) < 4 or header[0] != 0xFF:
+            return None
+        marker = header[1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            offset += 2
+            continue
+        length = struct.unpack(">H", header[2:4])[0]
+        if marker == 0xE1:
+            segment = reader.read(offset + 4, length - 2)
+            if segment[:6] == b"Exif\0\0":
+                try:
+                    orientation = parse_exif_orientation(segment[6:]) or 1
+                except struct.error:
+                    pass
+        elif marker in JPEG_SOF_MARKERS:
+            _, height, width, components = struct.unpack(">BHHB", reader.read(offset + 4, 6))
+            return {"Codec": "jpeg", "Width": width, "Height": height, "Orientation": orientation,
+                    "Channels": components, "Progressive": marker == 0xC2}
+        elif marker == 0xDA:
+            return None
+        offset += 2 + length
+    return None
+
+def probe_image(reader):
+    '''Return {Codec, Width, Height, Orientation, ...} from the image header, or None.'''
+    data = reader.read(0, 32)
+    if data[:8] == PNG_SIGNATURE and data[12:16] == b"IHDR":
+        width, height, bit_depth, color_type = struct.unpack(">IIBB", data[16:26])
+        return {"Codec": "png", "Width": width, "Height": height, "Orientation": 1, "BitDepth": bit_depth}
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        width, height = struct.unpack("<HH", data[6:10])
+        return {"Codec": "gif", "Width": width, "Height": height, "Orientation": 1}
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", data[26:30])
+            width, height = width & 0x3FFF, height & 0x3FFF
+        elif chunk == b"VP8L":
+            bits = struct.unpack("<I", data[21:25])[0]
+            width, height = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        elif chunk == b"VP8X":
+            width = int.from_bytes(data[24:27], "little") + 1
+            height = int.from_bytes(data[27:30], "little") + 1
+        else:
+            return None
+        return {"Codec": "webp", "Width": width, "Height": height, "Orientation": 1}
+    if data[:2] == b"\xff\xd8":
+        return probe_jpeg(reader)
+    return None
+
+
+# ==== Audio ====
+MP3_BITRATES_KBPS = {
+    (1, 1): [32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+def parse_mp3_frame_header(header):
+    '''Decode a 4-byte MPEG audio frame header; None if it isn't one.'''
+    if header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version = {0: 2.5, 2: 2, 3: 1}.get((header[1] >> 3) & 3)
+    layer = {1: 3, 2: 2, 3: 1}.get((header[1] >> 1) & 3)
+    bitrate_index, sample_rate_index = header[2] >> 4, (header[2] >> 2) & 3
+    if version is None or layer is None or not 0 < bitrate_index < 15 or sample_rate_index == 3:
+        return None
+    return {
+        "Version": version,
+        "Layer": layer,
+        "Bitrate": MP3_BITRATES_KBPS[(1 if version == 1 else 2, layer)][bitrate_index - 1] * 1000,
+        "SampleRate": MP3_SAMPLE_RATES[version][sample_rate_index],
+        "Channels": 1 if header[3] >> 6 == 3 else 2,
+        "SamplesPerFrame": 384 if layer == 1 else (1152 if layer == 2 or version == 1 else 576),
+    }
+
+def probe_mp3(reader):
+    # Skip an ID3v2 tag: 10-byte header with a syncsafe size, plus an optional footer
+    audio_start = 0
+    data = reader.read(0, 10)
+    if data[:3] == b"ID3":
+        audio_start = 10 + sum(b << (7 * (3 - i)) for i, b in enumerate(data[6:10]))
+        if data[5] & 0x10:
+            audio_start += 10
+
+    data = reader.read(audio_start, 4096)
+    for i in range(len(data) - 4):
+        frame = parse_mp3_frame_header(data[i:i + 4])
+        if frame:
+            audio_start += i
+            data = data[i:]
+            break
+    else:
+        return None
+
+    # A Xing/Info or VBRI header in the first frame carries the frame count of VBR files
+    frame_count = None
+    side_info = (32 if frame["Channels"] == 2 else 17) if frame["Version"] == 1 else (17 if frame["Channels"] == 2 else 9)
+    xing = 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 1:
+            frame_count = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+    elif data[36:40] == b"VBRI":
+        frame_count = struct.unpack(">I", data[50:54])[0]
+
+    audio_bytes = reader.size - audio_start
+    if frame_count:
+        duration = frame_count * frame["SamplesPerFrame"] / frame["SampleRate"]
+        bitrate = int(audio_bytes * 8 / duration) if duration else frame["Bitrate"]
+    else:
+        bitrate = frame["Bitrate"]
+        duration = audio_bytes * 8 / bitrate
+    return {"Codec": "mp3", "Duration": duration, "SampleRate": frame["SampleRate"],
+            "Channels": frame["Channels"], "Bitrate": bitrate}
+
+def probe_wav(reader):
+    offset, fmt = 12, None
+    for _ in range(PROBE_MAX_HOPS):
+        header = reader.read(offset, 8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = header[:4], struct.unpack("<I", header[4:8])[0]
+        if chunk_id == b"fmt ":
+            format_tag, channels, sample_rate, byte_rate, block_align, bits = struct.unpack("<HHIIHH", reader.read(offset + 8, 16))
+            fmt = {"Codec": "pcm" if format_tag in (1, 0xFFFE) else f"wav-{format_tag}", "SampleRate": sample_rate,
+                   "Channels": channels, "Bitrate": byte_rate * 8, "BitDepth": bits}
+        elif chunk_id == b"data" and fmt:
+            # Streaming writers may leave the data size unset
+            data_size = min(chunk_size, reader.size - offset - 8)
+            fmt["Duration"] = data_size * 8 / fmt["Bitrate"] if fmt["Bitrate"] else None
+            return fmt
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+def probe_ogg(reader):
+    data = reader.read(0, 512)
+    if data[:4] != b"OggS":
+        return None
+    packet = data[27 + data[26]:]
+    if packet[:7] == b"\x01vorbis":
+        channels = packet[11]
+        sample_rate, _, nominal_bitrate = struct.unpack("<Iii", packet[12:24])
+        codec, granule_rate, pre_skip = "vorbis", sample_rate, 0
+    elif packet[:8] == b"OpusHead":
+        channels = packet[9]
+        pre_skip, sample_rate = struct.unpack("<HI", packet[10:16])
+        # Opus granule positions always count 48 kHz samples
+        codec, granule_rate, nominal_bitrate = "opus", 48000, 0
+    else:
+        return None
+
+    # Duration: granule position of the last page, read from the tail of the file
+    tail_start = max(0, reader.size - 65536)
+    tail = reader.read(tail_start, reader.size - tail_start)
+    last_page = tail.rfind(b"OggS")
+    duration = None
+    if last_page >= 0:
+        granule = struct.unpack("<q", tail[last_page + 6:last_page + 14])[0]
+        duration = max(0, granule - pre_skip) / granule_rate
+    bitrate = int(reader.size * 8 / duration) if duration else (nominal_bitrate if nominal_bitrate > 0 else None)
+    return {"Codec": codec, "Duration": duration, "SampleRate": sample_rate, "Channels": channels, "Bitrate": bitrate}
+
+def probe_audio(reader):
+    '''Return {Codec, Duration, SampleRate, Channels, Bitrate, ...} from the audio header, or None.'''
+    data = reader.read(0, 12)
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return probe_wav(reader)
+    if data[:4] == b"OggS":
+        return probe_ogg(reader)
+    if data[:3] == b"ID3" or parse_mp3_frame_header(data[:4]):
+        return probe_mp3(reader)
+    return None
+
+
+# ==== ffmpeg ====
+def get_ffmpeg_binary():
+    from moviepy.config import FFMPEG_BINARY
+    return FFMPEG_BINARY
+
+def probe_ffmpeg(url):
+    '''Read the stream header with ffmpeg over HTTP; ffmpeg only fetches the byte ranges it needs.'''
+    result = subprocess.run([get_ffmpeg_binary(), "-hide_banner", "-i", url], capture_output=True, text=True, timeout=60)
+    output = result.stderr
+
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", output)
+    video = re.search(r"Stream #.*?Video:.*?, (\d{2,5})x(\d{2,5})[^\n]*?, ([\d.]+) (?:fps|tbr)", output)
+    if not duration or not video:
+        return None
+    h, m, s = duration.groups()
+    resolution = [int(video.group(1)), int(video.group(2))]
+    rotation = re.search(r"(?:rotate\s*:\s*|rotation of )(-?[\d.]+)", output)
+    if rotation and abs(int(float(rotation.group(1)))) in (90, 270):
+        resolution.reverse()
+    return {
+        "Duration": int(h) * 3600 + int(m) * 60 + float(s),
+        "Resolution": resolution,
+        "Fps": float(video.group(3)),
+    }
+
+def extract_frame(source, t, output_path):
+    '''Save the frame at t seconds as JPEG. Seeking before -i lets ffmpeg range-read a URL source.'''
+    result = subprocess.run(
+        [get_ffmpeg_binary(), "-v", "error", "-ss", str(t), "-i", source, "-frames:v", "1", "-q:v", "2", "-y", output_path],
+        capture_output=True, timeout=60
+    )
+    return result.returncode == 0
+
+
+# ==== Probe ====
+def probe_s3_media(s3, bucket, key):
+    '''
+    Collect video metadata without downloading the file.
+    Returns {Size, Resolution, Duration, Fps, NameFormat, Source, Url}, or None when neither
+    the container headers nor ffmpeg can describe the file.
+    '''
+    name_format = key.split('.')[-1]
+    size = s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    url = s3.generate_presigned_url('get_object', Params={'Bucket': bucket, 'Key': key}, ExpiresIn=PRESIGNED_URL_EXPIRY_S)
+
+    metadata, source = None, None
+    try:
+        reader = S3RangeReader(s3, bucket, key, size)
+        ext = name_format.lower()
+        if ext in MP4_EXTENSIONS:
+            metadata = probe_mp4(reader)
+        elif ext in MKV_EXTENSIONS:
+            metadata = probe_mkv(reader)
+        source = f"header ({reader.requests} range requests)"
+    except Exception as ex:
+        print(f"Header probe failed: {ex}")
+
+    if metadata is None:
+        try:
+            metadata = probe_ffmpeg(url)
+            source = "ffmpeg"
+        except Exception as ex:
+            print(f"ffmpeg probe failed: {ex}")
+    if metadata is None:
+        return None
+
+    metadata.update({"Size": size, "NameFormat": name_format, "Source": source, "Url": url})
+    return metadata
+
+def probe_s3_image(s3, bucket, key):
+    '''Returns {Size, NameFormat, Codec, Resolution, Orientation, ...} or None. Resolution is as displayed, after EXIF orientation.'''
+    size = s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    reader = S3RangeReader(s3, bucket, key, size, prefix_bytes=HEADER_PREFIX_BYTES)
+    metadata = probe_image(reader)
+    if metadata is None:
+        return None
+    width, height = metadata.pop("Width"), metadata.pop("Height")
+    # EXIF orientations 5-8 rotate the image by 90 degrees
+    metadata["Resolution"] = [height, width] if metadata["Orientation"] >= 5 else [width, height]
+    metadata.update({"Size": size, "NameFormat": key.split('.')[-1]})
+    return metadata
+
+def probe_s3_audio(s3, bucket, key):
+    '''Returns {Size, NameFormat, Codec, Duration, SampleRate, Channels, Bitrate, ...} or None.'''
+    size = s3.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    reader = S3RangeReader(s3, bucket, key, size, prefix_bytes=HEADER_PREFIX_BYTES)
+    metadata = probe_audio(reader)
+    if metadata is None:
+        return None
+    metadata.update({"Size": size, "NameFormat": key.split('.')[-1]})
+    return metadata
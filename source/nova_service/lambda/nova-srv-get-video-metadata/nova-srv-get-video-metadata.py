@@ -1,30 +1,63 @@
 import json
-import boto3
 import os
 import base64
-from PIL import Image
-from moviepy import VideoFileClip
 import utils
 import time
+import media_probe
+import frame_sampler
+import sprite_generator
+from media_cache import MediaCache
+from concurrent.futures import ThreadPoolExecutor
+from nova_common import clients
+# NumPy (thumbnail_selector, scene_detector, waveform) and moviepy are imported where they are
+# used, so frame sampling workers and image tasks never load them
 
 VIDEO_SAMPLE_CHUNK_DURATION_S = float(os.environ.get("VIDEO_SAMPLE_CHUNK_DURATION_S", 600)) # default to 10 minutes
 DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
 MODEL_ID_IMAGE_UNDERSTANDING = os.environ.get("MODEL_ID_IMAGE_UNDERSTANDING")
+# probe: read container headers only, falling back to a full download; download: always download
+METADATA_PROBE_MODE = os.environ.get("METADATA_PROBE_MODE", "probe")
+# Ask the image model to confirm the locally selected thumbnail (one call)
+THUMBNAIL_MODEL_CONFIRM = os.environ.get("THUMBNAIL_MODEL_CONFIRM", "false").lower() == "true"
 
 
 VIDEO_SAMPLE_S3_BUCKET = os.environ.get("VIDEO_SAMPLE_S3_BUCKET")
 VIDEO_SAMPLE_S3_PREFIX = os.environ.get("VIDEO_SAMPLE_S3_PREFIX")
+# lambda: one async invocation per chunk, so long videos scale with the number of chunks;
+# local: sample chunks on a thread pool in this invocation (short videos only); off: skip
+VIDEO_SAMPLE_MODE = os.environ.get("VIDEO_SAMPLE_MODE", "lambda")
+VIDEO_SAMPLE_WORKERS = int(os.environ.get("VIDEO_SAMPLE_WORKERS", 4))
+SCENE_DETECT_ENABLED = os.environ.get("SCENE_DETECT_ENABLED", "true").lower() == "true"
+SCENE_KEYFRAME_S3_PREFIX = os.environ.get("SCENE_KEYFRAME_S3_PREFIX", "keyframes/")
+SPRITE_ENABLED = os.environ.get("SPRITE_ENABLED", "true").lower() == "true"
+SPRITE_S3_PREFIX = os.environ.get("SPRITE_S3_PREFIX", "sprites/")
+WAVEFORM_ENABLED = os.environ.get("WAVEFORM_ENABLED", "true").lower() == "true"
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get("MEDIA_CACHE_MAX_BYTES", 8 * 1024 ** 3))
+# Time a whole-video stage leaves after decoding for its uploads and DB update
+STAGE_RESERVE_S = 120
 
 IMAGE_MAX_WIDTH = 2048
 IMAGE_MAX_HEIGHT = 2048
 
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock-runtime')
+s3 = clients.lazy('s3')
+bedrock = clients.lazy('bedrock-runtime')
+lambda_client = clients.lazy('lambda')
 
 local_path = '/tmp/'
+# Kept across warm invocations
+media_cache = MediaCache(root=f'{local_path}media-cache', max_bytes=MEDIA_CACHE_MAX_BYTES)
 
 def lambda_handler(event, context):
     print(event)
+    # Fan-out worker: sample a single chunk
+    if event is not None and "SampleChunk" in event:
+        return sample_video_chunk(event["SampleChunk"])
+    # Stage workers: each decodes the whole video
+    if event is not None and "DetectScenes" in event:
+        return detect_video_scenes(event["DetectScenes"], context)
+    if event is not None and "GenerateSprites" in event:
+        return generate_video_sprites(event["GenerateSprites"], context)
+
     if event is None or "Request" not in event:
         return 'Invalid request'
     
@@ -39,14 +72,28 @@ def lambda_handler(event, context):
     except:
         return 'Invalid Request'
 
-    # Download video to local disk
-    local_file_path = local_path + s3_key.split('/')[-1]
-    s3.download_file(s3_bucket, s3_key, local_file_path)
-    
+    # Image and audio tasks: header metadata from ranged GETs, plus waveform peaks for audio
+    modality = event.get("Modality", "video")
+    if modality == "image":
+        update_header_metadata(s3_bucket, s3_key, task_id, "ImageMetaData", media_probe.probe_s3_image)
+        return event
+    if modality == "audio":
+        update_header_metadata(s3_bucket, s3_key, task_id, "AudioMetaData", media_probe.probe_s3_audio)
+        if WAVEFORM_ENABLED:
+            update_waveform(s3_bucket, s3_key, task_id, stage_timeout_s(context))
+        return event
+
     # Generate thumbnail and video metadata
     if "MetaData" not in event:
         event["MetaData"] = {}
-    video_metadata = get_video_metadata(event, local_file_path)
+    video_metadata = None
+    if METADATA_PROBE_MODE == "probe":
+        video_metadata = get_video_metadata_probe(event)
+
+    if video_metadata is None:
+        # Download video to local disk; later stages read the cached copy
+        local_file_path = media_cache.get(s3, s3_bucket, s3_key)
+        video_metadata = get_video_metadata(event, local_file_path)
     duration = video_metadata["Duration"]
 
     task = event
@@ -68,11 +115,17 @@ def lambda_handler(event, context):
     frame_metadata["S3Prefix"] = f'tasks/{task_id}/{VIDEO_SAMPLE_S3_PREFIX}'
     task["MetaData"]["VideoFrameS3"] = frame_metadata
 
-    task["Status"] = "processing"
-
     try:
         # update video_task index
-        utils.dynamodb_table_upsert(DYNAMO_VIDEO_TASK_TABLE, document=task)
+        if task_db:
+            # Only write the metadata fields: the listener and frame samplers update the same item
+            utils.dynamodb_table_update(DYNAMO_VIDEO_TASK_TABLE, task_id, {
+                "MetaData.VideoMetaData": video_metadata,
+                "MetaData.VideoFrameS3": frame_metadata,
+            })
+        else:
+            task["Status"] = "processing"
+            utils.dynamodb_table_upsert(DYNAMO_VIDEO_TASK_TABLE, document=task)
     except Exception as ex:
         print(ex)
         
@@ -88,27 +141,201 @@ def lambda_handler(event, context):
         start_ts += VIDEO_SAMPLE_CHUNK_DURATION_S
     
     task["chunks"] = chunks
-    
+
+    # Frame sampling: consume the chunk plan. It starts before the other stages, so the chunk
+    # invocations are not held back by them
+    jobs = [{
+        "TaskId": task_id,
+        "S3Bucket": s3_bucket,
+        "S3Key": s3_key,
+        "SampleIntervalS": sample_interval,
+        "FrameS3Bucket": frame_metadata["S3Bucket"],
+        "FrameS3Prefix": frame_metadata["S3Prefix"],
+        "Chunk": {**chunk, "end_ts": min(chunk["end_ts"], duration)},
+    } for chunk in chunks if chunk["start_ts"] < duration]
+    if VIDEO_SAMPLE_MODE == "lambda":
+        for job in jobs:
+            lambda_client.invoke(
+                FunctionName=context.function_name,
+                InvocationType='Event',
+                Payload=json.dumps({"SampleChunk": job})
+            )
+    elif VIDEO_SAMPLE_MODE == "local":
+        with ThreadPoolExecutor(max_workers=VIDEO_SAMPLE_WORKERS) as pool:
+            sampled = sum(pool.map(sample_video_chunk, jobs))
+        print(f"Sampled {sampled} frames in {len(jobs)} chunks")
+
+    # Stages that decode the whole video run in their own invocations, each with a full time budget
+    stage_job = {
+        "TaskId": task_id,
+        "S3Bucket": s3_bucket,
+        "S3Key": s3_key,
+        "Duration": duration,
+        "Resolution": video_metadata["Resolution"],
+    }
+
+    # Scene boundaries and one keyframe per scene
+    if SCENE_DETECT_ENABLED:
+        invoke_stage(context, "DetectScenes", stage_job)
+
+    # Sprite sheets for scrub previews
+    if SPRITE_ENABLED:
+        invoke_stage(context, "GenerateSprites", stage_job)
+
+    # Waveform peaks of the audio track
+    if WAVEFORM_ENABLED:
+        task["MetaData"]["Waveform"] = update_waveform(s3_bucket, s3_key, task_id, stage_timeout_s(context))
+
     return task
+
+def invoke_stage(context, name, job):
+    try:
+        lambda_client.invoke(
+            FunctionName=context.function_name,
+            InvocationType='Event',
+            Payload=json.dumps({name: job})
+        )
+    except Exception as ex:
+        print(f"Failed to start {name}: {ex}")
+
+def stage_timeout_s(context):
+    '''Seconds a stage may spend decoding, leaving STAGE_RESERVE_S of the invocation for the rest.'''
+    return max(1, context.get_remaining_time_in_millis() / 1000 - STAGE_RESERVE_S)
+
+def get_media_source(s3_bucket, s3_key):
+    '''Input for ffmpeg: the locally cached copy if there is one, else a presigned URL read with range requests.'''
+    try:
+        local_file_path = media_cache.lookup(s3, s3_bucket, s3_key)
+        if local_file_path:
+            return local_file_path
+    except Exception as ex:
+        print(f"Media cache lookup failed: {ex}")
+    return s3.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': s3_bucket, 'Key': s3_key},
+        ExpiresIn=media_probe.PRESIGNED_URL_EXPIRY_S
+    )
+
+def update_header_metadata(s3_bucket, s3_key, task_id, name, probe):
+    try:
+        metadata = probe(s3, s3_bucket, s3_key)
+    except Exception as ex:
+        print(f"{name} probe failed: {ex}")
+        return None
+    if metadata:
+        utils.dynamodb_table_update(DYNAMO_VIDEO_TASK_TABLE, task_id, {f"MetaData.{name}": metadata})
+    return metadata
+
+def update_waveform(s3_bucket, s3_key, task_id, timeout):
+    try:
+        import waveform
+        peaks = waveform.generate_waveform(s3, get_media_source(s3_bucket, s3_key), s3_bucket, f'tasks/{task_id}/waveform.dat',
+                                           timeout=timeout)
+    except Exception as ex:
+        print(f"Waveform generation failed: {ex}")
+        return None
+    if peaks:
+        utils.dynamodb_table_update(DYNAMO_VIDEO_TASK_TABLE, task_id, {"MetaData.Waveform": peaks})
+    return peaks
+
+def detect_video_scenes(job, context):
+    scenes = get_video_scenes(job["S3Bucket"], job["S3Key"], job["TaskId"], job["Duration"], job["Resolution"],
+                              timeout=stage_timeout_s(context))
+    if scenes is not None:
+        utils.dynamodb_table_update(DYNAMO_VIDEO_TASK_TABLE, job["TaskId"], {"MetaData.Scenes": scenes})
+    return scenes
+
+def generate_video_sprites(job, context):
+    try:
+        sprites = sprite_generator.generate_sprites(s3, get_media_source(job["S3Bucket"], job["S3Key"]), job["Duration"],
+            job["Resolution"], job["S3Bucket"], f'tasks/{job["TaskId"]}/{SPRITE_S3_PREFIX}', timeout=stage_timeout_s(context))
+    except Exception as ex:
+        print(f"Sprite generation failed: {ex}")
+        return None
+    if sprites:
+        utils.dynamodb_table_update(DYNAMO_VIDEO_TASK_TABLE, job["TaskId"], {"MetaData.Sprites": sprites})
+    return sprites
+
+def get_video_scenes(s3_bucket, s3_key, task_id, duration, resolution, timeout):
+    source_url = get_media_source(s3_bucket, s3_key)
+    try:
+        import scene_detector
+        items = scene_detector.detect_scenes(source_url, duration, resolution, timeout=timeout)
+    except Exception as ex:
+        print(f"Scene detection failed: {ex}")
+        return None
+    if not items:
+        return None
+
+    # Extract keyframes at full resolution and upload them
+    keyframe_prefix = f'tasks/{task_id}/{SCENE_KEYFRAME_S3_PREFIX}'
+    def upload_keyframe(indexed_scene):
+        i, scene = indexed_scene
+        keyframe_local_path = f'{local_path}keyframe_{i}.jpeg'
+        if media_probe.extract_frame(source_url, scene["KeyframeSec"], keyframe_local_path):
+            scene["KeyframeS3Key"] = f'{keyframe_prefix}{i}.jpg'
+            s3.upload_file(keyframe_local_path, s3_bucket, scene["KeyframeS3Key"], ExtraArgs={"ContentType": "image/jpeg"})
+            os.remove(keyframe_local_path)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(upload_keyframe, enumerate(items)))
+
+    print(f"Detected {len(items)} scenes")
+    return {
+        "Count": len(items),
+        "S3Bucket": s3_bucket,
+        "S3Prefix": keyframe_prefix,
+        "Items": items,
+    }
+
+def sample_video_chunk(job):
+    '''Sample one chunk, then atomically add its frame count to TotalFramesSampled.'''
+    source_url = get_media_source(job["S3Bucket"], job["S3Key"])
+    try:
+        sampled = frame_sampler.sample_chunk(s3, source_url, job["Chunk"], float(job["SampleIntervalS"]),
+                                             job["FrameS3Bucket"], job["FrameS3Prefix"])
+    except Exception as ex:
+        print(f"Failed to sample chunk {job['Chunk']}: {ex}")
+        return 0
+    if sampled:
+        utils.dynamodb_table_add(DYNAMO_VIDEO_TASK_TABLE, job["TaskId"], "MetaData.VideoFrameS3.TotalFramesSampled", sampled)
+    return sampled
         
+def get_video_metadata_probe(event):
+    s3_bucket = event["Request"]["File"]["S3Object"]["Bucket"]
+    s3_key = event["Request"]["File"]["S3Object"]["Key"]
+    video_file_name = s3_key.split('/')[-1]
+    thumbnail_s3_key = s3_key.replace(video_file_name, "thumbnail.jpeg")
+
+    try:
+        probe = media_probe.probe_s3_media(s3, s3_bucket, s3_key)
+    except Exception as ex:
+        print(f"Media probe failed: {ex}")
+        probe = None
+    if probe is None:
+        return None
+    print(f"Probed {s3_key} from {probe['Source']}")
+
+    # ffmpeg reads the presigned URL instead of a local copy
+    generate_thumbnail(probe["Url"], probe["Duration"], probe["Resolution"], s3_bucket, thumbnail_s3_key)
+
+    return {
+        'Size': probe["Size"],
+        'Resolution': probe["Resolution"],
+        'Duration': probe["Duration"],
+        'Fps': probe["Fps"],
+        'NameFormat': probe["NameFormat"],
+        'ThumbnailS3Bucket': s3_bucket,
+        'ThumbnailS3Key': thumbnail_s3_key,
+    }
+
 def get_video_metadata(event, file_path):
     video_file_name = event["Request"]["File"]["S3Object"]["Key"].split('/')[-1]
-    thumbnail_local_path = f'{local_path}thumbnail.jpeg'
     thumbnail_s3_bucket = event["Request"]["File"]["S3Object"]["Bucket"]
     thumbnail_s3_key = f'{event["Request"]["File"]["S3Object"]["Key"].replace(video_file_name, "thumbnail.jpeg")}'
 
+    from moviepy import VideoFileClip
     video_clip = VideoFileClip(file_path)    
-    # Get thumbnail - avoid black screen
-    for i in range(0, int(video_clip.duration)):
-        # Get frame and store on local disk
-        video_clip.save_frame(thumbnail_local_path, t=i)
-        # Upload to S3
-        s3.upload_file(thumbnail_local_path, thumbnail_s3_bucket, thumbnail_s3_key)
-        
-        # Check if image is black frame
-        is_black_frame = is_single_color_frame(thumbnail_s3_bucket, thumbnail_s3_key)
-        if is_black_frame is not None and is_black_frame==True:
-            break
+    generate_thumbnail(file_path, video_clip.duration, video_clip.size, thumbnail_s3_bucket, thumbnail_s3_key)
     
     # construct metadata
     metadata = {
@@ -123,6 +350,48 @@ def get_video_metadata(event, file_path):
 
     return metadata
 
+def generate_thumbnail(source, duration, resolution, s3_bucket, thumbnail_s3_key):
+    '''
+    Pick the thumbnail by scoring decoded keyframes locally; only the chosen frame is extracted
+    at full resolution and uploaded. Falls back to the per-second model check if scoring fails.
+    '''
+    thumbnail_local_path = f'{local_path}thumbnail.jpeg'
+    try:
+        import thumbnail_selector
+        ranked = thumbnail_selector.rank_candidates(source, duration, resolution)
+    except Exception as ex:
+        print(f"Thumbnail scoring failed: {ex}")
+        ranked = []
+    if not ranked:
+        return generate_thumbnail_by_model(source, duration, s3_bucket, thumbnail_s3_key)
+
+    # With model confirmation, a rejected winner is replaced by the runner-up without a second call
+    candidates = ranked[:2] if THUMBNAIL_MODEL_CONFIRM else ranked[:1]
+    for i, (t, score) in enumerate(candidates):
+        if not media_probe.extract_frame(source, t, thumbnail_local_path):
+            continue
+        s3.upload_file(thumbnail_local_path, s3_bucket, thumbnail_s3_key)
+        print(f"Thumbnail at {t}s, score {score:.3f} ({len(ranked)} candidates)")
+        if not THUMBNAIL_MODEL_CONFIRM or i > 0 or is_single_color_frame(s3_bucket, thumbnail_s3_key):
+            return t
+    return None
+
+def generate_thumbnail_by_model(source, duration, s3_bucket, thumbnail_s3_key):
+    thumbnail_local_path = f'{local_path}thumbnail.jpeg'
+    # Get thumbnail - avoid black screen
+    for i in range(0, int(duration)):
+        # Get frame and store on local disk
+        if not media_probe.extract_frame(source, i, thumbnail_local_path):
+            break
+        # Upload to S3
+        s3.upload_file(thumbnail_local_path, s3_bucket, thumbnail_s3_key)
+        
+        # Check if image is black frame
+        is_black_frame = is_single_color_frame(s3_bucket, thumbnail_s3_key)
+        if is_black_frame is not None and is_black_frame==True:
+            return i
+    return None
+
 
 def bedrock_converse(config, max_retries=3, retry_delay=1, image_s3_bucket=None, image_s3_key=None):
     inference_config = config.get("inferConfig")
@@ -0,0 +1,75 @@
+'''
+Scene-change detection.
+Decodes the video once as a small grayscale stream at a low frame rate and scores each
+consecutive frame pair with NumPy, combining histogram distance and mean pixel difference.
+Scene boundaries are placed where the score crosses a threshold, and the highest-quality
+frame in each scene is chosen as its keyframe.
+'''
+import subprocess
+import numpy as np
+import media_probe
+import thumbnail_selector
+
+DECODE_WIDTH = 64
+DETECT_FPS = 2
+THRESHOLD = 0.3
+MIN_SCENE_S = 1.0
+MAX_SCENES = 200
+
+
+def decode_stream(source, resolution, fps=DETECT_FPS, timeout=840):
+    '''
+    Decode the whole video at fps as DECODE_WIDTH-wide grayscale frames, shape (n, height, width).
+    Raises subprocess.TimeoutExpired if decoding takes longer than timeout seconds.
+    '''
+    width = DECODE_WIDTH
+    height = max(2, int(round(width * resolution[1] / resolution[0] / 2)) * 2)
+    result = subprocess.run(
+        [media_probe.get_ffmpeg_binary(), "-hide_banner", "-nostats", "-v", "error", "-i", source, "-an",
+         "-vf", f"fps={fps},scale={width}:{height},format=gray", "-f", "rawvideo", "pipe:1"],
+        capture_output=True, timeout=timeout
+    )
+    count = len(result.stdout) // (width * height)
+    return np.frombuffer(result.stdout[:count * width * height], dtype=np.uint8).reshape(count, height, width)
+
+def change_scores(frames):
+    '''Score in [0, 1] for each consecutive frame pair; element i compares frame i and i + 1.'''
+    histograms = thumbnail_selector.luma_histograms(frames)
+    histogram_distance = 0.5 * np.abs(np.diff(histograms, axis=0)).sum(axis=1)
+    pixel_difference = np.abs(np.diff(frames.astype(np.int16), axis=0)).mean(axis=(1, 2)) / 255.0
+    return 0.5 * histogram_distance + 0.5 * np.minimum(pixel_difference * 2, 1.0)
+
+def select_boundaries(scores, fps, threshold=THRESHOLD, min_scene_s=MIN_SCENE_S, max_scenes=MAX_SCENES):
+    '''Frame indexes where a new scene starts, strongest cuts first when limiting to max_scenes.'''
+    min_gap = max(1, int(round(min_scene_s * fps)))
+    candidates = np.flatnonzero(scores > threshold) + 1
+    # Keep the strongest cuts that are at least min_gap frames from an accepted one
+    accepted = []
+    for index in candidates[np.argsort(-scores[candidates - 1], kind="stable")]:
+        if len(accepted) >= max_scenes - 1:
+            break
+        if index >= min_gap and all(abs(index - a) >= min_gap for a in accepted):
+            accepted.append(int(index))
+    return sorted(accepted)
+
+def detect_scenes(source, duration, resolution, fps=DETECT_FPS, timeout=840):
+    '''
+    Returns a list of {StartSec, EndSec, KeyframeSec, Score} covering the video, or [] when
+    the video can't be decoded.
+    '''
+    frames = decode_stream(source, resolution, fps, timeout)
+    if len(frames) == 0:
+        return []
+
+    boundaries = select_boundaries(change_scores(frames), fps) if len(frames) > 1 else []
+    quality = thumbnail_selector.score_frames(frames)
+    scenes = []
+    for start, end in zip([0] + boundaries, boundaries + [len(frames)]):
+        keyframe = start + int(np.argmax(quality[start:end]))
+        scenes.append({
+            "StartSec": round(start / fps, 2),
+            "EndSec": round(min(end / fps, duration), 2) if duration else round(end / fps, 2),
+            "KeyframeSec": round(keyframe / fps, 2),
+            "Score": round(float(quality[keyframe]), 3),
+        })
+    return scenes
@@ -0,0 +1,90 @@
+'''
+Sprite-sheet scrub previews.
+One sequential ffmpeg pass samples a frame every interval, scales it to a tile and packs
+COLUMNS x ROWS tiles per JPEG sheet. A WebVTT track and a JSON index map time to sheet and
+tile coordinates, so a preview costs one small image fetch.
+'''
+import json
+import math
+import os
+import shutil
+import subprocess
+import media_probe
+
+TILE_WIDTH = 160
+COLUMNS = 10
+ROWS = 10
+MIN_INTERVAL_S = 1
+MAX_TILES = 1000
+JPEG_QUALITY = 5  # ffmpeg -q:v, 2 (best) - 31
+
+
+def get_interval(duration):
+    '''Seconds between tiles: one per MIN_INTERVAL_S, widened so long videos stay within MAX_TILES.'''
+    return max(MIN_INTERVAL_S, math.ceil(duration / MAX_TILES))
+
+def format_vtt_time(seconds):
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{int(h):02d}:{int(m):02d}:{s:06.3f}"
+
+def tile_position(index, tile_width, tile_height):
+    '''(sheet, x, y) of the index-th tile.'''
+    sheet, position = divmod(index, COLUMNS * ROWS)
+    return sheet, (position % COLUMNS) * tile_width, (position // COLUMNS) * tile_height
+
+def build_vtt(tile_count, interval, duration, tile_width, tile_height, sheet_names):
+    lines = ["WEBVTT", ""]
+    for i in range(tile_count):
+        sheet, x, y = tile_position(i, tile_width, tile_height)
+        start, end = i * interval, min((i + 1) * interval, duration)
+        lines.append(f"{format_vtt_time(start)} --> {format_vtt_time(end)}")
+        lines.append(f"{sheet_names[sheet]}#xywh={x},{y},{tile_width},{tile_height}")
+        lines.append("")
+    return "\n".join(lines)
+
+def generate_sprites(s3, source, duration, resolution, s3_bucket, s3_prefix, work_dir="/tmp/sprites", timeout=840):
+    '''
+    Generate sprite sheets, sprites.vtt and sprites.json under s3_prefix.
+    Returns the index (also stored as sprites.json), or None if no sheet was produced.
+    Raises subprocess.TimeoutExpired if decoding takes longer than timeout seconds.
+    '''
+    interval = get_interval(duration)
+    tile_height = max(2, int(round(TILE_WIDTH * resolution[1] / resolution[0] / 2)) * 2)
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        subprocess.run(
+            [media_probe.get_ffmpeg_binary(), "-v", "error", "-i", source, "-an",
+             "-vf", f"fps=1/{interval},scale={TILE_WIDTH}:{tile_height},tile={COLUMNS}x{ROWS}",
+             "-q:v", str(JPEG_QUALITY), os.path.join(work_dir, "sprite_%d.jpg")],
+            capture_output=True, timeout=timeout
+        )
+        # ffmpeg numbers outputs from 1
+        sheet_files = sorted(os.listdir(work_dir), key=lambda name: int(name[7:-4]))
+        if not sheet_files:
+            return None
+        sheet_names = [f"sprite_{i}.jpg" for i in range(len(sheet_files))]
+        for name, local_name in zip(sheet_names, sheet_files):
+            s3.upload_file(os.path.join(work_dir, local_name), s3_bucket, f"{s3_prefix}{name}",
+                           ExtraArgs={"ContentType": "image/jpeg", "CacheControl": "max-age=31536000"})
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    tile_count = min(math.ceil(duration / interval), len(sheet_names) * COLUMNS * ROWS)
+    index = {
+        "S3Bucket": s3_bucket,
+        "S3Prefix": s3_prefix,
+        "Sheets": sheet_names,
+        "VttS3Key": f"{s3_prefix}sprites.vtt",
+        "IndexS3Key": f"{s3_prefix}sprites.json",
+        "IntervalS": interval,
+        "TileWidth": TILE_WIDTH,
+        "TileHeight": tile_height,
+        "Columns": COLUMNS,
+        "Rows": ROWS,
+        "TileCount": tile_count,
+    }
+    s3.put_object(Bucket=s3_bucket, Key=index["VttS3Key"], ContentType="text/vtt",
+                  Body=build_vtt(tile_count, interval, duration, TILE_WIDTH, tile_height, sheet_names))
+    s3.put_object(Bucket=s3_bucket, Key=index["IndexS3Key"], ContentType="application/json", Body=json.dumps(index))
+    return index
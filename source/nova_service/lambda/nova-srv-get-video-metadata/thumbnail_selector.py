@@ -0,0 +1,86 @@
+'''
+Local thumbnail selection.
+Decodes the keyframes of the opening window of a video in one downscaled grayscale ffmpeg pass
+and scores them with vectorized luminance contrast, edge density and histogram entropy, so a
+thumbnail can be chosen without uploading or sending every candidate to a model.
+'''
+import re
+import subprocess
+import numpy as np
+import media_probe
+
+SCAN_WINDOW_S = 120
+MAX_CANDIDATES = 48
+DECODE_WIDTH = 160
+
+# Frames this dark or bright are treated as blank regardless of their other scores
+MIN_MEAN_LUMA = 20
+MAX_MEAN_LUMA = 235
+EDGE_THRESHOLD = 24
+HISTOGRAM_BINS = 32
+
+
+def decode_candidates(source, duration, resolution, window_s=SCAN_WINDOW_S, max_candidates=MAX_CANDIDATES):
+    '''
+    Decode keyframes in the first window_s seconds as DECODE_WIDTH-wide grayscale frames.
+    Returns (timestamps, frames) with frames shaped (n, height, width) uint8.
+    '''
+    width = DECODE_WIDTH
+    height = max(2, int(round(width * resolution[1] / resolution[0] / 2)) * 2)
+    window_s = min(window_s, duration) if duration else window_s
+
+    result = subprocess.run(
+        [media_probe.get_ffmpeg_binary(), "-hide_banner", "-nostats",
+         "-skip_frame", "nokey", "-t", str(window_s), "-i", source,
+         "-vf", f"scale={width}:{height},format=gray,showinfo",
+         "-fps_mode", "passthrough", "-an", "-f", "rawvideo", "pipe:1"],
+        capture_output=True, timeout=300
+    )
+    frame_size = width * height
+    count = len(result.stdout) // frame_size
+    timestamps = [float(t) for t in re.findall(r"pts_time:\s*([\d.]+)", result.stderr.decode("utf-8", "ignore"))][:count]
+    if count == 0 or len(timestamps) != count:
+        return [], None
+
+    frames = np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8).reshape(count, height, width)
+    if count > max_candidates:
+        keep = np.linspace(0, count - 1, max_candidates).astype(int)
+        frames = frames[keep]
+        timestamps = [timestamps[i] for i in keep]
+    return timestamps, frames
+
+def luma_histograms(frames, bins=HISTOGRAM_BINS):
+    '''Normalized per-frame luminance histograms, shape (n, bins), from a single bincount.'''
+    n = frames.shape[0]
+    shift = 8 - int(np.log2(bins))
+    # Offset each frame's bin indices so all histograms come out of one bincount
+    indices = (frames.reshape(n, -1) >> shift).astype(np.int64) + (np.arange(n) * bins)[:, None]
+    histograms = np.bincount(indices.ravel(), minlength=n * bins).reshape(n, bins)
+    return histograms / histograms.sum(axis=1, keepdims=True)
+
+def score_frames(frames):
+    '''Score each frame in [0, 1]; higher is a better thumbnail.'''
+    n = frames.shape[0]
+    pixels = frames.reshape(n, -1).astype(np.float32)
+    mean = pixels.mean(axis=1)
+    contrast = np.minimum(pixels.std(axis=1) / 64.0, 1.0)
+
+    luma = frames.astype(np.int16)
+    edges = (np.abs(np.diff(luma, axis=1))[:, :, :-1] + np.abs(np.diff(luma, axis=2))[:, :-1, :]) > EDGE_THRESHOLD
+    edge_density = np.minimum(edges.reshape(n, -1).mean(axis=1) / 0.15, 1.0)
+
+    p = luma_histograms(frames)
+    entropy = -(p * np.log2(np.where(p > 0, p, 1))).sum(axis=1) / np.log2(HISTOGRAM_BINS)
+
+    scores = 0.35 * contrast + 0.3 * edge_density + 0.35 * entropy
+    scores[(mean < MIN_MEAN_LUMA) | (mean > MAX_MEAN_LUMA)] = 0
+    return scores
+
+def rank_candidates(source, duration, resolution):
+    '''Return candidate timestamps ordered from best to worst, with their scores.'''
+    timestamps, frames = decode_candidates(source, duration, resolution)
+    if not timestamps:
+        return []
+    scores = score_frames(frames)
+    order = np.argsort(-scores, kind="stable")
+    return [(timestamps[i], float(scores[i])) for i in order]
@@ -0,0 +1,81 @@
+'''
+Audio waveform peaks.
+Stream-decodes the audio track to mono 16-bit PCM with ffmpeg and reduces each bucket of
+SAMPLES_PER_PIXEL samples to its min/max with NumPy as the PCM arrives. The peaks are written in
+the audiowaveform binary .dat format (version 1, 8-bit) that waveform renderers such as
+peaks.js load directly.
+'''
+import struct
+import subprocess
+import threading
+import numpy as np
+import media_probe
+
+SAMPLE_RATE = 8000
+SAMPLES_PER_PIXEL = 160  # 50 peaks per second
+READ_BUCKETS = 4096
+
+
+def compute_peaks(source, sample_rate=SAMPLE_RATE, samples_per_pixel=SAMPLES_PER_PIXEL, timeout=840):
+    '''
+    Returns an int8 array of interleaved (min, max) pairs, one pair per bucket,
+    or None if the source has no decodable audio.
+    ffmpeg is killed and subprocess.TimeoutExpired raised once timeout seconds have passed,
+    so a stalled read of a presigned URL can't hang the caller.
+    '''
+    command = [media_probe.get_ffmpeg_binary(), "-v", "error", "-i", source, "-vn", "-ac", "1", "-ar", str(sample_rate),
+               "-f", "s16le", "pipe:1"]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    expired = threading.Event()
+    def kill():
+        expired.set()
+        process.kill()
+    # Killing ffmpeg closes the pipe, which ends the blocking read below
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    block_bytes = samples_per_pixel * READ_BUCKETS * 2
+    peaks, carry = [], np.empty(0, dtype=np.int16)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            samples = np.concatenate([carry, np.frombuffer(data[:len(data) // 2 * 2], dtype="<i2")])
+            full = len(samples) // samples_per_pixel * samples_per_pixel
+            buckets, carry = samples[:full].reshape(-1, samples_per_pixel), samples[full:]
+            if len(buckets):
+                peaks.append(np.stack([buckets.min(axis=1), buckets.max(axis=1)], axis=1))
+        if len(carry):
+            peaks.append(np.array([[carry.min(), carry.max()]], dtype=np.int16))
+    finally:
+        timer.cancel()
+        process.stdout.close()
+        process.wait()
+
+    if expired.is_set():
+        raise subprocess.TimeoutExpired(command, timeout)
+    if not peaks:
+        return None
+    # 16-bit to 8-bit by keeping the high byte
+    return (np.concatenate(peaks) >> 8).astype(np.int8).ravel()
+
+def to_dat(peaks, sample_rate=SAMPLE_RATE, samples_per_pixel=SAMPLES_PER_PIXEL):
+    '''audiowaveform .dat v1: version, flags (1 = 8-bit), sample rate, samples per pixel, length, then min/max pairs.'''
+    header = struct.pack("<iIiiI", 1, 1, sample_rate, samples_per_pixel, len(peaks) // 2)
+    return header + peaks.tobytes()
+
+def generate_waveform(s3, source, s3_bucket, s3_key, timeout=840):
+    '''Compute peaks for source and store them at s3_key. Returns the metadata stored on the task, or None.'''
+    peaks = compute_peaks(source, timeout=timeout)
+    if peaks is None:
+        return None
+    s3.put_object(Bucket=s3_bucket, Key=s3_key, Body=to_dat(peaks), ContentType="application/octet-stream")
+    return {
+        "S3Bucket": s3_bucket,
+        "S3Key": s3_key,
+        "Format": "audiowaveform-dat",
+        "Bits": 8,
+        "SampleRate": SAMPLE_RATE,
+        "SamplesPerPixel": SAMPLES_PER_PIXEL,
+        "Length": len(peaks) // 2,
+    }
@@ -1,16 +1,15 @@
 import json
-import boto3
 import os
 import utils
 from datetime import datetime
+from nova_common import clients
 
 DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
 DYNAMO_VIDEO_FRAME_TABLE = os.environ.get("DYNAMO_VIDEO_FRAME_TABLE")
 DYNAMO_VIDEO_TRANS_TABLE = os.environ.get("DYNAMO_VIDEO_TRANS_TABLE")
 
 S3_PRESIGNED_URL_EXPIRY_S = os.environ.get("S3_PRESIGNED_URL_EXPIRY_S", 3600) # Default 1 hour 
-s3 = boto3.client("s3")
-dynamodb = boto3.resource('dynamodb')
+s3 = clients.lazy('s3')
 
 def lambda_handler(event, context):
     task_id = event.get("TaskId")    
@@ -51,6 +50,21 @@ def lambda_handler(event, context):
                 ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
             )
         task["MetaData"] = db_task["MetaData"]
+        # Sprite sheets for scrub previews: one URL per sheet, tiles located via the index fields
+        sprites = task["MetaData"].get("Sprites")
+        if sprites:
+            sprites["SheetUrls"] = [s3.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': sprites["S3Bucket"], 'Key': f'{sprites["S3Prefix"]}{name}'},
+                    ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
+                ) for name in sprites["Sheets"]]
+        waveform = task["MetaData"].get("Waveform")
+        if waveform:
+            waveform["Url"] = s3.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': waveform["S3Bucket"], 'Key': waveform["S3Key"]},
+                    ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
+                )
         try:
             task["MetaData"]["VideoMetaData"]["Fps"] = float(task["MetaData"]["VideoMetaData"]["Fps"])
             task["MetaData"]["VideoMetaData"]["Size"] = float(task["MetaData"]["VideoMetaData"]["Size"])
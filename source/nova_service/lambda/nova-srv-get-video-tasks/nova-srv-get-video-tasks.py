@@ -2,24 +2,29 @@
 "Source": mm_embedding | text_embedding | text,
 '''
 import json
-import boto3
 import os
 import utils
 import re
+import base64
 from urllib.parse import urlparse
+from nova_common import clients
 
 DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
 DYNAMO_VIDEO_FRAME_TABLE = os.environ.get("DYNAMO_VIDEO_FRAME_TABLE")
 DYNAMO_VIDEO_TRANS_TABLE = os.environ.get("DYNAMO_VIDEO_FRAME_TABLE")
+DYNAMO_TASK_NAME_INDEX_TABLE = os.environ.get("DYNAMO_TASK_NAME_INDEX_TABLE")
+DYNAMO_TASK_SUMMARY_TABLE = os.environ.get("DYNAMO_TASK_SUMMARY_TABLE")
 
 S3_PRESIGNED_URL_EXPIRY_S = os.environ.get("S3_PRESIGNED_URL_EXPIRY_S", 3600) # Default 1 hour 
+# The web client grows PageSize as the user shows more results
+MAX_PAGE_SIZE = 1000
 
-s3 = boto3.client('s3')
+s3 = clients.lazy('s3')
 
 def lambda_handler(event, context):
     search_text = event.get("SearchText", "")
     page_size = event.get("PageSize", 10)
-    from_index = event.get("FromIndex", 0)
+    next_token = event.get("NextToken")
     request_by = event.get("RequestBy")
     source = event.get("Source")
     task_type = event.get("TaskType")
@@ -29,46 +34,59 @@ def lambda_handler(event, context):
     if len(search_text) > 0:
         search_text = search_text.strip()
 
-    tasks = utils.scan_task_with_pagination(DYNAMO_VIDEO_TASK_TABLE, keyword=search_text, start_index=0, page_size=1000)
-    #return tasks
-    result = []
-    if tasks:
-        for task in tasks:
-            task_id = task["Id"]
-            modality = task.get("Modality")
-            r = {
-                    "TaskId": task_id,
-                    "FileName": task["Request"]["FileName"],
-                    "TaskName": task["Request"].get("TaskName"),
-                    "Name": task["Request"].get("Name",task["Request"]["FileName"]),
-                    "Modality": modality,
-                    "RequestTs": task["RequestTs"],
-                    "Status": task["Status"],
-                    "RequestBy": task.get("RequestBy"),
-                    "EmbedCompleteTs": task.get("EmbedCompleteTs")
-                }
-            
-            s3_bucket = task.get("Request",{}).get("File", {}).get("S3Object",{}).get("Bucket")
-            s3_key = task.get("Request",{}).get("File", {}).get("S3Object",{}).get("Key")
-            if modality in ["image","audio","video","text"]:
-                r["S3Bucket"] = s3_bucket
-                r["S3Key"] = s3_key
-            if modality == "video":
-                r["S3BucketThumbnail"] = s3_bucket
-                path = "/".join(s3_key.split("/")[0:-1])
-                r["S3KeyThumbnail"] = f"{path}/thumbnail.jpeg"
-
-            result.append(r)
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        page_size = None
+    if page_size is None or not 1 <= page_size <= MAX_PAGE_SIZE:
+        return {
+            'statusCode': 400,
+            'body': f'PageSize must be between 1 and {MAX_PAGE_SIZE}'
+        }
 
-    # Sort by RequestTs
-    result = sorted(result, key=lambda x: x.get("RequestTs"), reverse=True)
+    # NextToken: opaque cursor wrapping the summary table key of the last returned task
+    start_key = None
+    if next_token:
+        try:
+            start_key = json.loads(base64.urlsafe_b64decode(next_token))
+        except Exception:
+            start_key = None
+        # It goes to DynamoDB as ExclusiveStartKey, so only a key of the summary table will do
+        if not isinstance(start_key, dict) or set(start_key) != {"ListPk", "SortKey"} \
+                or not all(isinstance(v, str) for v in start_key.values()):
+            return {
+                'statusCode': 400,
+                'body': 'Invalid NextToken'
+            }
 
-    # Pagination
-    end_index = from_index + page_size
-    if end_index > len(result):
-        end_index = len(result)
-
-    result = result[from_index:end_index]
+    page = None
+    if search_text and DYNAMO_TASK_NAME_INDEX_TABLE:
+        page = utils.search_task_names(DYNAMO_TASK_SUMMARY_TABLE, DYNAMO_TASK_NAME_INDEX_TABLE, search_text, page_size=page_size, start_key=start_key)
+    if page is None:
+        # No keyword, or one too short or too common for the name index
+        page = utils.query_task_page(DYNAMO_TASK_SUMMARY_TABLE, keyword=search_text, page_size=page_size, start_key=start_key)
+    tasks, last_key = page
+    # Summaries carry the list fields and thumbnail key as stored by nova-srv-task-projector
+    result = []
+    for task in tasks:
+        r = {
+                "TaskId": task["TaskId"],
+                "FileName": task.get("FileName"),
+                "TaskName": task.get("TaskName"),
+                "Name": task.get("Name", task.get("FileName")),
+                "Modality": task.get("Modality"),
+                "RequestTs": task["RequestTs"],
+                "Status": task.get("Status"),
+                "RequestBy": task.get("RequestBy"),
+                "EmbedCompleteTs": task.get("EmbedCompleteTs"),
+            }
+        if task.get("S3Key"):
+            r["S3Bucket"] = task.get("S3Bucket")
+            r["S3Key"] = task["S3Key"]
+        if task.get("ThumbnailS3Key"):
+            r["S3BucketThumbnail"] = task.get("S3Bucket")
+            r["S3KeyThumbnail"] = task["ThumbnailS3Key"]
+        result.append(r)
 
     # Generate URL (CloudFront or S3 presigned)
     cloudfront_domain = os.environ.get('CLOUDFRONT_DOMAIN', '')
@@ -105,5 +123,6 @@ def lambda_handler(event, context):
 
     return {
         'statusCode': 200,
-        'body': result
+        'body': result,
+        'NextToken': base64.urlsafe_b64encode(json.dumps(last_key).encode("utf-8")).decode("utf-8") if last_key else None
     }
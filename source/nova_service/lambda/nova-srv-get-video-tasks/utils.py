@@ -1,173 +1,103 @@
-import boto3
-import numbers,decimal
-from boto3.dynamodb.types import TypeDeserializer
-from boto3.dynamodb.conditions import Key
+# Shared with the other Lambdas through the nova_common layer
+from nova_common import dynamodb as ddb
+from nova_common.tasks import NAME_INDEX_COUNT_KEY, name_grams
 
-dynamodb = boto3.resource('dynamodb')
+TASK_LIST_PK = "task"
+# Tombstone written by bulk delete: hidden from the list until the worker removes the task
+TASK_STATUS_DELETING = "deleting"
 
-def dynamodb_table_upsert(table_name, document):
-    try:
-        document = convert_to_json_serializable(document)
-        table = dynamodb.Table(table_name)
-        return table.put_item(Item=document)
-    except Exception as e:
-        print(f"An error occurred, dynamodb_table_upsert: {e}")
-        return None
-    
-def dynamodb_get_by_id(table_name, id, key_name="Id", sort_key_value=None, sort_key=None):
-    try:
-        table = dynamodb.Table(table_name)
-        response = None
-        if sort_key and sort_key_value:
-            response = table.get_item(Key={key_name: sort_key_value, sort_key: sort_key})
-        else:
-            response = table.get_item(Key={key_name: id})
-        if 'Item' in response:
-            return convert_to_json_serializable(response['Item'])
-        else:
-            print(f"No item found with id: {document_id}")
-            return None
-    except Exception as e:
-        print(f"An error occurred, dynamodb_get_by_id: {e}")
-        return None
-    return None
-
-def dynamodb_delete_by_id(table_name, id):
-    try:
-        response = dynamodb_client.delete_item(
-            TableName=table_name,
-            Key=id
-        )
-        print(f"Item with key {key} deleted successfully from table '{table_name}'.")
-    except Exception as e:
-        print(f"Error deleting item with key {key} from table {table_name}: {str(e)}")
-
-
-def convert_to_json_serializable(item):
-    """
-    Recursively convert a DynamoDB item to a JSON serializable format.
+def query_task_page(table_name, keyword="", page_size=10, start_key=None):
     """
-    if isinstance(item, dict):
-        return {k: convert_to_json_serializable(v) for k, v in item.items()}
-    elif isinstance(item, list):
-        return [convert_to_json_serializable(v) for v in item]
-    elif isinstance(item, float):
-        return str(item)
-    elif isinstance(item, decimal.Decimal):
-        return str(item)
-    else:
-        return item
-
-def dynamodb_task_update_status(table_name, task_id, new_status):    
-    try:
-        response = dynamodb.update_item(
-            TableName=table_name,
-            Key={
-                'Id': {'S': task_id}
-            },
-            UpdateExpression="SET #status = :new_status",
-            ExpressionAttributeNames={
-                '#status': 'Status'
-            },
-            ExpressionAttributeValues={
-                ':new_status': {'S': new_status}
-            },
-            ReturnValues="UPDATED_NEW"
-        )
-        print(f"Update succeeded: {response}")
-    except Exception as e:
-        print(f"Error updating item in table {table_name}: {str(e)}")
-
-def count_items_by_task_id(table_name, task_id):
-    table = dynamodb.Table(table_name)
-    response = table.query(
-        IndexName='task_id-timestamp-index', 
-        KeyConditionExpression=Key('task_id').eq(task_id), 
-        Select='COUNT'
-    )
-    return response['Count']
-
-import boto3
+    Query one page of task summaries, newest first. Summaries share the ListPk partition and
+    sort by SortKey ("{RequestTs}#{Id}"). Tasks whose FileName or TaskName contains keyword
+    (case-insensitive) are returned.
 
-def query_task_with_pagination(table_name, request_by, keyword, start_index=0, page_size=10):
-    table = dynamodb.Table(table_name)
+    Args:
+        table_name (str): Name of the task summary table.
+        keyword (str, optional): Keyword to search in FileName or TaskName.
+        page_size (int, optional): Number of items to return. Defaults to 10.
+        start_key (dict, optional): Key returned by the previous page.
 
-    # Query operation parameters
+    Returns:
+        tuple[list[dict], dict | None]: The page of summaries and the key to resume after,
+        or None when there are no more items.
+    """
+    keyword_lower = keyword.lower()
     query_kwargs = {
-        'IndexName': 'RequestBy-index', 
-        'KeyConditionExpression': 'RequestBy = :request_by',
-        'ExpressionAttributeValues': {
-            ':request_by': request_by
-        }
+        'KeyConditionExpression': 'ListPk = :pk',
+        'ExpressionAttributeValues': {':pk': TASK_LIST_PK},
+        'ScanIndexForward': False,
     }
 
-    # Initialize variables for pagination
     items = []
-    pagination_token = None
-
     while True:
-        if pagination_token:
-            query_kwargs['ExclusiveStartKey'] = pagination_token
-
-        response = table.query(**query_kwargs)
-        # Filter items where file_name contains the keyword
-        keyword = keyword.lower()
-        filtered_items = [item for item in response['Items'] if keyword in item["Request"]["FileName"].lower()]
-        items.extend(filtered_items)
-
-        if 'LastEvaluatedKey' in response:
-            pagination_token = response['LastEvaluatedKey']
-        else:
-            break
-
-    # Handle manual pagination
-    end_index = start_index + page_size
-    paginated_items = items[start_index:end_index]
-
-    return paginated_items
-
-def scan_task_with_pagination(table_name, keyword, start_index=0, page_size=10):
+        # Without a keyword every item matches, so read exactly what is still needed
+        query_kwargs['Limit'] = max(page_size * 4, 50) if keyword_lower else page_size - len(items)
+        page, start_key = ddb.query(table_name, ExclusiveStartKey=start_key, **query_kwargs)
+
+        for item in page:
+            if item.get("Status") == TASK_STATUS_DELETING:
+                continue
+            if keyword_lower in item.get("FileName", "").lower() \
+                    or keyword_lower in item.get("TaskName", "").lower():
+                items.append(item)
+                if len(items) == page_size:
+                    # Resume right after the last returned item
+                    return items, {"ListPk": item["ListPk"], "SortKey": item["SortKey"]}
+
+        if not start_key:
+            return items, None
+
+NAME_INDEX_MIN_KEYWORD = 3
+# Above this many postings a keyword matches so many tasks that filtering the task list
+# fills a page sooner than reading the posting list
+NAME_INDEX_MAX_POSTINGS = 5000
+
+def search_task_names(summary_table_name, index_table_name, keyword, page_size=10, start_key=None):
     """
-    Scan a DynamoDB table for tasks where 'FileName' or 'TaskName' contains a keyword.
-    Supports manual pagination.
-
-    Args:
-        table_name (str): Name of the DynamoDB table.
-        keyword (str): Keyword to search in FileName or TaskName (case-insensitive).
-        start_index (int, optional): Start index for manual pagination. Defaults to 0.
-        page_size (int, optional): Number of items to return per page. Defaults to 10.
+    Search tasks whose FileName or TaskName contains keyword (case-insensitive) using the
+    trigram index table, newest first. Only the rarest trigram's posting list is read: the
+    substring check on the names stored in each posting implies every other trigram, so it
+    stands in for intersecting the remaining lists.
 
     Returns:
-        list[dict]: Paginated list of matching items.
+        tuple[list[dict], dict | None] | None: Same as query_task_page, or None if the keyword
+        is too short or too common for the index to help.
     """
-    table = dynamodb.Table(table_name)
-
-    items = []
-    scan_kwargs = {}  # Add any scan filters if needed in future
-    pagination_token = None
-
-    while True:
-        if pagination_token:
-            scan_kwargs['ExclusiveStartKey'] = pagination_token
-
-        response = table.scan(**scan_kwargs)
-
-        # Filter items by keyword in FileName or TaskName
-        keyword_lower = keyword.lower()
-        filtered_items = [
-            item for item in response.get('Items', [])
-            if keyword_lower in item.get("Request", {}).get("FileName", "").lower()
-            or keyword_lower in item.get("Request", {}).get("TaskName", "").lower()
-        ]
-        items.extend(filtered_items)
-
-        # Continue scanning if more items exist
-        pagination_token = response.get('LastEvaluatedKey')
-        if not pagination_token:
-            break
+    keyword_lower = keyword.lower()
+    if len(keyword_lower) < NAME_INDEX_MIN_KEYWORD:
+        return None
 
-    # Manual pagination
-    end_index = start_index + page_size
-    paginated_items = items[start_index:end_index]
+    grams = name_grams([keyword_lower])
+    counts = {g: 0 for g in grams}
+    for item in ddb.batch_get(index_table_name, [{"Gram": g, "TaskId": NAME_INDEX_COUNT_KEY} for g in grams]):
+        counts[item["Gram"]] = item.get("Count", 0)
+    rarest = min(counts, key=counts.get)
+    if counts[rarest] == 0:
+        return [], None
+    if counts[rarest] > NAME_INDEX_MAX_POSTINGS:
+        return None
 
-    return paginated_items
\ No newline at end of file
+    postings = ddb.query_all(
+        index_table_name,
+        KeyConditionExpression='Gram = :gram',
+        ProjectionExpression='TaskId, RequestTs, #names',
+        ExpressionAttributeNames={'#names': 'Names'},
+        ExpressionAttributeValues={':gram': rarest},
+    )
+    matches = [f'{posting["RequestTs"]}#{posting["TaskId"]}' for posting in postings
+               if posting["TaskId"] != NAME_INDEX_COUNT_KEY
+               and any(keyword_lower in name for name in posting.get("Names", []))]
+
+    matches.sort(reverse=True)
+    if start_key:
+        matches = [m for m in matches if m < start_key["SortKey"]]
+    page, has_more = matches[:page_size], len(matches) > page_size
+
+    keys = [{"ListPk": TASK_LIST_PK, "SortKey": sort_key} for sort_key in page]
+    summaries = {item["SortKey"]: item for item in ddb.batch_get(summary_table_name, keys)}
+    items = [summaries[sort_key] for sort_key in page
+             if sort_key in summaries and summaries[sort_key].get("Status") != TASK_STATUS_DELETING]
+    if not has_more or not page:
+        return items, None
+    return items, {"ListPk": TASK_LIST_PK, "SortKey": page[-1]}
@@ -1,13 +1,38 @@
+'''
+Multipart upload for the web client.
+Action:
+- create: start a multipart upload sized from FileSize and sign the first window of part URLs
+- sign-parts: sign URLs for the given PartNumbers, so part URLs are issued as the upload progresses
+- resume: list the parts S3 already has for UploadId and sign the next window of missing parts
+- complete: complete the upload from the client's part list or, given FileSize or PartCount,
+  from list_parts once every part has been uploaded.
+  With StartTask (the start-task request without TaskId/File), the embedding task starts at once.
+- abort: abort the upload
+'''
 import json
-import boto3
 import uuid
 import os
+import math
+from nova_common import clients
 
 S3_PRESIGNED_URL_EXPIRY_S = os.environ.get("S3_PRESIGNED_URL_EXPIRY_S", 3600) # Default 1 hour 
 VIDEO_UPLOAD_S3_BUCKET = os.environ.get("VIDEO_UPLOAD_S3_BUCKET")
 VIDEO_UPLOAD_S3_PREFIX = os.environ.get("VIDEO_UPLOAD_S3_PREFIX")
+LAMBDA_FUN_NAME_START_TASK = os.environ.get("LAMBDA_FUN_NAME_START_TASK")
 
-s3 = boto3.client('s3')
+# S3 multipart limits: parts of 5 MiB to 5 GiB (except the last), at most 10000 parts
+MIB = 1024 * 1024
+MIN_PART_SIZE = 8 * MIB
+MAX_PREFERRED_PART_SIZE = 64 * MIB
+MAX_PARTS = 10000
+# Enough parts to keep the client's parallel uploads busy, few enough to limit request overhead
+TARGET_PART_COUNT = 200
+UPLOAD_CONCURRENCY = 6
+PART_URL_WINDOW = 24
+MAX_PART_URLS_PER_REQUEST = 100
+
+s3 = clients.lazy('s3')
+lambda_client = clients.lazy('lambda')
 
 def lambda_handler(event, context):
     
@@ -18,32 +43,24 @@ def lambda_handler(event, context):
     key = f'tasks/{task_id}/{VIDEO_UPLOAD_S3_PREFIX}/{file_name}'
     
     if action == "create":
-        num_parts = event.get("NumParts", 5)
-        upload_id = None
+        file_size = event.get("FileSize")
+        if file_size is not None:
+            part_size, part_count = plan_parts(int(file_size))
+        else:
+            # Clients that don't send FileSize choose the part count themselves
+            part_size, part_count = None, event.get("NumParts", 5)
+        if part_count > MAX_PARTS:
+            return {
+                'statusCode': 400,
+                'body': f'File too large: more than {MAX_PARTS} parts'
+            }
         
         try:
             response = s3.create_multipart_upload(Bucket=VIDEO_UPLOAD_S3_BUCKET, Key=key)
             upload_id = response['UploadId']
-            
-            part_urls = []
-        
-            # Generate pre-signed URLs for each part
-            for part_number in range(1, num_parts + 1):
-                params = {
-                    'Bucket': VIDEO_UPLOAD_S3_BUCKET,
-                    'Key': key,
-                    'UploadId': upload_id,
-                    'PartNumber': part_number,
-                }
-                # Generate pre-signed URL with expiration time (e.g., 1 hour)
-                url = s3.generate_presigned_url('upload_part', Params=params, ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S)
-                part_urls.append(url)
-        
-            url = s3.generate_presigned_url(
-                'put_object',
-                Params={'Bucket': VIDEO_UPLOAD_S3_BUCKET, 'Key': key},
-                ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
-            )
+            # Legacy clients expect every part URL up front
+            window = PART_URL_WINDOW if part_size else part_count
+            part_urls = sign_parts(key, upload_id, range(1, min(part_count, window) + 1))
         except Exception as ex:
             return {
                 'statusCode': 500,
@@ -55,11 +72,67 @@ def lambda_handler(event, context):
             'body': {
                 "TaskId": task_id,
                 "FileName": file_name,
-                "UploadUrl": url,
                 "S3Bucket":VIDEO_UPLOAD_S3_BUCKET,
                 "S3Key": key,
                 "UploadId": upload_id,
-                "UploadPartUrls": part_urls
+                "PartSize": part_size,
+                "PartCount": part_count,
+                "Concurrency": UPLOAD_CONCURRENCY,
+                "UploadPartUrls": [p["Url"] for p in part_urls],
+                "PartUrls": part_urls
+            }
+        }
+    elif action == "sign-parts":
+        upload_id = event.get("UploadId")
+        part_numbers = event.get("PartNumbers", [])
+        if not upload_id or not isinstance(part_numbers, list) or not part_numbers \
+                or len(part_numbers) > MAX_PART_URLS_PER_REQUEST \
+                or any(type(n) is not int or not 1 <= n <= MAX_PARTS for n in part_numbers):
+            return {
+                'statusCode': 400,
+                'body': f'Require UploadId and 1 to {MAX_PART_URLS_PER_REQUEST} PartNumbers between 1 and {MAX_PARTS}'
+            }
+        return {
+            'statusCode': 200,
+            'body': {
+                "UploadId": upload_id,
+                "PartUrls": sign_parts(key, upload_id, part_numbers)
+            }
+        }
+    elif action == "resume":
+        upload_id = event.get("UploadId")
+        file_size = event.get("FileSize")
+        if not upload_id or file_size is None:
+            return {
+                'statusCode': 400,
+                'body': 'Require UploadId and FileSize'
+            }
+        try:
+            uploaded = list_uploaded_parts(key, upload_id)
+        except s3.exceptions.NoSuchUpload:
+            return {
+                'statusCode': 400,
+                'body': f'Upload does not exist or has been completed: {upload_id}'
+            }
+        part_size, part_count = plan_parts(int(file_size))
+        # Parts of another size belong to a different plan and are uploaded again
+        done = {p["PartNumber"] for p in uploaded
+                if p["Size"] == part_size or (p["PartNumber"] == part_count and p["Size"] == int(file_size) - part_size * (part_count - 1))}
+        missing = [n for n in range(1, part_count + 1) if n not in done]
+        return {
+            'statusCode': 200,
+            'body': {
+                "TaskId": task_id,
+                "FileName": file_name,
+                "S3Bucket": VIDEO_UPLOAD_S3_BUCKET,
+                "S3Key": key,
+                "UploadId": upload_id,
+                "PartSize": part_size,
+                "PartCount": part_count,
+                "Concurrency": UPLOAD_CONCURRENCY,
+                "UploadedParts": [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in uploaded if p["PartNumber"] in done],
+                "MissingParts": missing,
+                "PartUrls": sign_parts(key, upload_id, missing[:PART_URL_WINDOW])
             }
         }
     elif action == 'complete':
@@ -67,17 +140,51 @@ def lambda_handler(event, context):
         multi_parts_upload = event.get("MultipartUpload")
         
         try:
+            if not multi_parts_upload:
+                # Completing with missing parts would silently produce a truncated object
+                file_size, part_count = event.get("FileSize"), event.get("PartCount")
+                if part_count is None and file_size is not None:
+                    part_count = plan_parts(int(file_size))[1]
+                uploaded = list_uploaded_parts(key, upload_id)
+                if part_count is None \
+                        or sorted(p["PartNumber"] for p in uploaded) != list(range(1, int(part_count) + 1)) \
+                        or (file_size is not None and sum(p["Size"] for p in uploaded) != int(file_size)):
+                    return {
+                        'statusCode': 400,
+                        'body': 'Require MultipartUpload, or FileSize or PartCount with every part uploaded'
+                    }
+                multi_parts_upload = [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in uploaded]
             response = s3.complete_multipart_upload(
                 Bucket = VIDEO_UPLOAD_S3_BUCKET,
                 Key = key,
-                MultipartUpload = {'Parts': multi_parts_upload},
+                MultipartUpload = {'Parts': sorted(multi_parts_upload, key=lambda p: p["PartNumber"])},
                 UploadId= upload_id
             )
+        except s3.exceptions.NoSuchUpload:
+            # Completed already, e.g. by a retried request whose first response was lost:
+            # go on to start the task if the object is there
+            try:
+                s3.head_object(Bucket=VIDEO_UPLOAD_S3_BUCKET, Key=key)
+            except Exception:
+                return {
+                    'statusCode': 400,
+                    'body': f'Upload does not exist or has been completed: {upload_id}'
+                }
         except Exception as ex:
             return {
                 'statusCode': 500,
                 'body': f'Failed to complete the uploading task: {ex}'
             }
+
+        start_task = event.get("StartTask")
+        if start_task is not None:
+            # start-task is idempotent per TaskId, so a retried completion starts one task
+            return invoke_start_task({
+                **start_task,
+                "TaskId": task_id,
+                "FileName": start_task.get("FileName", file_name),
+                "File": {"S3Object": {"Bucket": VIDEO_UPLOAD_S3_BUCKET, "Key": key}},
+            })
         return {
                 'statusCode': 200,
                 'body': f'Uploading task completed.'
@@ -98,4 +205,51 @@ def lambda_handler(event, context):
     return {
             'statusCode': 400,
             'body': 'Invalid request'
-        }
\ No newline at end of file
+        }
+
+def invoke_start_task(request):
+    '''Run nova-srv-start-task and return its response.'''
+    try:
+        response = lambda_client.invoke(
+            FunctionName=LAMBDA_FUN_NAME_START_TASK,
+            InvocationType='RequestResponse',
+            Payload=json.dumps(request)
+        )
+        result = json.loads(response["Payload"].read())
+        if "FunctionError" in response:
+            raise RuntimeError(result.get("errorMessage", result))
+        return result
+    except Exception as ex:
+        return {
+            'statusCode': 500,
+            'body': f'Upload completed, failed to start the task: {ex}'
+        }
+
+def plan_parts(file_size):
+    '''
+    (part size, part count) for a file: MIN_PART_SIZE parts for small files, growing towards
+    MAX_PREFERRED_PART_SIZE to keep near TARGET_PART_COUNT parts, and beyond that only as far as
+    needed to stay within MAX_PARTS. Sizes are whole MiB.
+    '''
+    part_size = max(MIN_PART_SIZE,
+                    min(MAX_PREFERRED_PART_SIZE, math.ceil(file_size / TARGET_PART_COUNT)),
+                    math.ceil(file_size / MAX_PARTS))
+    part_size = math.ceil(part_size / MIB) * MIB
+    return part_size, max(1, math.ceil(file_size / part_size))
+
+def sign_parts(key, upload_id, part_numbers):
+    return [{
+        "PartNumber": part_number,
+        "Url": s3.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': VIDEO_UPLOAD_S3_BUCKET, 'Key': key, 'UploadId': upload_id, 'PartNumber': part_number},
+            ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
+        )
+    } for part_number in part_numbers]
+
+def list_uploaded_parts(key, upload_id):
+    parts = []
+    paginator = s3.get_paginator('list_parts')
+    for page in paginator.paginate(Bucket=VIDEO_UPLOAD_S3_BUCKET, Key=key, UploadId=upload_id):
+        parts.extend(page.get("Parts", []))
+    return parts
@@ -4,18 +4,23 @@
 3. Start extraction step functions workflow
 '''
 import json
-import boto3
 import os
 import utils
 import re
+import time
 from datetime import datetime, timezone
+from nova_common import clients, dynamodb as ddb
 
 DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
 NOVA_S3_VECTOR_BUCKET = os.environ.get("NOVA_S3_VECTOR_BUCKET")
 NOVA_S3_VECTOR_INDEX = os.environ.get("NOVA_S3_VECTOR_INDEX")
+LIBRARY_EPOCH_S3_KEY = os.environ.get("LIBRARY_EPOCH_S3_KEY", "cache/library-epoch")
+CLIP_INDEX_S3_KEY_TEMPLATE = "tasks/{task_id}/clip-index.json"
+CLIP_INDEX_MAX_ATTEMPTS = 5
+DELETE_VECTORS_BATCH_SIZE = 500
 
-s3 = boto3.client('s3')
-s3vectors = boto3.client('s3vectors') 
+s3 = clients.lazy('s3')
+s3vectors = clients.lazy('s3vectors')
 
 def lambda_handler(event, context):
     print(json.dumps(event))
@@ -68,12 +73,27 @@ def lambda_handler(event, context):
                 data.append(embed)
 
 
+    # Filterable metadata written on every vector of the task. A read error fails the invocation
+    # so S3 retries it, rather than being taken for a deleted task.
+    doc = ddb.get_item(DYNAMO_VIDEO_TASK_TABLE, {"Id": task_id})
+    # start-task writes the item before the embedding starts, so a task without one was deleted.
+    # A task deleted, or tombstoned for deletion, while its embedding ran gets no vectors: the
+    # delete worker may already have removed the task's vectors and nothing would remove these.
+    if doc is None or doc.get("Status") == "deleting":
+        print(f"Task deleted or being deleted, output ignored: {task_id}")
+        return {
+            'statusCode': 200,
+            'body': 'Task is being deleted. Ignored.'
+        }
+    task_metadata = construct_task_metadata(doc)
+
     # Add embeddings to S3 Vector: batch size 100
-    embeddings, batch_size, counter = [], 200, 0
+    embeddings, batch_size, counter, vector_keys = [], 200, 0, set()
     for item in data:
-        embed = construct_embed(task_id, item, embed_name)
+        embed = construct_embed(task_id, item, embed_name, task_metadata)
         if embed:
             embeddings.append(embed)
+            vector_keys.add(embed["key"])
 
         counter += 1
         if len(embeddings) >= batch_size or counter >= len(data):
@@ -85,21 +105,41 @@ def lambda_handler(event, context):
             )
             embeddings = []
 
+    # Clip timestamps for nova-srv-get-task-clips and vector keys for nova-srv-delete-video-task,
+    # so neither has to re-read the embeddings
+    update_clip_index(s3_bucket, task_id, embed_name, data, vector_keys)
+
+    # New vectors change search results: invalidate cached RAG answers
+    bump_library_epoch(s3_bucket)
 
     # Update DynamoDB task status
-    doc = None
     try:
-        doc = utils.dynamodb_get_by_id(DYNAMO_VIDEO_TASK_TABLE, id=task_id)
-        if doc is not None:
-            # Update video task status
-            doc["Status"] = "completed"
-            doc["EmbedCompleteTs"] = datetime.now(timezone.utc).isoformat()
-            doc["Id"] = task_id
-        
-            # update DB: video_task
-            utils.dynamodb_table_upsert(DYNAMO_VIDEO_TASK_TABLE, doc)
+        # Update video task status. Only these fields are written so concurrent
+        # metadata/frame-sampling updates on the same task are preserved. The write is
+        # conditional, so a task tombstoned meanwhile is not made visible again.
+        fields = {
+            "Status": "completed",
+            "EmbedCompleteTs": datetime.now(timezone.utc).isoformat(),
+        }
+        # Indexed segments per embedding output, summed by the library stats. Items from before
+        # SegmentCounts get the map first with if_not_exists, so outputs landing at once set
+        # their own entries instead of replacing each other's map.
+        if not isinstance(doc.get("SegmentCounts"), dict):
+            try:
+                ddb.update_item(DYNAMO_VIDEO_TASK_TABLE, {"Id": task_id},
+                                UpdateExpression="SET SegmentCounts = if_not_exists(SegmentCounts, :empty)",
+                                ConditionExpression="attribute_exists(Id)",
+                                ExpressionAttributeValues={":empty": {}})
+            except ddb.ConditionalCheckFailedException:
+                # Deleted meanwhile: the status write below fails the same way
+                pass
+        fields[f"SegmentCounts.{embed_name}"] = len(vector_keys)
+        if utils.dynamodb_table_update_unless_deleting(DYNAMO_VIDEO_TASK_TABLE, task_id, fields) is False:
+            # Tombstoned or deleted while the vectors were written: remove them again
+            print(f"Task deleted during indexing, removing its {len(vector_keys)} vectors: {task_id}")
+            delete_vectors(sorted(vector_keys))
     except Exception as ex:
-        print('Doc does not exist',ex)
+        print(f'Failed to update task status: {ex}')
     
 
     return {
@@ -107,7 +147,82 @@ def lambda_handler(event, context):
         'body': 'Task completed.'
     }
 
-def construct_embed(task_id, item, embed_name):
+def delete_vectors(keys):
+    for i in range(0, len(keys), DELETE_VECTORS_BATCH_SIZE):
+        batch = keys[i:i + DELETE_VECTORS_BATCH_SIZE]
+        try:
+            s3vectors.delete_vectors(vectorBucketName=NOVA_S3_VECTOR_BUCKET, indexName=NOVA_S3_VECTOR_INDEX, keys=batch)
+        except Exception as ex:
+            print(f"Failed to delete {len(batch)} vectors: {ex}")
+
+def bump_library_epoch(s3_bucket):
+    try:
+        s3.put_object(Bucket=s3_bucket, Key=LIBRARY_EPOCH_S3_KEY, Body=str(time.time_ns()))
+    except Exception as ex:
+        print(f"Failed to bump library epoch: {ex}")
+
+def construct_clip(embed_name, item):
+    '''Segment index and time (or character) range of one embedding output line, or None for images.'''
+    seg_metadata = item.get("segmentMetadata")
+    if not seg_metadata or embed_name in ["image"]:
+        return None
+    if embed_name in ["text"]:
+        return {
+            "SegmentIndex": seg_metadata.get("segmentIndex"),
+            "StartChar": seg_metadata.get("segmentStartCharPosition"),
+            "EndChar": seg_metadata.get("segmentEndCharPosition"),
+        }
+    return {
+        "SegmentIndex": seg_metadata.get("segmentIndex"),
+        "StartSec": seg_metadata.get("segmentStartSeconds"),
+        "EndSec": seg_metadata.get("segmentEndSeconds"),
+    }
+
+def update_clip_index(s3_bucket, task_id, embed_name, data, vector_keys):
+    '''
+    Merge this output's clips and vector keys into the task's clip index sidecar. Outputs of one task can land
+    concurrently, so the merge is a conditional write retried on conflict. Re-processing an
+    output replaces its clips.
+    '''
+    clips = [clip for clip in (construct_clip(embed_name, item) for item in data) if clip]
+    key = CLIP_INDEX_S3_KEY_TEMPLATE.format(task_id=task_id)
+    for attempt in range(CLIP_INDEX_MAX_ATTEMPTS):
+        try:
+            try:
+                obj = s3.get_object(Bucket=s3_bucket, Key=key)
+                index, condition = json.loads(obj["Body"].read()), {"IfMatch": obj["ETag"]}
+            except s3.exceptions.NoSuchKey:
+                index, condition = {"Version": 1, "TaskId": task_id, "Clips": {}}, {"IfNoneMatch": "*"}
+            index["Clips"][embed_name] = sorted(clips, key=lambda clip: clip["SegmentIndex"] or 0)
+            index.setdefault("VectorKeys", {})[embed_name] = sorted(vector_keys)
+            s3.put_object(Bucket=s3_bucket, Key=key, Body=json.dumps(index), ContentType="application/json", **condition)
+            return
+        except s3.exceptions.ClientError as ex:
+            if ex.response["Error"]["Code"] not in ["PreconditionFailed", "ConditionalRequestConflict"]:
+                print(f"Failed to update clip index: {ex}")
+                return
+            time.sleep(0.1 * (attempt + 1))
+    print(f"Failed to update clip index after {CLIP_INDEX_MAX_ATTEMPTS} attempts: s3://{s3_bucket}/{key}")
+
+def construct_task_metadata(task):
+    '''
+    Task level metadata used to scope vector queries: owner, request time (epoch seconds) and modality.
+    '''
+    if not task:
+        return {}
+    metadata = {}
+    if task.get("RequestBy"):
+        metadata["owner"] = task["RequestBy"]
+    if task.get("Modality"):
+        metadata["modality"] = task["Modality"]
+    if task.get("RequestTs"):
+        try:
+            metadata["requestEpoch"] = int(datetime.fromisoformat(task["RequestTs"]).timestamp())
+        except ValueError as ex:
+            print(f"Invalid RequestTs: {task['RequestTs']}", ex)
+    return metadata
+
+def construct_embed(task_id, item, embed_name, task_metadata=None):
     result = None
     if embed_name in ["audio-video", "video", "audio"]:
         result = {
@@ -144,4 +259,6 @@ def construct_embed(task_id, item, embed_name):
                         "segmentEndCharPosition":seg_metadata.get("segmentEndCharPosition")
                     }
                 }
+    if result and task_metadata:
+        result["metadata"].update(task_metadata)
     return result
\ No newline at end of file
@@ -1,8 +1,15 @@
 import json
-import boto3
 import os
 import utils
 import uuid
+import re
+import bisect
+import base64
+import math
+import operator
+import time
+from array import array
+from nova_common import clients
 
 # ==== Environment Variables ====
 S3_PRESIGNED_URL_EXPIRY_S = int(os.environ.get("S3_PRESIGNED_URL_EXPIRY_S", 3600))
@@ -14,11 +21,22 @@ NOVA_S3_VECTOR_BUCKET = os.environ.get("NOVA_S3_VECTOR_BUCKET")
 NOVA_S3_VECTOR_INDEX = os.environ.get("NOVA_S3_VECTOR_INDEX")
 EMBEDDING_DIM = int(os.environ.get("EMBEDDING_DIM", 1024))
 CLOUDFRONT_DOMAIN = os.environ.get("CLOUDFRONT_DOMAIN", "")
+# Prompt budgets, in estimated tokens
+RAG_CONTEXT_TOKEN_BUDGET = int(os.environ.get("RAG_CONTEXT_TOKEN_BUDGET", 2000))
+RAG_CITATION_MAX_TOKENS = int(os.environ.get("RAG_CITATION_MAX_TOKENS", 500))
+RAG_HISTORY_TOKEN_BUDGET = int(os.environ.get("RAG_HISTORY_TOKEN_BUDGET", 1000))
+# Semantic answer cache
+RAG_CACHE_S3_KEY = os.environ.get("RAG_CACHE_S3_KEY", "cache/rag-answer-cache.json")
+LIBRARY_EPOCH_S3_KEY = os.environ.get("LIBRARY_EPOCH_S3_KEY", "cache/library-epoch")
+RAG_CACHE_SIMILARITY_THRESHOLD = float(os.environ.get("RAG_CACHE_SIMILARITY_THRESHOLD", 0.95))
+RAG_CACHE_MAX_ENTRIES = int(os.environ.get("RAG_CACHE_MAX_ENTRIES", 200))
+RAG_CACHE_STORE_ATTEMPTS = 2
 
 # ==== Clients ====
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock-runtime')
-s3vectors = boto3.client('s3vectors')
+s3 = clients.lazy('s3')
+bedrock = clients.lazy('bedrock-runtime')
+s3vectors = clients.lazy('s3vectors')
+cognito = clients.lazy('cognito-idp')
 
 # ==== Main Handler ====
 def lambda_handler(event, context):
@@ -38,46 +56,375 @@ def lambda_handler(event, context):
     request_by = event.get("RequestBy")
     top_k = event.get("TopK", 5)
 
+    error, query_text, input_embedding = embed_user_query(chat_history)
+    if error:
+        return error
+
+    # Paraphrases of recent questions over an unchanged library reuse the cached answer
+    library_epoch = get_library_epoch()
+    cached = lookup_answer_cache(input_embedding, top_k, library_epoch)
+    if cached:
+        return {"statusCode": 200, "body": cached}
+
+    citations, text_citation = retrieve_citations(query_text, input_embedding, top_k)
+
+    # Generate final chat response from LLM
+    llm_response = generate_chat_response(chat_history, text_citation)
+    store_answer_cache(query_text, input_embedding, top_k, library_epoch, llm_response, citations)
+
+    return {
+        "statusCode": 200,
+        "body": {
+            "reply": llm_response,
+            "citations": citations,
+        }
+    }
+
+
+# ==== WebSocket Streaming Handler ====
+def websocket_handler(event, context):
+    """
+    API Gateway WebSocket routes:
+    - $connect: validates the Cognito access token passed as the "token" query string parameter
+    - $disconnect: no-op
+    - chat: {"action": "chat", "ChatHistory": [...], "TopK": 5}
+    Messages sent back to the client, in order:
+        {"type": "citations", "citations": [...]}
+        {"type": "delta", "text": "..."}          (repeated)
+        {"type": "done", "reply": "..."} or {"type": "error", "message": "..."}
+    """
+    request_context = event.get("requestContext", {})
+    route_key = request_context.get("routeKey")
+    connection_id = request_context.get("connectionId")
+
+    if route_key == "$connect":
+        token = (event.get("queryStringParameters") or {}).get("token")
+        if not token:
+            return {"statusCode": 401, "body": "Missing token"}
+        try:
+            cognito.get_user(AccessToken=token)
+        except Exception as ex:
+            print(f"Rejected WebSocket connection {connection_id}: {ex}")
+            return {"statusCode": 401, "body": "Unauthorized"}
+        return {"statusCode": 200, "body": "Connected"}
+
+    if route_key == "$disconnect":
+        return {"statusCode": 200, "body": "Disconnected"}
+
+    apigw = clients.get_client(
+        "apigatewaymanagementapi",
+        endpoint_url=f'https://{request_context["domainName"]}/{request_context["stage"]}'
+    )
+
+    def send(message):
+        apigw.post_to_connection(ConnectionId=connection_id, Data=json.dumps(message).encode("utf-8"))
+
+    def send_error(message):
+        # Best effort: the client may be gone, or posting may be what failed
+        try:
+            send({"type": "error", "message": message})
+        except Exception as ex:
+            print(f"Failed to send error to {connection_id}: {ex}")
+
+    try:
+        request = json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        send_error("Invalid request body.")
+        return {"statusCode": 400, "body": "Invalid request body."}
+
+    chat_history = request.get("ChatHistory", [])
+    top_k = request.get("TopK", 5)
+
+    try:
+        error, query_text, input_embedding = embed_user_query(chat_history)
+        if error:
+            send({"type": "error", "message": error["body"]})
+            return error
+
+        library_epoch = get_library_epoch()
+        cached = lookup_answer_cache(input_embedding, top_k, library_epoch)
+        if cached:
+            send({"type": "citations", "citations": cached["citations"]})
+            send({"type": "delta", "text": cached["reply"]})
+            send({"type": "done", "reply": cached["reply"]})
+            return {"statusCode": 200, "body": "Streamed"}
+
+        citations, text_citation = retrieve_citations(query_text, input_embedding, top_k)
+
+        # Citations go out as soon as retrieval finishes, before generation starts
+        send({"type": "citations", "citations": citations})
+
+        reply = ""
+        for delta in generate_chat_response_stream(chat_history, text_citation):
+            reply += delta
+            send({"type": "delta", "text": delta})
+
+        send({"type": "done", "reply": reply})
+        store_answer_cache(query_text, input_embedding, top_k, library_epoch, reply, citations)
+    except apigw.exceptions.GoneException:
+        print(f"Connection closed by client: {connection_id}")
+    except Exception as ex:
+        print(f"Failed to stream response: {ex}")
+        send_error("Failed to generate response.")
+        return {"statusCode": 500, "body": "Failed to generate response."}
+
+    return {"statusCode": 200, "body": "Streamed"}
+
+
+# ==== Retrieval ====
+def embed_user_query(chat_history):
+    """
+    Embed the latest user message.
+    Returns (error_response, query_text, input_embedding); error_response is None on success.
+    """
     # Get the latest user message
     user_message = ""
     if chat_history and chat_history[-1]["role"] == "user":
         user_message = chat_history[-1]["content"]
     else:
-        return {"statusCode": 400, "body": "No valid user message found."}
+        return {"statusCode": 400, "body": "No valid user message found."}, None, None
 
     # Get embedding for the user query
-    input_embedding = embed_text(user_message[0].get("text"))
+    query_text = user_message[0].get("text", "")
+    input_embedding = embed_text(query_text)
     if not input_embedding:
-        return {"statusCode": 500, "body": "Failed to create embedding for query."}
+        return {"statusCode": 500, "body": "Failed to create embedding for query."}, None, None
 
+    return None, query_text, input_embedding
+
+def retrieve_citations(query_text, input_embedding, top_k):
+    """
+    Look up citations for the query embedding and pack them into the LLM context.
+    Returns (citations, text_citation).
+    """
     # Search the vector DB for similar items
     results = search_embedding_s3vectors(input_embedding, NOVA_S3_VECTOR_BUCKET, NOVA_S3_VECTOR_INDEX, top_k)
 
     # Construct text-based context for the LLM
     citations = []
-    text_citation = ""
     for r in results:
         task_id = r.get("metadata", {}).get("task_id")
         task = utils.dynamodb_get_by_id(DYNAMO_VIDEO_TASK_TABLE, task_id, "Id")    
-        if task:
+        # Tasks being deleted in bulk are hidden before their vectors are removed
+        if task and task.get("Status") != "deleting":
             citation = construct_citation(r, task)
             if citation:
                 citations.append(citation)
-                if citation.get("TextCitation"):
-                    text_citation += f"; {citation.get("TextCitation")}"
 
+    text_citation = pack_context(citations, query_text)
+    return citations, text_citation
 
-    # Generate final chat response from LLM
-    llm_response = generate_chat_response(chat_history, text_citation)
 
-    return {
-        "statusCode": 200,
-        "body": {
-            "reply": llm_response,
-            "citations": citations,
-        }
+# ==== Semantic Answer Cache ====
+# Recent answers are stored in S3 as one JSON document: a float32 matrix of normalized
+# query embeddings (one row per entry) plus the entries it indexes. Writers that change
+# the library (ingestion, deletion) bump the library epoch object, which invalidates
+# every entry recorded under an older epoch.
+ANSWER_CACHE = {"ETag": None, "Matrix": array("f"), "Entries": []}
+
+def normalize_embedding(embedding):
+    norm = math.sqrt(sum(v * v for v in embedding)) or 1.0
+    return array("f", (v / norm for v in embedding))
+
+def get_library_epoch():
+    try:
+        return s3.get_object(Bucket=S3_BUCKET_DATA, Key=LIBRARY_EPOCH_S3_KEY)["Body"].read().decode("utf-8")
+    except s3.exceptions.NoSuchKey:
+        return "0"
+    except Exception as ex:
+        print(f"Failed to read library epoch: {ex}")
+        return None
+
+def load_answer_cache():
+    kwargs = {"IfNoneMatch": ANSWER_CACHE["ETag"]} if ANSWER_CACHE["ETag"] else {}
+    try:
+        response = s3.get_object(Bucket=S3_BUCKET_DATA, Key=RAG_CACHE_S3_KEY, **kwargs)
+    except s3.exceptions.NoSuchKey:
+        ANSWER_CACHE.update({"ETag": None, "Matrix": array("f"), "Entries": []})
+        return ANSWER_CACHE
+    except s3.exceptions.ClientError as ex:
+        # 304: the warm copy is current
+        if ex.response["Error"]["Code"] not in ("304", "NotModified"):
+            print(f"Failed to load answer cache: {ex}")
+        return ANSWER_CACHE
+
+    data = json.loads(response["Body"].read())
+    ANSWER_CACHE.update({
+        "ETag": response["ETag"],
+        "Matrix": array("f", base64.b64decode(data.get("Matrix", ""))),
+        "Entries": data.get("Entries", []),
+    })
+    return ANSWER_CACHE
+
+def lookup_answer_cache(input_embedding, top_k, library_epoch):
+    if library_epoch is None:
+        return None
+    cache = load_answer_cache()
+    if not cache["Entries"]:
+        return None
+
+    query = normalize_embedding(input_embedding)
+    dim = len(query)
+    best_similarity, best_entry = -1.0, None
+    for i, entry in enumerate(cache["Entries"]):
+        if entry.get("LibraryEpoch") != library_epoch or entry.get("TopK") != top_k:
+            continue
+        similarity = sum(map(operator.mul, query, cache["Matrix"][i * dim:(i + 1) * dim]))
+        if similarity > best_similarity:
+            best_similarity, best_entry = similarity, entry
+
+    if best_entry is None or best_similarity < RAG_CACHE_SIMILARITY_THRESHOLD:
+        return None
+
+    print(f"Answer cache hit: {best_similarity:.4f} '{best_entry['Query']}'")
+    citations = []
+    for citation in best_entry["Citations"]:
+        citation = dict(citation)
+        citation["FileUrl"] = get_file_url(citation["S3Bucket"], citation["S3Key"])
+        citations.append(citation)
+    return {"reply": best_entry["Reply"], "citations": citations, "cached": True}
+
+def store_answer_cache(query_text, input_embedding, top_k, library_epoch, reply, citations):
+    if library_epoch is None or not reply:
+        return
+    query = normalize_embedding(input_embedding)
+    dim = len(query)
+    new_entry = {
+        "Query": query_text,
+        "TopK": top_k,
+        "LibraryEpoch": library_epoch,
+        "Reply": reply,
+        # Presigned URLs expire; they are regenerated on a cache hit
+        "Citations": [{k: v for k, v in c.items() if k != "FileUrl"} for c in citations],
+        "Ts": int(time.time()),
     }
 
+    # Concurrent invocations rewrite the same document, so the write is conditional on the
+    # version read and retried on conflict; an entry that still loses is just a cache miss
+    for attempt in range(RAG_CACHE_STORE_ATTEMPTS):
+        try:
+            cache = load_answer_cache()
+
+            # Drop entries from older library epochs and keep the most recent ones
+            rows = [(entry, cache["Matrix"][i * dim:(i + 1) * dim]) for i, entry in enumerate(cache["Entries"])
+                    if entry.get("LibraryEpoch") == library_epoch]
+            rows.append((new_entry, query))
+            rows = rows[-RAG_CACHE_MAX_ENTRIES:]
+
+            matrix = array("f")
+            for _, row in rows:
+                matrix.extend(row)
+            condition = {"IfMatch": cache["ETag"]} if cache["ETag"] else {"IfNoneMatch": "*"}
+            response = s3.put_object(
+                Bucket=S3_BUCKET_DATA,
+                Key=RAG_CACHE_S3_KEY,
+                Body=json.dumps({"Dim": dim, "Matrix": base64.b64encode(matrix.tobytes()).decode("utf-8"),
+                                 "Entries": [entry for entry, _ in rows]}),
+                ContentType="application/json",
+                **condition
+            )
+            ANSWER_CACHE.update({"ETag": response["ETag"], "Matrix": matrix, "Entries": [entry for entry, _ in rows]})
+            return
+        except s3.exceptions.ClientError as ex:
+            if ex.response["Error"]["Code"] not in ["PreconditionFailed", "ConditionalRequestConflict"]:
+                print(f"Failed to store answer cache: {ex}")
+                return
+        except Exception as ex:
+            print(f"Failed to store answer cache: {ex}")
+            return
+    print(f"Dropped answer cache entry after {RAG_CACHE_STORE_ATTEMPTS} conflicting writes: '{query_text}'")
+
+
+# ==== Context Packing ====
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    # Rough estimate, good enough for budgeting without a tokenizer
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_around_query(text, query, max_chars):
+    """
+    Cut a window of max_chars out of text, centered on the densest cluster of query terms.
+    Falls back to the head of the text if no query term occurs in it.
+    """
+    if len(text) <= max_chars:
+        return text
+    terms = {t for t in re.findall(r"\w+", query.lower()) if len(t) > 2}
+    positions = [m.start() for m in re.finditer(r"\w+", text.lower()) if m.group(0) in terms]
+
+    start = 0
+    if positions:
+        best_count = 0
+        for p in positions:
+            # Number of matches within the window that starts half a window before p
+            window_start = max(0, min(p - max_chars // 2, len(text) - max_chars))
+            count = bisect.bisect_left(positions, window_start + max_chars) - bisect.bisect_left(positions, window_start)
+            if count > best_count:
+                best_count, start = count, window_start
+
+    window = text[start:start + max_chars]
+    prefix = "..." if start > 0 else ""
+    suffix = "..." if start + max_chars < len(text) else ""
+    return f"{prefix}{window}{suffix}"
+
+def pack_context(citations, query, token_budget=RAG_CONTEXT_TOKEN_BUDGET, citation_max_tokens=RAG_CITATION_MAX_TOKENS):
+    """
+    Build the LLM context from citations in rank order (closest first) until the token budget is used.
+    Duplicate citations and text segments that mostly overlap an already packed segment are skipped,
+    and long segments are truncated around the query terms.
+    """
+    packed, used_tokens = [], 0
+    seen_texts = set()
+    seen_spans = {}
+    for citation in sorted(citations, key=lambda c: c.get("Distance", 0)):
+        text = citation.get("TextCitation")
+        if not text:
+            continue
+
+        normalized = " ".join(text.split()).lower()
+        if normalized in seen_texts:
+            continue
+
+        start, end = citation.get("StartCharPosition"), citation.get("EndCharPosition")
+        if start is not None and end is not None and end > start:
+            spans = seen_spans.setdefault(citation.get("S3Key"), [])
+            if any(min(end, e) - max(start, s) > (end - start) / 2 for s, e in spans):
+                continue
+            spans.append((start, end))
+
+        remaining = token_budget - used_tokens
+        if remaining <= 0:
+            break
+        max_tokens = min(citation_max_tokens, remaining)
+        if estimate_tokens(text) > max_tokens:
+            text = truncate_around_query(text, query, max_tokens * CHARS_PER_TOKEN)
+
+        seen_texts.add(normalized)
+        packed.append(text)
+        used_tokens += estimate_tokens(text)
+
+    return "".join(f"; {text}" for text in packed)
+
+def trim_chat_history(chat_history, token_budget=RAG_HISTORY_TOKEN_BUDGET):
+    """
+    Keep the most recent messages that fit in the token budget. The latest message is always kept
+    and the result starts with a user message, as required by the Converse API.
+    """
+    trimmed, used_tokens = [], 0
+    for message in reversed(chat_history):
+        tokens = sum(estimate_tokens(c.get("text", "")) for c in message.get("content", []))
+        if trimmed and used_tokens + tokens > token_budget:
+            break
+        trimmed.append(message)
+        used_tokens += tokens
+    trimmed.reverse()
+
+    while len(trimmed) > 1 and trimmed[0].get("role") != "user":
+        trimmed.pop(0)
+    if len(trimmed) < len(chat_history):
+        print(f"Chat history trimmed: {len(chat_history)} -> {len(trimmed)} messages")
+    return trimmed
+
 
 # ==== Embedding Function ====
 def embed_text(text, model_id=MODEL_ID_EMBED):
@@ -118,6 +465,18 @@ def search_embedding_s3vectors(input_embedding, s3vector_bucket, s3vector_index,
 
 
 # ==== Construct Text Context ====
+def get_file_url(s3_bucket, s3_key):
+    # Generate file URL (CloudFront or S3 presigned URL)
+    if CLOUDFRONT_DOMAIN:
+        # Use CloudFront URL for better performance
+        return f"https://{CLOUDFRONT_DOMAIN}/{s3_key}"
+    # Fall back to S3 presigned URL
+    return s3.generate_presigned_url(
+        'get_object',
+        Params={'Bucket': s3_bucket, 'Key': s3_key},
+        ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
+    )
+
 def construct_citation(clip, task):
     modality = task.get("Modality", "unknown")
     file_name = task.get("Request", {}).get("FileName", "")
@@ -130,17 +489,7 @@ def construct_citation(clip, task):
     startCharPos, endCharPos = None, None
     startSec, endSec, index = None, None, None
 
-    # Generate file URL (CloudFront or S3 presigned URL)
-    if CLOUDFRONT_DOMAIN:
-        # Use CloudFront URL for better performance
-        s3_url = f"https://{CLOUDFRONT_DOMAIN}/{s3_key}"
-    else:
-        # Fall back to S3 presigned URL
-        s3_url = s3.generate_presigned_url(
-            'get_object',
-            Params={'Bucket': s3_bucket, 'Key': s3_key},
-            ExpiresIn=S3_PRESIGNED_URL_EXPIRY_S
-        )
+    s3_url = get_file_url(s3_bucket, s3_key)
     if modality == "text":
         response = s3.get_object(Bucket=s3_bucket, Key=s3_key)
         text_content = response["Body"].read().decode("utf-8")
@@ -170,33 +519,37 @@ def construct_citation(clip, task):
 
 
 # ==== LLM Generation ====
-def generate_chat_response(chat_history, context_text):
-    """
-    Use Bedrock LLM (Claude / Nova) to respond conversationally,
-    using the provided context.
-    """
-
-    system_prompt = """You are a helpful AI assistant that provides concise answers related to multimodal data in your database. 
+SYSTEM_PROMPT = """You are a helpful AI assistant that provides concise answers related to multimodal data in your database. 
         For video, audio and text files, say 'Found the following relevant results'. 
         Generate answer based on the citation only without involving previous conversation context and keep the response within 100 tokens."""
 
+INFERENCE_CONFIG = {
+    "maxTokens": 500,
+    "topP": 0.1,
+    "temperature": 0.7
+}
+
+def build_messages(chat_history, context_text):
     # Convert chat history into a prompt
+    chat_history = trim_chat_history(chat_history)
     chat_history.append({
             "role": "user",
             "content": [
                 {"text": f"Relevant context:\n{context_text}"},
             ]
         })
+    return chat_history
 
+def generate_chat_response(chat_history, context_text):
+    """
+    Use Bedrock LLM (Claude / Nova) to respond conversationally,
+    using the provided context.
+    """
     response = bedrock.converse(
                 modelId=MODEL_ID_LLM,
-                messages=chat_history,
-                system=[{"text": system_prompt}],
-                inferenceConfig= {
-                    "maxTokens": 500,
-                    "topP": 0.1,
-                    "temperature": 0.7
-                },
+                messages=build_messages(chat_history, context_text),
+                system=[{"text": SYSTEM_PROMPT}],
+                inferenceConfig=INFERENCE_CONFIG,
             )
     txt_result = None
     contents = response.get("output", {}).get("message", {}).get("content", [])
@@ -206,4 +559,20 @@ def generate_chat_response(chat_history, context_text):
         elif "text" in c:
             txt_result = c["text"]
 
-    return txt_result
\ No newline at end of file
+    return txt_result
+
+def generate_chat_response_stream(chat_history, context_text):
+    """
+    Same as generate_chat_response, but yields text deltas from converse_stream
+    as the model produces them.
+    """
+    response = bedrock.converse_stream(
+                modelId=MODEL_ID_LLM,
+                messages=build_messages(chat_history, context_text),
+                system=[{"text": SYSTEM_PROMPT}],
+                inferenceConfig=INFERENCE_CONFIG,
+            )
+    for stream_event in response.get("stream", []):
+        text = stream_event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+        if text:
+            yield text
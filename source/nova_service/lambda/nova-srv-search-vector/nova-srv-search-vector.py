@@ -2,7 +2,6 @@
 "Source": mm_embedding | text_embedding | text,
 '''
 import json
-import boto3
 import os
 import re
 from urllib.parse import urlparse
@@ -10,6 +9,11 @@ import utils
 import uuid
 import time
 import base64
+import io
+from datetime import datetime
+import hashlib
+from collections import OrderedDict
+from nova_common import clients
 
 S3_PRESIGNED_URL_EXPIRY_S = os.environ.get("S3_PRESIGNED_URL_EXPIRY_S", 3600) # Default 1 hour 
 S3_BUCKET_DATA = os.environ.get("S3_BUCKET_DATA")
@@ -22,9 +26,14 @@ EMBEDDING_DIM = os.environ.get("EMBEDDING_DIM")
 
 EMBEDDING_DIM = int(EMBEDDING_DIM) if EMBEDDING_DIM else 1024
 
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock-runtime')
-s3vectors = boto3.client('s3vectors') 
+# Image query preprocessing: larger images do not improve the query embedding
+IMAGE_QUERY_MAX_EDGE_PX = int(os.environ.get("IMAGE_QUERY_MAX_EDGE_PX", 1024))
+IMAGE_QUERY_JPEG_QUALITY = int(os.environ.get("IMAGE_QUERY_JPEG_QUALITY", 85))
+EMBEDDING_CACHE_MAX_ITEMS = int(os.environ.get("EMBEDDING_CACHE_MAX_ITEMS", 256))
+
+s3 = clients.lazy('s3')
+bedrock = clients.lazy('bedrock-runtime')
+s3vectors = clients.lazy('s3vectors')
 
 def lambda_handler(event, context):
     search_text = event.get("SearchText", "")
@@ -37,6 +46,10 @@ def lambda_handler(event, context):
     input_type = event.get("InputType")
     TOP_K = event.get("TopK", 5)
     include_video_url = event.get("IncludeFileUrl", True)
+    # Optional metadata filters pushed down into the vector query, e.g.
+    # {"RequestBy": "user", "TaskId": ["id1", "id2"], "Modality": "video",
+    #  "StartSec": {"Gte": 30, "Lt": 90}, "RequestTs": {"Gte": "2025-01-01T00:00:00+00:00"}}
+    filters = event.get("Filters")
 
     embedding_options = event.get("EmbeddingOptions")
     if not embedding_options:
@@ -51,6 +64,14 @@ def lambda_handler(event, context):
     
     # Get Tasks by RequestBy
     if search_text or input_bytes:
+        # Validate the filters before paying for the query embedding
+        try:
+            vector_filter = build_vector_filter(embedding_options, filters)
+        except ValueError as ex:
+            return {
+                'statusCode': 400,
+                'body': f'Invalid filters: {ex}'
+            }
         input_embedding = None
         #s3_prefix_output = f'tasks/tlabs/search/{uuid.uuid4()}/'
         input_embedding = embed_input(input_type, search_text, input_bytes, input_format)
@@ -59,7 +80,7 @@ def lambda_handler(event, context):
                 'statusCode': 500,
                 'body': 'Failed to generate input embedding'
             }
-        clips = search_embedding_s3vectors(input_embedding, NOVA_S3_VECTOR_BUCKET, NOVA_S3_VECTOR_INDEX, TOP_K, embedding_options)
+        clips = search_embedding_s3vectors(input_embedding, NOVA_S3_VECTOR_BUCKET, NOVA_S3_VECTOR_INDEX, TOP_K, vector_filter)
             
         result = []
         if clips:
@@ -77,7 +98,8 @@ def lambda_handler(event, context):
                 
                 if task_id:
                     task = utils.dynamodb_get_by_id(DYNAMO_VIDEO_TASK_TABLE, task_id, "Id")
-                    if task:
+                    # Tasks being deleted in bulk are hidden before their vectors are removed
+                    if task and task.get("Status") != "deleting":
                         item = construct_output(clip, task)
                         result.append(item)    
                 
@@ -109,9 +131,57 @@ def lambda_handler(event, context):
         'body': result
     }
 
+# Query embeddings cached across warm invocations, keyed by content hash
+EMBEDDING_CACHE = OrderedDict()
+
+def preprocess_image(input_bytes, input_format):
+    '''
+    Decode a base64 image, downscale it to IMAGE_QUERY_MAX_EDGE_PX and re-encode it as JPEG.
+    Returns (base64 bytes, format, sha256 digest). The input is passed through unchanged
+    if Pillow is not available or the image can't be decoded.
+    '''
+    raw = base64.b64decode(input_bytes)
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return input_bytes, input_format, hashlib.sha256(raw).hexdigest()
+
+    try:
+        image = Image.open(io.BytesIO(raw))
+        # Let the JPEG decoder skip DCT scales we are going to throw away
+        image.draft("RGB", (IMAGE_QUERY_MAX_EDGE_PX, IMAGE_QUERY_MAX_EDGE_PX))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        resized = max(image.size) > IMAGE_QUERY_MAX_EDGE_PX
+        if resized:
+            image.thumbnail((IMAGE_QUERY_MAX_EDGE_PX, IMAGE_QUERY_MAX_EDGE_PX), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=IMAGE_QUERY_JPEG_QUALITY, optimize=True)
+        processed = buffer.getvalue()
+    except Exception as ex:
+        print(f"Failed to preprocess query image, using original bytes: {ex}")
+        return input_bytes, input_format, hashlib.sha256(raw).hexdigest()
+
+    # Keep the original if it is already small and re-encoding didn't help
+    if not resized and input_format in ["jpeg", "jpg"] and len(raw) <= len(processed):
+        return input_bytes, "jpeg", hashlib.sha256(raw).hexdigest()
+
+    print(f"Query image preprocessed: {len(raw)} -> {len(processed)} bytes, {image.size}")
+    return base64.b64encode(processed).decode("utf-8"), "jpeg", hashlib.sha256(processed).hexdigest()
+
 def embed_input(input_type, input_text, input_bytes, input_format, model_id=MODEL_ID):
     request_body = None
+    cache_key = None
     if input_type == "text":
+        cache_key = f'{model_id}:{EMBEDDING_DIM}:text:{hashlib.sha256(input_text.encode("utf-8")).hexdigest()}'
         request_body = {
             "schemaVersion": "nova-multimodal-embed-v1",
             "taskType": "SINGLE_EMBEDDING",
@@ -126,6 +196,8 @@ def embed_input(input_type, input_text, input_bytes, input_format, model_id=MODE
         }
 
     elif input_type == "image" and input_bytes:
+        input_bytes, input_format, digest = preprocess_image(input_bytes, input_format)
+        cache_key = f'{model_id}:{EMBEDDING_DIM}:image:{digest}'
         request_body = {
             "schemaVersion": "nova-multimodal-embed-v1",
             "taskType": "SINGLE_EMBEDDING",
@@ -140,7 +212,12 @@ def embed_input(input_type, input_text, input_bytes, input_format, model_id=MODE
             }
         }
 
+    if request_body is None:
+        return None
 
+    if cache_key in EMBEDDING_CACHE:
+        EMBEDDING_CACHE.move_to_end(cache_key)
+        return EMBEDDING_CACHE[cache_key]
 
     # Invoke the Nova Embeddings model.
     response = bedrock.invoke_model(
@@ -153,10 +230,63 @@ def embed_input(input_type, input_text, input_bytes, input_format, model_id=MODE
     # Decode the response body.
     response_body = json.loads(response.get("body").read())
     response_metadata = response["ResponseMetadata"]
-    return response_body["embeddings"][0]["embedding"]
+    embedding = response_body["embeddings"][0]["embedding"]
+
+    EMBEDDING_CACHE[cache_key] = embedding
+    if len(EMBEDDING_CACHE) > EMBEDDING_CACHE_MAX_ITEMS:
+        EMBEDDING_CACHE.popitem(last=False)
+    return embedding
+
+# Request filter name -> vector metadata key written by nova-srv-s3-listener
+FILTER_METADATA_KEYS = {
+    "RequestBy": "owner",
+    "TaskId": "task_id",
+    "Modality": "modality",
+    "EmbeddingOption": "embeddingOption",
+    "StartSec": "startSec",
+    "EndSec": "endSec",
+    "RequestTs": "requestEpoch",
+}
+FILTER_RANGE_OPERATORS = {"Gt": "$gt", "Gte": "$gte", "Lt": "$lt", "Lte": "$lte"}
+
+def to_epoch(value):
+    if isinstance(value, str):
+        return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp())
+    return value
+
+def build_vector_filter(embedding_options, filters=None):
+    '''
+    Build an S3 Vectors metadata filter. A scalar value becomes $eq, a list becomes $in
+    and a dict of Gt/Gte/Lt/Lte becomes a range. All conditions are combined with $and.
+    '''
+    if filters is not None and not isinstance(filters, dict):
+        raise ValueError("Filters must be an object")
+    conditions = [{"embeddingOption": {"$in": embedding_options}}]
+    for name, value in (filters or {}).items():
+        key = FILTER_METADATA_KEYS.get(name)
+        if key is None:
+            raise ValueError(f"unsupported filter {name}")
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            condition = {}
+            for op, operand in value.items():
+                if op not in FILTER_RANGE_OPERATORS:
+                    raise ValueError(f"unsupported operator {op} for {name}")
+                condition[FILTER_RANGE_OPERATORS[op]] = to_epoch(operand) if name == "RequestTs" else operand
+            if condition:
+                conditions.append({key: condition})
+        elif isinstance(value, list):
+            conditions.append({key: {"$in": value}})
+        else:
+            conditions.append({key: {"$eq": value}})
+
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
 
-def search_embedding_s3vectors(input_embedding, s3vector_bucket, s3vector_index, top_k, embedding_options):
-    # Query vector index.
+def search_embedding_s3vectors(input_embedding, s3vector_bucket, s3vector_index, top_k, vector_filter):
+    # Query vector index. Filters are evaluated by S3 Vectors, so top_k hits all match.
     response = s3vectors.query_vectors(
         vectorBucketName=s3vector_bucket,
         indexName=s3vector_index,
@@ -164,7 +294,7 @@ def search_embedding_s3vectors(input_embedding, s3vector_bucket, s3vector_index,
         topK=top_k, 
         returnDistance=True,
         returnMetadata=True,
-        filter={"embeddingOption": {"$in": embedding_options}}
+        filter=vector_filter
     )
 
     return response["vectors"]
@@ -1,17 +1,19 @@
 import json
-import boto3
 import uuid
 import utils
 import os
-import botocore
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from nova_common import clients
 
 DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
+DYNAMO_TASK_NAME_INDEX_TABLE = os.environ.get("DYNAMO_TASK_NAME_INDEX_TABLE")
 LAMBDA_FUN_NAME_VIDEO_METADATA = os.environ.get("LAMBDA_FUN_NAME_VIDEO_METADATA")
 EMBEDDING_DIM = os.environ.get("EMBEDDING_DIM")
 MODEL_ID = 'amazon.nova-2-multimodal-embeddings-v1:0'
 
 EMBEDDING_DIM = int(EMBEDDING_DIM) if EMBEDDING_DIM else 1024
+# The function timeout: a task still "submitting" after it was claimed by a run that died
+CLAIM_TIMEOUT_S = int(os.environ.get("CLAIM_TIMEOUT_S", 30))
 
 MEDIA_TYPE_MAPPING = {
     "text": ["txt"],
@@ -20,9 +22,9 @@ MEDIA_TYPE_MAPPING = {
     "video": ["mp4", "mov", "mkv", "webm", "flv", "mpeg", "mpg", "wmv", "3gp"],
 }
 
-bedrock = boto3.client('bedrock-runtime')
-lambda_client = boto3.client('lambda')
-s3 = boto3.client("s3")
+bedrock = clients.lazy('bedrock-runtime')
+lambda_client = clients.lazy('lambda')
+s3 = clients.lazy('s3')
 
 def lambda_handler(event, context):
     if event is None \
@@ -52,7 +54,9 @@ def lambda_handler(event, context):
         "Name": event.get("Name", event.get("FileName")),
         "MetaData": {
             "TrasnscriptionOutput": None
-        }
+        },
+        # Set per embedding output by nova-srv-s3-listener
+        "SegmentCounts": {}
     }
 
     s3_bucket = event.get("File",{}).get("S3Object").get("Bucket")
@@ -67,7 +71,7 @@ def lambda_handler(event, context):
         # Check if placeholder exists
         s3.head_object(Bucket=s3_bucket, Key=tmp_key)
         print(f"Folder already exists: s3://{s3_bucket}/{tmp_key}")
-    except botocore.exceptions.ClientError as e:
+    except s3.exceptions.ClientError as e:
         if e.response["Error"]["Code"] == "404":
             # Create placeholder file
             s3.put_object(Bucket=s3_bucket, Key=tmp_key, Body=b"")
@@ -81,31 +85,76 @@ def lambda_handler(event, context):
             'body': 'Failed to start embedding task'
         }
 
-    # Start Nova MME async task
-    response = bedrock.start_async_invoke(
-        modelId=model_id,
-        modelInput=request,
-        outputDataConfig={
-            "s3OutputDataConfig": {
-                "s3Uri": f's3://{s3_bucket}/{s3_prefix_output}'
+    # Claim the task id first: a repeated request (e.g. upload completion retried by the client)
+    # must not start a second embedding job. A task whose start failed, or whose claim is older
+    # than the function timeout, can be started again.
+    now = datetime.now(timezone.utc)
+    doc["Modality"] = media_type
+    doc["Status"] = "submitting"
+    doc["SubmittedTs"] = now.isoformat()
+    created = utils.dynamodb_table_create(DYNAMO_VIDEO_TASK_TABLE, doc,
+                                          stale_before=(now - timedelta(seconds=CLAIM_TIMEOUT_S)).isoformat())
+    if created is None:
+        return {
+            'statusCode': 500,
+            'body': 'Failed to start embedding task'
+        }
+    if not created:
+        print(f"Task already started: {task_id}")
+        return {
+            'statusCode': 200,
+            'body': {
+                "TaskId": task_id,
+                "Existing": True
             }
         }
-    )
-    print("Task arn:", response["invocationArn"])
 
-    # Start video metadata task
-    if media_type == "video":
+    # Start Nova MME async task. With the task id as request token, Bedrock ignores a repeated
+    # start, e.g. from a run that re-claimed the task after this one died before recording it
+    try:
+        response = bedrock.start_async_invoke(
+            modelId=model_id,
+            modelInput=request,
+            outputDataConfig={
+                "s3OutputDataConfig": {
+                    "s3Uri": f's3://{s3_bucket}/{s3_prefix_output}'
+                }
+            },
+            clientRequestToken=task_id
+        )
+    except Exception as ex:
+        print(f"Failed to start embedding task {task_id}: {ex}")
+        utils.dynamodb_table_update(DYNAMO_VIDEO_TASK_TABLE, task_id, {"Status": "failed"})
+        return {
+            'statusCode': 500,
+            'body': 'Failed to start embedding task'
+        }
+    invocation_arn = response["invocationArn"]
+    print("Task arn:", invocation_arn)
+
+    # Update DB before starting the metadata task, which updates this item in place.
+    # If the update fails the task stays "submitting"; a retry re-claims it once the claim is
+    # stale, and the request token keeps Bedrock from starting the job twice.
+    response = utils.dynamodb_table_update(DYNAMO_VIDEO_TASK_TABLE, task_id, {
+        "Status": "processing",
+        "InvocationArn": invocation_arn,
+    })
+    if response is None:
+        return {
+            'statusCode': 500,
+            'body': 'Failed to start embedding task'
+        }
+    if DYNAMO_TASK_NAME_INDEX_TABLE:
+        utils.dynamodb_index_task_names(DYNAMO_TASK_NAME_INDEX_TABLE, task_id, doc["RequestTs"],
+                                        [event.get("FileName"), event.get("TaskName")])
+
+    # Start metadata task: video, image or audio metadata (text has none)
+    if media_type in ["video", "image", "audio"]:
         response = lambda_client.invoke(
             FunctionName=LAMBDA_FUN_NAME_VIDEO_METADATA,
             InvocationType='Event',  # Asynchronous invocation
-            Payload=json.dumps({"Request": event})
+            Payload=json.dumps({"Request": event, "Modality": media_type})
         )
-
-    doc["Modality"] = media_type
-    doc["Status"] = "processing"
-
-    # Update DB
-    response = utils.dynamodb_table_upsert(DYNAMO_VIDEO_TASK_TABLE, doc)
         
     return {
         'statusCode': 200,
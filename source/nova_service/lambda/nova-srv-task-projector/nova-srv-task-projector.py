@@ -0,0 +1,71 @@
+'''
+Maintains the task summary table from the task table's DynamoDB stream.
+Each summary item holds only the fields the task list shows, with the thumbnail key precomputed,
+so listing tasks never reads the echoed Request event or the nested MetaData.
+Summaries share the ListPk partition and sort newest first by SortKey = "{RequestTs}#{Id}".
+'''
+import os
+from nova_common import dynamodb as ddb
+from nova_common.codec import deserialize_item
+
+DYNAMO_TASK_SUMMARY_TABLE = os.environ.get("DYNAMO_TASK_SUMMARY_TABLE")
+TASK_LIST_PK = "task"
+
+def lambda_handler(event, context):
+    '''
+    Stream records of one task are applied in order, so the last write for a key wins.
+    Records are also accepted from deployment/backfill_task_summary.py in the same shape.
+    '''
+    puts, deletes = {}, {}
+    for record in event.get("Records", []):
+        images = record.get("dynamodb", {})
+        old = to_summary(deserialize_item(images.get("OldImage")))
+        new = to_summary(deserialize_item(images.get("NewImage")))
+        if old and (not new or old["SortKey"] != new["SortKey"]):
+            deletes[old["SortKey"]] = old
+            puts.pop(old["SortKey"], None)
+        # MetaData-only updates leave the summary unchanged: skip the write
+        if new and new != old:
+            puts[new["SortKey"]] = new
+            deletes.pop(new["SortKey"], None)
+
+    ddb.batch_write(DYNAMO_TASK_SUMMARY_TABLE,
+                    puts=puts.values(),
+                    deletes=[{"ListPk": summary["ListPk"], "SortKey": summary["SortKey"]} for summary in deletes.values()])
+    print(f"Task summaries: {len(puts)} written, {len(deletes)} deleted")
+
+    return {
+        'statusCode': 200,
+        'body': {"Written": len(puts), "Deleted": len(deletes)}
+    }
+
+def to_summary(task):
+    '''The task list fields of a task item, or None for items that can't be listed.'''
+    if not task or "RequestTs" not in task or "Request" not in task:
+        return None
+    request = task["Request"]
+    s3_object = request.get("File", {}).get("S3Object", {})
+    modality = task.get("Modality")
+    summary = {
+        "ListPk": TASK_LIST_PK,
+        "SortKey": f'{task["RequestTs"]}#{task["Id"]}',
+        "TaskId": task["Id"],
+        "FileName": request.get("FileName"),
+        "TaskName": request.get("TaskName"),
+        "Name": request.get("Name", request.get("FileName")),
+        "Modality": modality,
+        "RequestTs": task["RequestTs"],
+        "Status": task.get("Status"),
+        "RequestBy": task.get("RequestBy"),
+        "EmbedCompleteTs": task.get("EmbedCompleteTs"),
+    }
+    if modality in ["image", "audio", "video", "text"] and s3_object.get("Key"):
+        summary["S3Bucket"] = s3_object.get("Bucket")
+        summary["S3Key"] = s3_object["Key"]
+    if modality == "video" and s3_object.get("Key"):
+        thumbnail_key = ((task.get("MetaData") or {}).get("VideoMetaData") or {}).get("ThumbnailS3Key")
+        if not thumbnail_key:
+            thumbnail_key = "/".join(s3_object["Key"].split("/")[0:-1]) + "/thumbnail.jpeg"
+        summary["ThumbnailS3Key"] = thumbnail_key
+    # DynamoDB does not store empty attributes
+    return {k: v for k, v in summary.items() if v is not None}
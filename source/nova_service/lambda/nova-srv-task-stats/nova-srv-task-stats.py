@@ -0,0 +1,91 @@
+'''
+Library aggregates: task counts per modality, status and owner, and total indexed segments.
+1. Task table stream records: the counter difference between the old and new image of each
+   task is summed over the batch and applied with one atomic ADD.
+2. Scheduled reconcile: recount from a scan of the task table and replace the stats item,
+   fixing any drift (e.g. records that failed all stream retries).
+Counters are flat attributes ("Modality#video", "Status#completed", "Owner#alice") so ADD
+creates them without a parent map; nova-srv-get-task-stats nests them for the API.
+'''
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from nova_common import dynamodb as ddb
+from nova_common.codec import deserialize_item
+
+DYNAMO_VIDEO_TASK_TABLE = os.environ.get("DYNAMO_VIDEO_TASK_TABLE")
+DYNAMO_TASK_SUMMARY_TABLE = os.environ.get("DYNAMO_TASK_SUMMARY_TABLE")
+# The stats item lives in its own partition of the summary table
+STATS_KEY = {"ListPk": "stats", "SortKey": "library"}
+
+def lambda_handler(event, context):
+    if event.get("source") == "aws.events" or event.get("Reconcile"):
+        counters = reconcile()
+        return {
+            'statusCode': 200,
+            'body': {"Reconciled": counters.get("Tasks", 0)}
+        }
+
+    delta = Counter()
+    for record in event.get("Records", []):
+        images = record.get("dynamodb", {})
+        delta.update(task_counters(deserialize_item(images.get("NewImage"))))
+        delta.subtract(task_counters(deserialize_item(images.get("OldImage"))))
+    delta = {k: v for k, v in delta.items() if v}
+    if delta:
+        add_counters(delta)
+    print(f"Stats updated: {delta}")
+
+    return {
+        'statusCode': 200,
+        'body': {"Updated": len(delta)}
+    }
+
+def task_counters(task):
+    '''The counters one task contributes to.'''
+    if not task or "RequestTs" not in task:
+        return {}
+    counters = {
+        "Tasks": 1,
+        f'Modality#{task.get("Modality") or "unknown"}': 1,
+        f'Status#{task.get("Status") or "unknown"}': 1,
+        f'Owner#{task.get("RequestBy") or "unknown"}': 1,
+    }
+    segments = sum(int(n) for n in (task.get("SegmentCounts") or {}).values())
+    if segments:
+        counters["Segments"] = segments
+    return counters
+
+def add_counters(delta):
+    # Owner names may contain dots, so counters are named as whole attributes, not paths
+    names, values, assignments = {}, {}, []
+    for i, (name, value) in enumerate(delta.items()):
+        names[f"#c{i}"] = name
+        values[f":c{i}"] = value
+        assignments.append(f"#c{i} :c{i}")
+    ddb.update_item(
+        DYNAMO_TASK_SUMMARY_TABLE, STATS_KEY,
+        UpdateExpression="ADD " + ", ".join(assignments),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+
+def reconcile():
+    '''Recount every task and replace the stats item.'''
+    tasks = ddb.scan_all(
+        DYNAMO_VIDEO_TASK_TABLE,
+        ProjectionExpression='RequestTs, Modality, #status, RequestBy, SegmentCounts',
+        ExpressionAttributeNames={'#status': 'Status'},
+    )
+    counters = Counter()
+    for task in tasks:
+        counters.update(task_counters(task))
+
+    # Updates that land between the scan and this put are lost until the next reconcile
+    ddb.put_item(DYNAMO_TASK_SUMMARY_TABLE, {
+        **STATS_KEY,
+        **counters,
+        "ReconciledTs": datetime.now(timezone.utc).isoformat(),
+    })
+    print(f"Stats reconciled: {dict(counters)}")
+    return counters
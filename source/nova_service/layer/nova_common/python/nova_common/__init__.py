@@ -0,0 +1,10 @@
+'''
+Shared helpers for the Nova MME Lambdas, deployed as the nova_common Lambda layer.
+- codec: DynamoDB attribute values <-> native Python values
+- dynamodb: table access through the low-level client and the codec
+- clients: lazily created, memoized boto3 clients with tuned botocore settings
+The codec has no AWS dependencies; import the other modules explicitly where they are used.
+'''
+from nova_common.codec import serialize, deserialize, serialize_item, deserialize_item
+
+__version__ = "1.1.0"
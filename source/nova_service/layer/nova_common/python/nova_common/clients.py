@@ -0,0 +1,54 @@
+'''
+Lazily created, memoized boto3 clients with tuned botocore settings.
+Handlers declare their clients at module level with lazy(), which costs nothing at import: boto3
+is imported and the client built (loading its service model) on first use, so a cold start only
+pays for the clients the invocation actually calls. Clients are cached per service and config for
+the life of the container and shared between threads.
+Defaults over botocore's: adaptive retries with client-side rate limiting, a connection pool large
+enough for the handlers' thread pools, TCP keep-alive so warm containers reuse connections, and
+bounded connect/read timeouts.
+'''
+import threading
+
+DEFAULT_CONFIG = {
+    "retries": {"mode": "adaptive", "max_attempts": 5},
+    "max_pool_connections": 50,
+    "tcp_keepalive": True,
+    "connect_timeout": 5,
+    "read_timeout": 60,
+}
+
+_clients = {}
+_session = None
+_lock = threading.Lock()
+
+def get_client(service_name, endpoint_url=None, **config):
+    '''The memoized client for service_name. config overrides DEFAULT_CONFIG (e.g. read_timeout).'''
+    key = (service_name, endpoint_url, repr(sorted(config.items())))
+    client = _clients.get(key)
+    if client is None:
+        # boto3 sessions are not thread-safe while creating clients
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                global _session
+                import boto3
+                from botocore.config import Config
+                if _session is None:
+                    _session = boto3.session.Session()
+                client = _session.client(service_name, endpoint_url=endpoint_url,
+                                         config=Config(**{**DEFAULT_CONFIG, **config}))
+                _clients[key] = client
+    return client
+
+class LazyClient:
+    '''Stands in for a client at module level; the client is built on first attribute access.'''
+    def __init__(self, service_name, **config):
+        self._service_name = service_name
+        self._config = config
+
+    def __getattr__(self, name):
+        return getattr(get_client(self._service_name, **self._config), name)
+
+def lazy(service_name, **config):
+    return LazyClient(service_name, **config)
@@ -0,0 +1,110 @@
+'''
+DynamoDB attribute value codec.
+Converts between native Python values and the low-level client's AttributeValue dicts in one
+pass, replacing the resource layer's TypeSerializer/TypeDeserializer and the per-Lambda
+float/Decimal conversions around them.
+- Writing: floats are stored as the exact decimal of their shortest repr, as Decimal(str(f)) did.
+  NaN and infinity are rejected, since DynamoDB can't store them.
+- Reading: numbers come back as int when integral in form ("3") and float otherwise ("3.5"), so
+  items are JSON serializable as read.
+'''
+import decimal
+import math
+
+def _number(value):
+    '''N string of an int, float or Decimal.'''
+    if isinstance(value, int):
+        return str(int(value))
+    if not math.isfinite(value):
+        raise ValueError(f"DynamoDB can't store {value}")
+    if isinstance(value, float):
+        text = repr(float(value))
+        # repr uses "1e+16"; normalize exponents the way Decimal formats them
+        return str(decimal.Decimal(text)) if "e" in text else text
+    return str(value)
+
+def _serialize_set(value):
+    if not value:
+        raise ValueError("DynamoDB can't store an empty set")
+    if all(isinstance(v, str) for v in value):
+        return {"SS": list(value)}
+    if all(isinstance(v, (bytes, bytearray)) for v in value):
+        return {"BS": [bytes(v) for v in value]}
+    if all(isinstance(v, (int, float, decimal.Decimal)) and not isinstance(v, bool) for v in value):
+        return {"NS": [_number(v) for v in value]}
+    raise TypeError(f"Unsupported set members: {value!r}")
+
+def serialize(value):
+    '''Python value -> AttributeValue.'''
+    # Exact type checks first: they cover almost every value and are cheaper than isinstance
+    t = type(value)
+    if t is str:
+        return {"S": value}
+    if t is dict:
+        return {"M": {k: serialize(v) for k, v in value.items()}}
+    if t is list:
+        return {"L": [serialize(v) for v in value]}
+    if t is int:
+        return {"N": str(value)}
+    if t is bool:
+        return {"BOOL": value}
+    if t is float or t is decimal.Decimal:
+        return {"N": _number(value)}
+    if value is None:
+        return {"NULL": True}
+    # Subclasses and the less common types
+    if isinstance(value, bool):
+        return {"BOOL": bool(value)}
+    if isinstance(value, str):
+        return {"S": str(value)}
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return {"N": _number(value)}
+    if isinstance(value, dict):
+        return {"M": {k: serialize(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple)):
+        return {"L": [serialize(v) for v in value]}
+    if isinstance(value, (bytes, bytearray)):
+        return {"B": bytes(value)}
+    if isinstance(value, (set, frozenset)):
+        return _serialize_set(value)
+    raise TypeError(f"Unsupported type for DynamoDB: {t.__name__}")
+
+def _native_number(text):
+    if "." in text or "e" in text or "E" in text:
+        return float(text)
+    return int(text)
+
+def _deserialize_map(value):
+    return {k: deserialize(v) for k, v in value.items()}
+
+def _deserialize_list(value):
+    return [deserialize(v) for v in value]
+
+_DESERIALIZERS = {
+    "S": lambda value: value,
+    "N": _native_number,
+    "M": _deserialize_map,
+    "L": _deserialize_list,
+    "BOOL": bool,
+    "NULL": lambda value: None,
+    "B": bytes,
+    "SS": set,
+    "NS": lambda value: {_native_number(v) for v in value},
+    "BS": lambda value: {bytes(v) for v in value},
+}
+
+def deserialize(attribute):
+    '''AttributeValue -> Python value.'''
+    for tag, value in attribute.items():
+        return _DESERIALIZERS[tag](value)
+    raise ValueError("Empty AttributeValue")
+
+def serialize_item(document):
+    '''Top-level attributes of an item, key or ExpressionAttributeValues.'''
+    return {k: serialize(v) for k, v in document.items()}
+
+def deserialize_item(item):
+    '''Item (or stream image) -> dict, None for a missing item.'''
+    if item is None:
+        return None
+    return {k: deserialize(v) for k, v in item.items()}
@@ -0,0 +1,142 @@
+'''
+DynamoDB table access through the low-level client and nova_common.codec.
+Functions take and return native Python values: items, keys, ExpressionAttributeValues and
+ExclusiveStartKey are serialized on the way in; items, Attributes and LastEvaluatedKey are
+deserialized on the way out, so a pagination key can be handed to an API client and back.
+Errors propagate as botocore exceptions; callers decide whether to swallow them.
+'''
+import time
+from nova_common import clients
+from nova_common.codec import serialize_item, deserialize_item
+
+client = clients.lazy('dynamodb')
+
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+
+# Request fields that carry native values
+_SERIALIZED_ARGS = ("Key", "Item", "ExpressionAttributeValues", "ExclusiveStartKey")
+
+def __getattr__(name):
+    # Resolved on first use so importing this module doesn't build the client
+    if name == "ConditionalCheckFailedException":
+        return client.exceptions.ConditionalCheckFailedException
+    raise AttributeError(name)
+
+def _request(kwargs):
+    for name in _SERIALIZED_ARGS:
+        if kwargs.get(name) is not None:
+            kwargs[name] = serialize_item(kwargs[name])
+        else:
+            kwargs.pop(name, None)
+    return kwargs
+
+def _backoff(attempt):
+    time.sleep(min(0.05 * 2 ** attempt, 2))
+
+def get_item(table_name, key, **kwargs):
+    '''The item with key, or None.'''
+    response = client.get_item(**_request({"TableName": table_name, "Key": key, **kwargs}))
+    return deserialize_item(response.get("Item"))
+
+def put_item(table_name, item, **kwargs):
+    return client.put_item(**_request({"TableName": table_name, "Item": item, **kwargs}))
+
+def delete_item(table_name, key, **kwargs):
+    return client.delete_item(**_request({"TableName": table_name, "Key": key, **kwargs}))
+
+def update_item(table_name, key, **kwargs):
+    '''UpdateItem; returns the deserialized Attributes (empty unless ReturnValues asks for them).'''
+    response = client.update_item(**_request({"TableName": table_name, "Key": key, **kwargs}))
+    return deserialize_item(response.get("Attributes", {}))
+
+def _path(path, names, prefix):
+    '''Placeholder expression for a dotted attribute path, registering its names.'''
+    placeholders = []
+    for j, part in enumerate(path.split('.')):
+        names[f"#{prefix}_{j}"] = part
+        placeholders.append(f"#{prefix}_{j}")
+    return '.'.join(placeholders)
+
+def set_fields(table_name, key, fields, **kwargs):
+    '''
+    SET only the given attributes instead of replacing the whole item, so concurrent writers
+    don't clobber each other. Keys may be dotted paths into maps that already exist.
+    '''
+    names, values, assignments = {}, {}, []
+    for i, (path, value) in enumerate(fields.items()):
+        values[f":v{i}"] = value
+        assignments.append(f"{_path(path, names, f'f{i}')} = :v{i}")
+    return update_item(table_name, key,
+                       UpdateExpression="SET " + ", ".join(assignments),
+                       ExpressionAttributeNames={**names, **kwargs.pop("ExpressionAttributeNames", {})},
+                       ExpressionAttributeValues={**values, **kwargs.pop("ExpressionAttributeValues", {})},
+                       **kwargs)
+
+def add_values(table_name, key, deltas, **kwargs):
+    '''Atomically ADD each delta to the numeric attribute at its dotted path.'''
+    names, values, assignments = {}, {}, []
+    for i, (path, value) in enumerate(deltas.items()):
+        values[f":v{i}"] = value
+        assignments.append(f"{_path(path, names, f'f{i}')} :v{i}")
+    return update_item(table_name, key,
+                       UpdateExpression="ADD " + ", ".join(assignments),
+                       ExpressionAttributeNames=names,
+                       ExpressionAttributeValues=values,
+                       **kwargs)
+
+def query(table_name, **kwargs):
+    '''One page: (items, last evaluated key or None).'''
+    response = client.query(**_request({"TableName": table_name, **kwargs}))
+    return [deserialize_item(item) for item in response.get("Items", [])], deserialize_item(response.get("LastEvaluatedKey"))
+
+def scan(table_name, **kwargs):
+    '''One page: (items, last evaluated key or None).'''
+    response = client.scan(**_request({"TableName": table_name, **kwargs}))
+    return [deserialize_item(item) for item in response.get("Items", [])], deserialize_item(response.get("LastEvaluatedKey"))
+
+def query_all(table_name, **kwargs):
+    '''Every item the query matches, following LastEvaluatedKey.'''
+    while True:
+        items, last_key = query(table_name, **kwargs)
+        yield from items
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+def scan_all(table_name, **kwargs):
+    '''Every item of the scan (or scan segment), following LastEvaluatedKey.'''
+    while True:
+        items, last_key = scan(table_name, **kwargs)
+        yield from items
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+def batch_get(table_name, keys, **kwargs):
+    '''Items by key with BatchGetItem, retrying unprocessed keys. Order is not preserved.'''
+    items = []
+    for i in range(0, len(keys), BATCH_GET_MAX_KEYS):
+        request = {table_name: {"Keys": [serialize_item(k) for k in keys[i:i + BATCH_GET_MAX_KEYS]], **kwargs}}
+        attempt = 0
+        while request:
+            response = client.batch_get_item(RequestItems=request)
+            items.extend(deserialize_item(item) for item in response["Responses"].get(table_name, []))
+            request = response.get("UnprocessedKeys")
+            if request:
+                _backoff(attempt)
+                attempt += 1
+    return items
+
+def batch_write(table_name, puts=(), deletes=()):
+    '''Put items and delete keys with BatchWriteItem, retrying unprocessed writes.'''
+    writes = [{"DeleteRequest": {"Key": serialize_item(key)}} for key in deletes]
+    writes.extend({"PutRequest": {"Item": serialize_item(item)}} for item in puts)
+    for i in range(0, len(writes), BATCH_WRITE_MAX_ITEMS):
+        request = {table_name: writes[i:i + BATCH_WRITE_MAX_ITEMS]}
+        attempt = 0
+        while request:
+            request = client.batch_write_item(RequestItems=request).get("UnprocessedItems")
+            if request:
+                _backoff(attempt)
+                attempt += 1
@@ -0,0 +1,178 @@
+'''
+Task table and task name index helpers shared by the Lambdas.
+Errors are printed and reported through the return value (None/False) rather than raised, as
+the handlers expect.
+'''
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from nova_common import dynamodb as ddb
+
+NAME_INDEX_COUNT_KEY = "#count"
+NAME_INDEX_WORKERS = 8
+
+def dynamodb_table_upsert(table_name, document):
+    try:
+        return ddb.put_item(table_name, document)
+    except Exception as e:
+        print(f"An error occurred, dynamodb_table_upsert: {e}")
+        return None
+
+def dynamodb_table_create(table_name, document, stale_before=None):
+    """
+    Put the document unless an item with its Id exists, other than one whose start failed.
+    With stale_before (an ISO timestamp), an item still "submitting" since before it is
+    replaced too: the run that claimed it has timed out.
+    Returns True if written, False if the item exists, None on error.
+    """
+    condition = "attribute_not_exists(Id) OR #status = :failed"
+    values = {":failed": "failed"}
+    if stale_before:
+        condition += " OR (#status = :submitting AND SubmittedTs < :stale)"
+        values.update({":submitting": "submitting", ":stale": stale_before})
+    try:
+        ddb.put_item(
+            table_name, document,
+            ConditionExpression=condition,
+            ExpressionAttributeNames={"#status": "Status"},
+            ExpressionAttributeValues=values
+        )
+        return True
+    except ddb.ConditionalCheckFailedException:
+        return False
+    except Exception as e:
+        print(f"An error occurred, dynamodb_table_create: {e}")
+        return None
+
+def dynamodb_get_by_id(table_name, id, key_name="Id"):
+    try:
+        item = ddb.get_item(table_name, {key_name: id})
+        if item is None:
+            print(f"No item found with id: {id}")
+        return item
+    except Exception as e:
+        print(f"An error occurred, dynamodb_get_by_id: {e}")
+        return None
+
+def dynamodb_table_update(table_name, id, fields, key_name="Id"):
+    """
+    SET only the given attributes instead of replacing the whole item, so concurrent writers
+    don't clobber each other. Keys may be dotted paths into maps that already exist.
+    """
+    try:
+        return ddb.set_fields(table_name, {key_name: id}, fields)
+    except Exception as e:
+        print(f"An error occurred, dynamodb_table_update: {e}")
+        return None
+
+def dynamodb_table_update_unless_deleting(table_name, id, fields, key_name="Id"):
+    """
+    dynamodb_table_update, only while the task exists and is not tombstoned (Status=deleting).
+    Returns True if written, False if the task is gone or being deleted, None on error.
+    """
+    try:
+        ddb.set_fields(
+            table_name, {key_name: id}, fields,
+            ConditionExpression=f"attribute_exists({key_name}) AND #status <> :deleting",
+            ExpressionAttributeNames={"#status": "Status"},
+            ExpressionAttributeValues={":deleting": "deleting"}
+        )
+        return True
+    except ddb.ConditionalCheckFailedException:
+        return False
+    except Exception as e:
+        print(f"An error occurred, dynamodb_table_update_unless_deleting: {e}")
+        return None
+
+def dynamodb_table_add(table_name, id, path, value, key_name="Id"):
+    """
+    Atomically add value to the numeric attribute at the dotted path.
+    Returns the new value.
+    """
+    try:
+        attribute = ddb.add_values(table_name, {key_name: id}, {path: value}, ReturnValues="UPDATED_NEW")
+        for part in path.split('.'):
+            attribute = attribute[part]
+        return attribute
+    except Exception as e:
+        print(f"An error occurred, dynamodb_table_add: {e}")
+        return None
+
+def dynamodb_delete_task_by_id(table_name, task_id):
+    try:
+        ddb.delete_item(table_name, {"Id": task_id})
+    except Exception as e:
+        print(f"Error deleting item with id {task_id} from table {table_name}: {str(e)}")
+
+def dynamodb_task_tombstone(table_name, task_id):
+    """
+    Mark the task as being deleted (Status=deleting). Returns False if the task doesn't exist.
+    """
+    try:
+        ddb.update_item(
+            table_name, {"Id": task_id},
+            UpdateExpression="SET #status = :deleting, DeleteRequestTs = :ts",
+            ConditionExpression="attribute_exists(Id)",
+            ExpressionAttributeNames={"#status": "Status"},
+            ExpressionAttributeValues={":deleting": "deleting", ":ts": datetime.now(timezone.utc).isoformat()}
+        )
+        return True
+    except ddb.ConditionalCheckFailedException:
+        return False
+    except Exception as e:
+        print(f"Error marking task {task_id} as deleting in table {table_name}: {str(e)}")
+        return False
+
+def name_grams(names):
+    """
+    Lower-cased character trigrams of the names. A keyword of three or more characters can
+    only be a substring of a name that contains every trigram of the keyword.
+    """
+    grams = set()
+    for name in names:
+        name = name.lower()
+        grams.update(name[i:i + 3] for i in range(len(name) - 2))
+    return grams
+
+def _add_gram_count(table_name, gram, delta):
+    ddb.add_values(table_name, {"Gram": gram, "TaskId": NAME_INDEX_COUNT_KEY}, {"Count": delta})
+
+def dynamodb_index_task_names(table_name, task_id, request_ts, names):
+    """
+    Add the task to the posting list of every trigram of its names. Each posting stores the
+    lower-cased names so a search can verify matches without reading the task table.
+    Conditional puts keep the per-trigram counts exact when a task is indexed twice.
+    """
+    names = [name.lower() for name in names if name]
+
+    def index_gram(gram):
+        try:
+            ddb.put_item(
+                table_name,
+                {"Gram": gram, "TaskId": task_id, "RequestTs": request_ts, "Names": names},
+                ConditionExpression="attribute_not_exists(TaskId)"
+            )
+        except ddb.ConditionalCheckFailedException:
+            return
+        _add_gram_count(table_name, gram, 1)
+
+    try:
+        with ThreadPoolExecutor(max_workers=NAME_INDEX_WORKERS) as executor:
+            list(executor.map(index_gram, name_grams(names)))
+    except Exception as e:
+        print(f"An error occurred, dynamodb_index_task_names: {e}")
+
+def dynamodb_unindex_task_names(table_name, task_id, names):
+    """
+    Remove the task from the posting list of every trigram of its names.
+    Counts are only decremented for postings that existed.
+    """
+    def unindex_gram(gram):
+        response = ddb.delete_item(table_name, {"Gram": gram, "TaskId": task_id}, ReturnValues="ALL_OLD")
+        if "Attributes" in response:
+            _add_gram_count(table_name, gram, -1)
+
+    try:
+        with ThreadPoolExecutor(max_workers=NAME_INDEX_WORKERS) as executor:
+            list(executor.map(unindex_gram, name_grams([name for name in names if name])))
+    except Exception as e:
+        print(f"Error removing task {task_id} from name index {table_name}: {str(e)}")